@@ -0,0 +1,144 @@
+"""
+In-memory LRU cache of serialized API responses.
+
+A simulation's match predictions and table standings never change once they
+are written, so the JSON for each (endpoint, simulation ID) pair is built
+once, kept with a strong ETag derived from its bytes, and served from memory
+afterwards.
+
+Every API process has its own cache, but they all key it by the deletion
+epoch kept in Redis, so that DELETE /api/simulations, handled by any one
+of them, invalidates the cached responses of all of them.
+"""
+
+from collections import OrderedDict
+import hashlib
+from threading import Lock
+from typing import Awaitable, Callable
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from backend.config import RESPONSE_CACHE_EPOCH, RESPONSE_CACHE_SIZE, RESPONSE_CACHE_MAX_AGE
+from backend.db.redis_client import async_redis
+
+
+class CachedResponse:
+    """Serialized response body and its ETag."""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache of CachedResponse objects.
+
+    Args:
+        max_size: The maximum number of responses kept.
+    """
+
+    def __init__(self, max_size: int = RESPONSE_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key) -> CachedResponse | None:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry: CachedResponse) -> None:
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+
+# Responses of /api/matches and /api/table, keyed by (deletion epoch,
+# endpoint, simulation ID).
+response_cache = ResponseCache()
+
+
+async def cache_epoch() -> int | None:
+    """
+    The number of times the simulations were deleted, shared by every API
+    process, or None if Redis can't be reached.
+    """
+    try:
+        return int(await async_redis.get(RESPONSE_CACHE_EPOCH) or 0)
+    except Exception:
+        return None
+
+
+async def invalidate_responses() -> None:
+    """
+    Invalidate the cached responses of every API process, e.g., around
+    deleting the simulations they belong to.
+    """
+    response_cache.clear()
+    await async_redis.incr(RESPONSE_CACHE_EPOCH)
+
+
+def serialize(model_type, rows: list[dict]) -> bytes:
+    """
+    Serialize database rows as FastAPI would with `response_model=model_type`,
+    i.e., validated and using the field aliases.
+    """
+    adapter = TypeAdapter(model_type)
+    return adapter.dump_json(adapter.validate_python(rows), by_alias=True)
+
+
+async def cached_response(
+    key,
+    build: Callable[[], Awaitable[bytes | None]],
+    if_none_match: str | None,
+    immutable: bool,
+) -> Response:
+    """
+    Respond with the cached body for `key`, building (and caching) it first
+    if needed. `build` returns None when there is nothing to cache yet, e.g.,
+    for a simulation that doesn't exist.
+
+    Args:
+        key: The cache key.
+        build: Builds the serialized body.
+        if_none_match: The request's If-None-Match header. If it matches
+            the ETag, a 304 with no body is returned.
+        immutable: Whether the URL always maps to this body, so it can be
+            cached by the client for a long time. Otherwise (e.g., for the
+            latest simulation), clients must revalidate every time.
+    """
+    # Without the epoch, it can't be known whether a cached response is
+    # still valid, so it is neither read from nor written to the cache.
+    epoch = await cache_epoch()
+    entry = response_cache.get((epoch, key)) if epoch is not None else None
+    if entry is None:
+        body = await build()
+        if body is None:
+            return Response(b"[]", media_type="application/json")
+        entry = CachedResponse(body)
+        if epoch is not None:
+            response_cache.put((epoch, key), entry)
+
+    headers = {
+        "ETag": entry.etag,
+        "Cache-Control": f"public, max-age={RESPONSE_CACHE_MAX_AGE}, immutable" if immutable else "no-cache",
+    }
+    if if_none_match and _etag_matches(if_none_match, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether an If-None-Match header matches the ETag (weak comparison, RFC 9110)."""
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
@@ -0,0 +1,91 @@
+"""
+Streams job status changes to clients over Server-Sent Events (SSE).
+
+The worker publishes every status change of a job to the Redis channel
+"{JOB_EVENTS_CHANNEL}:{job_id}" (see backend/worker/jobs.py). Each API
+process holds a single pattern subscription to all job channels, and fans
+the events out to the streams of the clients watching each job, so the
+number of Redis connections doesn't grow with the number of clients.
+"""
+
+import asyncio
+from collections import defaultdict
+from contextlib import asynccontextmanager
+import json
+import logging
+from typing import AsyncIterator
+
+from backend.config import JOB_EVENTS_CHANNEL, JobStatus
+from backend.db.redis_client import async_redis
+
+logger = logging.getLogger(__name__)
+
+
+class JobEventHub:
+    """Fans out the job status events published by the worker."""
+
+    def __init__(self):
+        # Queues of the clients watching each job ID.
+        self.subscribers = defaultdict(set)
+        self.task = None
+
+    def start(self) -> None:
+        """Start listening for events in the background."""
+        self.task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        """Stop listening for events."""
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    @asynccontextmanager
+    async def subscribe(self, job_id: int) -> AsyncIterator[asyncio.Queue]:
+        """Receive the events of a job on a queue, for the duration of the block."""
+        queue = asyncio.Queue()
+        self.subscribers[job_id].add(queue)
+        try:
+            yield queue
+        finally:
+            self.subscribers[job_id].discard(queue)
+            if not self.subscribers[job_id]:
+                del self.subscribers[job_id]
+
+    async def _listen(self) -> None:
+        """Forward published events to the subscribed queues, reconnecting on errors."""
+        while True:
+            try:
+                # The subscription holds one of the client's connections.
+                async with async_redis.pubsub() as pubsub:
+                    await pubsub.psubscribe(f"{JOB_EVENTS_CHANNEL}:*")
+                    async for message in pubsub.listen():
+                        if message["type"] != "pmessage":
+                            continue
+                        job_id = int(message["channel"].rsplit(b":", 1)[1])
+                        event = json.loads(message["data"])
+                        for queue in self.subscribers.get(job_id, ()):
+                            queue.put_nowait(event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Job event subscription failed (%s), retrying", e)
+                await asyncio.sleep(1)
+
+
+# The API process's subscription to job events, started by the FastAPI
+# lifespan (see backend/main.py).
+job_events = JobEventHub()
+
+
+def is_terminal(status: str) -> bool:
+    """Whether a job will not change status anymore."""
+    return status in (JobStatus.COMPLETED, JobStatus.FAILED)
+
+
+def format_event(event: dict) -> str:
+    """Format an event as an SSE message."""
+    return f"data: {json.dumps(event)}\n\n"
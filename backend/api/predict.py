@@ -0,0 +1,155 @@
+"""
+Serves single-fixture predictions (GET /api/predict) from memory, without a
+job.
+
+Each API process keeps its own predictor (the model, and the feature state
+of the seasons so far, see backend/worker/predictor.py) and an as-of feature
+index (see model/feature_index.py), which a background task keeps current.
+They take about 250 MB per process, so they are only loaded once a process
+is first asked for a prediction, and not at all unless PREDICT_ENABLED.
+Whenever they change, every pairing of the current season's teams is
+predicted for the next matchday in one call to the model, so a request for
+an upcoming fixture is a dictionary lookup. A fixture on another date of the
+season (e.g., a past one, as of that date) needs its own call to the model,
+which is much slower, so those are cached.
+"""
+
+import asyncio
+from collections import OrderedDict
+from datetime import date
+from itertools import count
+import logging
+from threading import Lock
+
+import numpy as np
+import pandas as pd
+
+from backend.config import PREDICT_CACHE_SIZE, PREDICT_REFRESH_INTERVAL
+from backend.worker.as_of import build_index, predict_fixtures
+from backend.worker.predictor import Predictor, PredictorService, season_of, team_to_id
+from model.feature_index import FeatureIndex
+
+logger = logging.getLogger(__name__)
+
+# Numbers the snapshots in the order they are built.
+_generations = count()
+
+
+class FixtureSnapshot:
+    """
+    The predictions of every pairing of the current season's teams on the
+    next matchday, and what is needed to predict them on other dates.
+    """
+
+    def __init__(self, predictor: Predictor, index: FeatureIndex):
+        self.generation = next(_generations)
+        self.predictor = predictor
+        self.model = predictor.model
+        self.index = index
+
+        # Position of each team (by ID) in predictor.teams.
+        self.teams = {team_to_id[team]: i for i, team in enumerate(predictor.teams)}
+
+        self.season = predictor.season
+        self.last_played = predictor.last_played
+        # Until another match is played, the features of every later fixture
+        # of the season are the same as on the next day.
+        self.next_matchday = (self.last_played + pd.Timedelta(days=1)).date()
+
+        ids = list(self.teams)
+        home, away = np.nonzero(~np.eye(len(ids), dtype=bool))
+        probs = predict_fixtures(predictor, index, [self.next_matchday], [home], [away], self.season)[0]
+        self.upcoming = {(ids[h], ids[a]): tuple(p) for h, a, p in zip(home.tolist(), away.tolist(), probs.tolist())}
+
+    def covers(self, day: date) -> bool:
+        """Whether a fixture on the given day has the next matchday's features."""
+        return day >= self.next_matchday and season_of(day) == self.season
+
+    def predict(self, home_id: str, away_id: str, day: date) -> tuple[float, float, float]:
+        """Predict a fixture as of the given day, with a call to the model."""
+        home = np.array([self.teams[home_id]])
+        away = np.array([self.teams[away_id]])
+        probs = predict_fixtures(self.predictor, self.index, [day], [home], [away], season_of(day))[0]
+        return tuple(probs[0].tolist())
+
+
+class FixturePredictions:
+    """Keeps a FixtureSnapshot current, and answers predictions from it."""
+
+    def __init__(self):
+        self.service = PredictorService()
+        self.snapshot = None
+        self.task = None
+
+        # Predictions of fixtures on other days than the next matchday, by
+        # (snapshot generation, home ID, away ID, day).
+        self.cache = OrderedDict()
+        self.lock = Lock()
+
+    def start(self) -> None:
+        """Start refreshing the snapshot in the background, if not started yet."""
+        if self.task is None:
+            self.task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        """Stop refreshing the snapshot."""
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def _refresh_loop(self) -> None:
+        """Refresh every PREDICT_REFRESH_INTERVAL seconds, off the event loop."""
+        while True:
+            try:
+                await asyncio.to_thread(self.refresh)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Could not refresh the fixture predictions (%s), retrying", e)
+            await asyncio.sleep(PREDICT_REFRESH_INTERVAL)
+
+    def refresh(self) -> None:
+        """
+        Bring the predictor up to date, and rebuild the snapshot if it
+        changed. Requests keep using the previous snapshot until the new
+        one replaces it.
+        """
+        predictor = self.service.refresh()
+        snapshot = self.snapshot
+        if snapshot is not None and snapshot.predictor is predictor and snapshot.model is predictor.model:
+            return
+
+        snapshot = FixtureSnapshot(predictor, build_index(predictor))
+        with self.lock:
+            self.snapshot = snapshot
+            self.cache.clear()
+        logger.info("Fixture predictions refreshed for %d teams", len(self.snapshot.teams))
+
+    def predict(self, snapshot: FixtureSnapshot, home_id: str, away_id: str, day: date) -> tuple:
+        """Predict a fixture on a day the snapshot doesn't cover, caching the result."""
+        key = (snapshot.generation, home_id, away_id, day)
+        with self.lock:
+            probs = self.cache.get(key)
+            if probs is not None:
+                self.cache.move_to_end(key)
+                return probs
+
+        probs = snapshot.predict(home_id, away_id, day)
+        with self.lock:
+            # A request still running on a replaced snapshot doesn't fill
+            # the cache with predictions no one will look up again.
+            if snapshot is not self.snapshot:
+                return probs
+            self.cache[key] = probs
+            while len(self.cache) > PREDICT_CACHE_SIZE:
+                self.cache.popitem(last=False)
+        return probs
+
+
+# The API process's fixture predictions, refreshed in the background from
+# the FastAPI lifespan (see backend/main.py).
+fixture_predictions = FixturePredictions()
@@ -2,20 +2,59 @@
 Defines the HTTP endpoints for the API to use.
 """
 
-from fastapi import APIRouter
+import asyncio
+from datetime import date
+import logging
+import secrets
+from typing import AsyncIterator, Awaitable, Callable
 
-from backend.api.schemas import Match, Standing
-from backend.db.connection import get_connection
-from backend.db.simulations import list_simulations, clear_database
+from fastapi import APIRouter, Body, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+
+from backend.api.cache import cached_response, invalidate_responses, serialize
+from backend.api.events import job_events, is_terminal, format_event
+from backend.api.predict import fixture_predictions
+from backend.api.schemas import FixturePrediction, ForecastSnapshot, Match, Standing, TeamForecast
+from backend.db.connection import get_async_connection
+from backend.db.simulations import list_simulations, get_latest_simulation_id as latest_simulation_id, clear_database
 from backend.db.predictions import get_predictions
 from backend.db.standings import get_standings
-from backend.db.jobs import create_job_psql, enqueue_job_hq, fail_job_psql, get_job_info
+from backend.db.forecasts import get_forecast, get_forecast_history
+from backend.worker.monte_carlo import block_count, shard_blocks
+from backend.worker.predictor import season_of
+from backend.db.jobs import (
+    create_job_psql,
+    create_jobs_psql,
+    create_sharded_job_psql,
+    enqueue_job_hq,
+    enqueue_jobs_hq,
+    fail_job_psql,
+    fail_jobs_psql,
+    get_job_info,
+)
+from backend.config import (
+    SIMULATIONS_PAGE_SIZE,
+    SIMULATIONS_MAX_PAGE_SIZE,
+    SIMULATE_BATCH_MAX_SIZE,
+    MONTE_CARLO_SEASONS,
+    MONTE_CARLO_MAX_SEASONS,
+    MONTE_CARLO_MAX_SHARDS,
+    ROLLOUT_SEASONS,
+    ROLLOUT_MAX_SEASONS,
+    AS_OF_SEASONS,
+    AS_OF_MAX_SEASONS,
+    JOB_EVENTS_KEEPALIVE,
+    PREDICT_ENABLED,
+    JobType,
+)
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
 @router.post("/simulate")
-def run_simulation() -> dict:
+async def run_simulation() -> dict:
     """
     Create a job in the job database in Postgres and enqueue a job
     in the Redis queue for workers to perform simulations and compute
@@ -24,34 +63,183 @@ def run_simulation() -> dict:
     Returns a success indicator as well as the new job ID is successful.
     """
     # Create a job in the Postgres database.
-    with get_connection() as conn:
-        job_id = create_job_psql(conn)
+    async with get_async_connection() as conn:
+        job_id = await create_job_psql(conn)
         
     # Enqueue the job ID into the queue.
-    error = enqueue_job_hq(job_id)
+    error = await enqueue_job_hq(job_id)
     
     # If the enqueuing failed, return that the POST failed.
     if error:
-        with get_connection() as conn:
-            fail_job_psql(conn, job_id, error)
+        async with get_async_connection() as conn:
+            await fail_job_psql(conn, job_id, error)
         return {"ok": False}
     else:
         return {"ok": True, "jobId": job_id}
 
 
+@router.post("/simulate/monte-carlo")
+async def run_monte_carlo(
+    seasons: int = Body(MONTE_CARLO_SEASONS, embed=True, ge=1, le=MONTE_CARLO_MAX_SEASONS),
+    seed: int | None = Body(None, embed=True, ge=0),
+    shards: int = Body(1, embed=True, ge=1, le=MONTE_CARLO_MAX_SHARDS),
+) -> dict:
+    """
+    Like POST /simulate, but the job also simulates the season `seasons`
+    times from the predicted probabilities, to forecast each team's finishing
+    position (see GET /forecast). A random seed is picked if none is given,
+    and kept with the job, so the forecast can be reproduced.
+
+    With `shards` > 1, the seasons are split into that many shard jobs, which
+    any free workers simulate in parallel, and are merged into the job's
+    simulation when the last shard finishes. The forecast only depends on
+    the seed, not on the number of shards.
+
+    Returns a success indicator as well as the new job ID if successful.
+    """
+    if seed is None:
+        seed = secrets.randbits(32)
+    params = {"seasons": seasons, "seed": seed}
+
+    # A shard simulates whole blocks of seasons, so there can't be more
+    # shards than blocks.
+    shards = min(shards, block_count(seasons))
+
+    # Create a job (and its shards) in the Postgres database.
+    async with get_async_connection() as conn:
+        if shards == 1:
+            job_id = await create_job_psql(conn, JobType.MONTE_CARLO, params)
+            queued = [job_id]
+        else:
+            shard_params = [
+                {**params, "blocks": [blocks.start, blocks.stop]}
+                for blocks in shard_blocks(seasons, shards)
+            ]
+            job_id, queued = await create_sharded_job_psql(
+                conn, JobType.MONTE_CARLO, {**params, "shards": shards}, JobType.MONTE_CARLO_SHARD, shard_params
+            )
+
+    # Enqueue the job ID (or its shards' IDs) into the queue.
+    error = await enqueue_jobs_hq(queued)
+
+    # If the enqueuing failed, return that the POST failed.
+    if error:
+        async with get_async_connection() as conn:
+            await fail_jobs_psql(conn, sorted({job_id, *queued}), error)
+        return {"ok": False}
+    else:
+        return {"ok": True, "jobId": job_id}
+
+
+@router.post("/simulate/rollout")
+async def run_rollout(
+    seasons: int = Body(ROLLOUT_SEASONS, embed=True, ge=1, le=ROLLOUT_MAX_SEASONS),
+    seed: int | None = Body(None, embed=True, ge=0),
+    sample: bool = Body(True, embed=True),
+) -> dict:
+    """
+    Like POST /simulate/monte-carlo, but the job rolls the remaining fixtures
+    out one matchweek at a time, feeding each matchweek's outcomes back into
+    the teams' form, Elo ratings, and H2H records before predicting the next
+    (see GET /forecast).
+
+    With `sample` false, every fixture takes its most likely outcome instead,
+    which gives a single projected season.
+
+    Returns a success indicator as well as the new job ID if successful.
+    """
+    if seed is None:
+        seed = secrets.randbits(32)
+    if not sample:
+        seasons = 1
+    params = {"seasons": seasons, "seed": seed, "sample": sample}
+
+    async with get_async_connection() as conn:
+        job_id = await create_job_psql(conn, JobType.ROLLOUT, params)
+
+    error = await enqueue_job_hq(job_id)
+    if error:
+        async with get_async_connection() as conn:
+            await fail_job_psql(conn, job_id, error)
+        return {"ok": False}
+    else:
+        return {"ok": True, "jobId": job_id}
+
+
+@router.post("/simulate/as-of")
+async def run_as_of(
+    seasons: int = Body(AS_OF_SEASONS, embed=True, ge=1, le=AS_OF_MAX_SEASONS),
+    seed: int | None = Body(None, embed=True, ge=0),
+) -> dict:
+    """
+    Like POST /simulate/monte-carlo, but the job forecasts the season as of
+    the start of every matchweek so far, from only the matches played before
+    it, simulating the rest of the season `seasons` times each (see GET
+    /forecast/history). The latest one is the simulation's forecast.
+
+    Returns a success indicator as well as the new job ID if successful.
+    """
+    if seed is None:
+        seed = secrets.randbits(32)
+    params = {"seasons": seasons, "seed": seed}
+
+    async with get_async_connection() as conn:
+        job_id = await create_job_psql(conn, JobType.AS_OF, params)
+
+    error = await enqueue_job_hq(job_id)
+    if error:
+        async with get_async_connection() as conn:
+            await fail_job_psql(conn, job_id, error)
+        return {"ok": False}
+    else:
+        return {"ok": True, "jobId": job_id}
+
+
+@router.post("/simulate/batch")
+async def run_simulations(count: int = Body(..., embed=True, ge=1, le=SIMULATE_BATCH_MAX_SIZE)) -> dict:
+    """
+    Like POST /simulate, but creates and enqueues `count` jobs at once, e.g.,
+    for scheduled bulk reruns. The jobs are created with one INSERT and
+    enqueued with one Redis command, rather than one round trip to each
+    per job.
+
+    Returns a success indicator as well as the new job IDs if successful.
+    """
+    # Create the jobs in the Postgres database.
+    async with get_async_connection() as conn:
+        job_ids = await create_jobs_psql(conn, count)
+
+    # Enqueue the job IDs into the queue.
+    error = await enqueue_jobs_hq(job_ids)
+
+    # If the enqueuing failed, none of the jobs were enqueued.
+    if error:
+        async with get_async_connection() as conn:
+            await fail_jobs_psql(conn, job_ids, error)
+        return {"ok": False}
+    else:
+        return {"ok": True, "jobIds": job_ids}
+
+
 @router.get("/simulations")
-def get_simulations() -> list[dict]:
+async def get_simulations(
+    limit: int = Query(SIMULATIONS_PAGE_SIZE, ge=1, le=SIMULATIONS_MAX_PAGE_SIZE),
+    after: int = Query(0, ge=0),
+) -> list[dict]:
     """
-    Returns a list of simulation objects. Each entry will be a dictionary
-    containing simulation ID's and timestamps created.
+    Returns a page of simulation objects, oldest first. Each entry will be a
+    dictionary containing simulation ID's and timestamps created.
+
+    Pages are keyset-paginated: pass the last ID of a page as `after` to get
+    the next one. A page shorter than `limit` is the last one.
     """
-    with get_connection() as conn:
-        simulations = list_simulations(conn)
+    async with get_async_connection() as conn:
+        simulations = await list_simulations(conn, limit=limit, after=after)
     return simulations
 
 
 @router.get("/simulations/latest")
-def get_latest_simulation_id() -> int:
+async def get_latest_simulation_id() -> int:
     """
     Returns the ID of the latest ran simulation. This will be used
     as a default option if the user does not specify a specific
@@ -59,57 +247,208 @@ def get_latest_simulation_id() -> int:
 
     Returns -1 if there are no simulations in the database.
     """
-    with get_connection() as conn:
-        simulations = list_simulations(conn)
-    return simulations[-1]["id"] if simulations else -1
+    async with get_async_connection() as conn:
+        return await latest_simulation_id(conn)
 
 
 @router.delete("/simulations")
-def delete_simulations() -> dict:
+async def delete_simulations() -> dict:
     """
     Deletes all data in the simulation, match, and standing tables.
     """
     try:
-        with get_connection() as conn:
-            clear_database(conn)
-            conn.commit()
-        return {"ok": True}
+        # The cached results belong to simulations about to be deleted. If
+        # the other API processes can't be told, nothing is deleted.
+        await invalidate_responses()
+        async with get_async_connection() as conn:
+            await clear_database(conn)
     except:
         return {"ok": False}
 
+    # Again, for the responses cached while the simulations were deleted.
+    try:
+        await invalidate_responses()
+    except Exception as e:
+        logger.warning("Could not invalidate the responses cached during the deletion: %s", e)
+    return {"ok": True}
+
 
 @router.get("/matches", response_model=list[Match])
-def get_matches(simulation: int = 0):
+async def get_matches(simulation: int = 0, if_none_match: str | None = Header(None)):
     """
     Read match results from a specified simulation.
-    """
-    simulation_id = simulation if simulation != 0 else get_latest_simulation_id()
 
-    # If simulation ID is -1, there are no entries in the database.
-    with get_connection() as conn:
-        return get_predictions(conn, simulation_id) if simulation_id != -1 else []
+    A simulation's results never change, so they are served from the
+    response cache with an ETag (see backend/api/cache.py).
+    """
+    return await _simulation_response("matches", Match, get_predictions, simulation, if_none_match)
 
 
 @router.get("/table", response_model=list[Standing])
-def get_table(simulation: int = 0):
+async def get_table(simulation: int = 0, if_none_match: str | None = Header(None)):
     """
     Read computed standings from a specified simulation.
+
+    A simulation's results never change, so they are served from the
+    response cache with an ETag (see backend/api/cache.py).
+    """
+    return await _simulation_response("table", Standing, get_standings, simulation, if_none_match)
+
+
+@router.get("/forecast", response_model=list[TeamForecast])
+async def get_season_forecast(simulation: int = 0, if_none_match: str | None = Header(None)):
+    """
+    Read the season forecast from a specified Monte Carlo simulation: each
+    team's probability of finishing in every position, and of winning the
+    title, finishing in the top 4, or being relegated. Empty for simulations
+    that were not Monte Carlo simulations.
+
+    Served from the response cache with an ETag, like /matches and /table.
+    """
+    return await _simulation_response("forecast", TeamForecast, get_forecast, simulation, if_none_match)
+
+
+@router.get("/forecast/history", response_model=list[ForecastSnapshot])
+async def get_season_forecast_history(simulation: int = 0, if_none_match: str | None = Header(None)):
+    """
+    Read the as-of forecasts from a specified as-of simulation: the season
+    forecast as of the start of every matchweek, in date order, to follow
+    how it drifted. Empty for other simulations.
+
+    Served from the response cache with an ETag, like /forecast.
+    """
+    return await _simulation_response(
+        "forecast-history", ForecastSnapshot, get_forecast_history, simulation, if_none_match
+    )
+
+
+@router.get("/predict", response_model=FixturePrediction)
+async def predict_fixture(home: str, away: str, date: date | None = None) -> dict:
+    """
+    Predict a single fixture between two of this season's teams (by team ID,
+    e.g., "ARS"), without a job, from the model and features kept in memory
+    (see backend/api/predict.py).
+
+    Without a date, or with a date after the last played match, the fixture
+    is predicted from everything known now, which is answered from memory.
+    With an earlier date of this season, it is predicted as of that date,
+    i.e., from the matches played before it only.
+    """
+    if not PREDICT_ENABLED:
+        raise HTTPException(status_code=503, detail="Predictions are disabled")
+    # Loads the model and features the first time, in the background.
+    fixture_predictions.start()
+    snapshot = fixture_predictions.snapshot
+    if snapshot is None:
+        raise HTTPException(status_code=503, detail="Predictions are not available yet")
+    for team_id in (home, away):
+        if team_id not in snapshot.teams:
+            raise HTTPException(status_code=404, detail=f"Unknown team: {team_id}")
+    if home == away:
+        raise HTTPException(status_code=422, detail="A team can't play itself")
+
+    day = date or snapshot.next_matchday
+    if snapshot.covers(day):
+        probs = snapshot.upcoming[(home, away)]
+    elif day < snapshot.next_matchday and season_of(day) == snapshot.season:
+        # Needs its own call to the model, off the event loop.
+        probs = await asyncio.to_thread(fixture_predictions.predict, snapshot, home, away, day)
+    else:
+        raise HTTPException(status_code=422, detail="The date must be in the current season")
+
+    labels = ["home_win", "draw", "away_win"]
+    return {
+        "match_date": day,
+        "home_id": home,
+        "away_id": away,
+        "p_home": probs[0],
+        "p_draw": probs[1],
+        "p_away": probs[2],
+        "prediction": labels[max(range(3), key=probs.__getitem__)],
+    }
+
+
+async def _simulation_response(
+    endpoint: str, model: type, read: Callable[..., Awaitable], simulation: int, if_none_match: str | None
+) -> Response:
+    """
+    Respond with the cached results of a simulation, reading them from the
+    database on a miss. Simulation 0 means the latest simulation, which is
+    resolved to its ID first so that it shares the cache entry.
     """
-    simulation_id = simulation if simulation != 0 else get_latest_simulation_id()
-    # If simulation ID is -1, there are no entries in the database.
-    with get_connection() as conn:
-        return get_standings(conn, simulation_id) if simulation_id != -1 else []
+    simulation_id = simulation
+    if simulation == 0:
+        async with get_async_connection() as conn:
+            simulation_id = await latest_simulation_id(conn)
+
+    async def build():
+        # If simulation ID is -1, there are no entries in the database.
+        if simulation_id == -1:
+            return None
+        async with get_async_connection() as conn:
+            rows = await read(conn, simulation_id)
+        # Don't cache a simulation that doesn't exist (yet).
+        return serialize(list[model], rows) if rows else None
+
+    return await cached_response(
+        (endpoint, simulation_id),
+        build,
+        if_none_match,
+        immutable=simulation != 0,
+    )
 
 @router.get("/jobs", response_model=dict)
-def get_job(job_id: int):
+async def get_job(job_id: int):
     """
     Returns information related to the job corresponding with the provied job ID.
     This will be used for polling the status of a job, in order to update
     the simulation store upon completion.
     """
     try:
-        with get_connection() as conn:
-            job_status, sim_id = get_job_info(conn, job_id)
+        async with get_async_connection() as conn:
+            job_status, sim_id = await get_job_info(conn, job_id)
         return {"ok": True, "jobStatus": job_status, "simulationId": sim_id}
     except:
-        return {"ok": False}
\ No newline at end of file
+        return {"ok": False}
+
+
+@router.get("/jobs/events")
+async def stream_job(job_id: int) -> StreamingResponse:
+    """
+    Streams the status of the job corresponding with the provided job ID as
+    Server-Sent Events, each with the same fields as GET /jobs. The current
+    status is sent first, then every change as the worker publishes it, and
+    the stream ends once the job has completed or failed. This replaces
+    polling GET /jobs.
+    """
+    return StreamingResponse(
+        _job_event_stream(job_id),
+        media_type="text/event-stream",
+        # Don't let proxies (e.g., nginx) buffer the stream.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _job_event_stream(job_id: int) -> AsyncIterator[str]:
+    # Subscribe before reading the current status, so that a change in
+    # between is not missed.
+    async with job_events.subscribe(job_id) as queue:
+        last = None
+        while last is None or not is_terminal(last["jobStatus"]):
+            event = None
+            if last is not None:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=JOB_EVENTS_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+
+            # Read the status from the database at the start, and whenever
+            # the stream has been quiet, in case an event was missed.
+            if event is None:
+                async with get_async_connection() as conn:
+                    job_status, sim_id = await get_job_info(conn, job_id)
+                event = {"ok": True, "jobStatus": job_status, "simulationId": sim_id}
+
+            if event != last:
+                yield format_event(event)
+                last = event
@@ -36,3 +36,37 @@ class Standing(BaseModel):
     drew: int
     lost: int
     points: int
+
+class TeamForecast(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    team_id: str = Field(alias="teamId")
+    seasons: int
+    expected_points: float = Field(alias="expectedPoints")
+
+    p_title: float = Field(alias="pTitle")
+    p_top4: float = Field(alias="pTop4")
+    p_relegation: float = Field(alias="pRelegation")
+
+    # positions[k]: probability of finishing in position k + 1.
+    positions: list[float]
+
+class ForecastSnapshot(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    # The forecast as it would have been made on this date.
+    as_of: date = Field(alias="asOf")
+    teams: list[TeamForecast]
+
+class FixturePrediction(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    match_date: date = Field(alias="matchDate")
+    home_id: str = Field(alias="homeId")
+    away_id: str = Field(alias="awayId")
+
+    p_home: float
+    p_draw: float
+    p_away: float
+
+    prediction: Literal["home_win", "draw", "away_win"]
@@ -12,9 +12,85 @@ load_dotenv()
 # Environment variable for the URL pointing to the PostgreSQL database.
 DATABASE_URL = os.environ["DATABASE_URL"]
 
+# Size of the pool of database connections kept open by each process, how
+# long (in seconds) a connection is reused before being replaced, and how long
+# to wait for a free connection before giving up.
+DB_POOL_MIN_SIZE = int(os.environ.get("DB_POOL_MIN_SIZE", 1))
+DB_POOL_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE", 10))
+DB_POOL_MAX_LIFETIME = float(os.environ.get("DB_POOL_MAX_LIFETIME", 3600))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+
 # Environment variable for the URL pointing to the Redis queue.
 REDIS_URL = os.environ["REDIS_URL"]
 
+# Maximum number of connections to Redis kept open by each process, and how
+# long (in seconds) to wait for a free one before giving up.
+REDIS_MAX_CONNECTIONS = int(os.environ.get("REDIS_MAX_CONNECTIONS", 20))
+REDIS_POOL_TIMEOUT = 10
+
+# Maximum number of jobs that can be submitted at once to
+# POST /api/simulate/batch.
+SIMULATE_BATCH_MAX_SIZE = 100
+
+# Monte Carlo season simulations (see backend/worker/monte_carlo.py): the
+# default and maximum number of simulated seasons per job, and how many
+# seasons are simulated at once (which bounds the memory used).
+MONTE_CARLO_SEASONS = 100_000
+MONTE_CARLO_MAX_SEASONS = 10_000_000
+MONTE_CARLO_BLOCK_SIZE = 10_000
+
+# Maximum number of shards a Monte Carlo job can be split into, to run on
+# several workers at once.
+MONTE_CARLO_MAX_SHARDS = 64
+
+# Autoregressive rollouts of the rest of the season (see
+# backend/worker/rollout.py): the default and maximum number of simulated
+# seasons per job, and how many seasons are rolled out at once. Every
+# matchweek of a block is predicted with one call to the model.
+ROLLOUT_SEASONS = 1000
+ROLLOUT_MAX_SEASONS = 100_000
+ROLLOUT_BLOCK_SIZE = 2000
+
+# As-of forecasts of every matchweek so far (see backend/worker/as_of.py):
+# the default and maximum number of seasons simulated for each matchweek.
+AS_OF_SEASONS = 10_000
+AS_OF_MAX_SEASONS = 1_000_000
+
+# Redis lists of the IDs of jobs waiting for a worker, and of jobs a worker
+# has taken and not yet finished (see backend/worker/job_queue.py).
+JOB_QUEUE = "queue"
+JOB_PROCESSING_QUEUE = "processing"
+
+# How long (in seconds) a worker's lease on its job lasts, how often the
+# worker extends it while the job runs, and how often workers look for jobs
+# whose lease expired, e.g., because their worker crashed.
+JOB_LEASE_DURATION = 60
+JOB_HEARTBEAT_INTERVAL = 15
+JOB_REAP_INTERVAL = 30
+
+# Prefix of the Redis pub/sub channels that job status changes are published
+# to, one channel per job (e.g., "job-events:42").
+JOB_EVENTS_CHANNEL = "job-events"
+
+# How often (in seconds) a job status stream sends a keep-alive, and checks
+# the database in case an event was missed.
+JOB_EVENTS_KEEPALIVE = 15
+
+# Number of worker processes run by each worker pod. With more than one, a
+# supervisor loads the model once and forks the workers, which share it (see
+# backend/worker/supervisor.py).
+WORKER_CONCURRENCY = int(os.environ.get("WORKER_CONCURRENCY", 1))
+
+# How long (in seconds) a worker blocks waiting for a job before checking
+# whether it should stop, and how long the supervisor waits for its workers
+# to finish their current job on shutdown before killing them.
+WORKER_POLL_TIMEOUT = 1
+WORKER_SHUTDOWN_TIMEOUT = float(os.environ.get("WORKER_SHUTDOWN_TIMEOUT", 25))
+
+# A worker that crashes sooner than this (in seconds) after starting is
+# restarted only after this delay, so a persistent failure doesn't spin.
+WORKER_RESTART_DELAY = 5
+
 # Enum to avoid mistyping job statuses.
 class JobStatus(StrEnum):
     QUEUED = "queued"
@@ -22,6 +98,20 @@ class JobStatus(StrEnum):
     COMPLETED = "completed"
     FAILED = "failed"
 
+# Enum of the kinds of jobs a worker can do: predict the season once, or
+# also simulate it many times (see backend/worker/monte_carlo.py).
+class JobType(StrEnum):
+    PREDICT = "predict"
+    MONTE_CARLO = "monte_carlo"
+    # One shard of a Monte Carlo job split across workers.
+    MONTE_CARLO_SHARD = "monte_carlo_shard"
+    # Simulate the rest of the season matchweek by matchweek, feeding the
+    # outcomes back into the features (see backend/worker/rollout.py).
+    ROLLOUT = "rollout"
+    # Forecast the season as of the start of every matchweek so far (see
+    # backend/worker/as_of.py).
+    AS_OF = "as_of"
+
 # The path to the project root.
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 
@@ -31,9 +121,41 @@ MODEL_PATH = PROJECT_ROOT / "model" / "model.joblib"
 # Path to the teams data.
 TEAMS_PATH = PROJECT_ROOT / "backend" / "datasets" / "teams.json"
 
-# Where to get the Football-Data.co.uk data from and where to store it.
-FOOTBALL_DATA_URL = "https://football-data.co.uk/mmz4281/2526/E0.csv"
+# Where to get the Football-Data.co.uk data from and where to store it. The URL
+# can be overridden, e.g., to point at a local HTTP server in tests.
+FOOTBALL_DATA_URL = os.environ.get("FOOTBALL_DATA_URL", "https://football-data.co.uk/mmz4281/2526/E0.csv")
 FOOTBALL_DATA_PATH = PROJECT_ROOT / "backend" / "datasets" / "footballdata.csv"
 
+# How long (in seconds) the local copy of the current season is used without
+# asking the server whether it changed, and how long to wait for the server.
+FOOTBALL_DATA_MAX_AGE = int(os.environ.get("FOOTBALL_DATA_MAX_AGE", 300))
+FOOTBALL_DATA_TIMEOUT = 10
+
+# Whether the API serves GET /api/predict. Each API process that serves it
+# loads the model and the feature state (about 250 MB) with its first
+# request for a prediction.
+PREDICT_ENABLED = os.environ.get("PREDICT_ENABLED", "true").lower() == "true"
+
+# How often (in seconds) each API process checks whether the model or the
+# data behind GET /api/predict changed, and how many predictions of fixtures
+# on other days than the next matchday it keeps (see backend/api/predict.py).
+PREDICT_REFRESH_INTERVAL = float(os.environ.get("PREDICT_REFRESH_INTERVAL", 60))
+PREDICT_CACHE_SIZE = 4096
+
+# Default and maximum number of simulations returned per page by
+# GET /api/simulations.
+SIMULATIONS_PAGE_SIZE = 100
+SIMULATIONS_MAX_PAGE_SIZE = 1000
+
+# Number of serialized /api/matches and /api/table responses kept in memory,
+# and how long (in seconds) clients may cache a specific simulation's results.
+RESPONSE_CACHE_SIZE = 256
+RESPONSE_CACHE_MAX_AGE = 31536000
+
+# Redis key counting how many times the simulations were deleted. It is part
+# of every response cache key, so a deletion through any API process
+# invalidates the responses cached by all of them.
+RESPONSE_CACHE_EPOCH = "response-cache-epoch"
+
 # The number of previous matches to be included to represent a team's current form.
 N_MATCHES = 5
\ No newline at end of file
@@ -1,15 +1,117 @@
 """
-Connects to the Postgres database by reading the DATABASE_URL
-and returning a psycopg.Connection.
+Connects to the Postgres database through shared pools of psycopg
+connections to DATABASE_URL, so that requests and jobs reuse open
+connections instead of paying the connection setup every time.
+
+The API's handlers are async and use `async_pool`, opened by the FastAPI
+lifespan (see backend/main.py). The worker is synchronous and uses `pool`,
+opened at startup (see backend/worker/main.py).
 """
 
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator
+
 import psycopg
 from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool, ConnectionPool
+
+from backend.config import (
+    DATABASE_URL,
+    DB_POOL_MIN_SIZE,
+    DB_POOL_MAX_SIZE,
+    DB_POOL_MAX_LIFETIME,
+    DB_POOL_TIMEOUT,
+)
+
+# Cursors should return dictionaries instead of arrays. Connections are
+# checked before being handed out, and replaced after max_lifetime seconds.
+pool = ConnectionPool(
+    DATABASE_URL,
+    min_size=DB_POOL_MIN_SIZE,
+    max_size=DB_POOL_MAX_SIZE,
+    max_lifetime=DB_POOL_MAX_LIFETIME,
+    timeout=DB_POOL_TIMEOUT,
+    kwargs={"row_factory": dict_row},
+    check=ConnectionPool.check_connection,
+    open=False,
+)
+
+# The same, for async code.
+async_pool = AsyncConnectionPool(
+    DATABASE_URL,
+    min_size=DB_POOL_MIN_SIZE,
+    max_size=DB_POOL_MAX_SIZE,
+    max_lifetime=DB_POOL_MAX_LIFETIME,
+    timeout=DB_POOL_TIMEOUT,
+    kwargs={"row_factory": dict_row},
+    check=AsyncConnectionPool.check_connection,
+    open=False,
+)
+
+
+def open_pool() -> None:
+    """
+    Open the pool. Its connections are established in the background, so
+    the process can start before the database is reachable.
+    """
+    pool.open()
+
+
+def close_pool() -> None:
+    """Close the pool and all of its connections."""
+    pool.close()
+
+
+@contextmanager
+def get_connection() -> Iterator[psycopg.Connection]:
+    """
+    Borrow a connection from the pool. As with a plain psycopg connection,
+    the transaction is committed when the block exits normally, and rolled
+    back if it raises.
+    """
+    with pool.connection() as conn:
+        yield conn
+
+
+async def open_async_pool() -> None:
+    """Open the async pool, establishing its connections in the background."""
+    await async_pool.open()
+
+
+async def close_async_pool() -> None:
+    """Close the async pool and all of its connections."""
+    await async_pool.close()
+
 
-from backend.config import DATABASE_URL
+@asynccontextmanager
+async def get_async_connection() -> AsyncIterator[psycopg.AsyncConnection]:
+    """
+    Borrow a connection from the async pool, committing when the block exits
+    normally and rolling back if it raises.
+    """
+    async with async_pool.connection() as conn:
+        yield conn
 
 
-def get_connection() -> psycopg.Connection:
-    # Cursors should return dictionaries instead of arrays.
-    conn = psycopg.connect(DATABASE_URL, row_factory=dict_row)
-    return conn
+def pool_metrics(which: ConnectionPool | AsyncConnectionPool = pool) -> dict:
+    """
+    Usage statistics of a pool, in particular how many requests for a
+    connection had to wait, and for how long.
+    """
+    stats = which.get_stats()
+    requests = stats.get("requests_num", 0)
+    wait_ms = stats.get("requests_wait_ms", 0)
+    return {
+        "size": stats.get("pool_size", 0),
+        "available": stats.get("pool_available", 0),
+        "waiting": stats.get("requests_waiting", 0),
+        "requests": requests,
+        "requests_queued": stats.get("requests_queued", 0),
+        "requests_timed_out": stats.get("requests_errors", 0),
+        "wait_ms_total": wait_ms,
+        "wait_ms_avg": wait_ms / requests if requests else 0.0,
+        "connections_opened": stats.get("connections_num", 0),
+        "connections_failed": stats.get("connections_errors", 0),
+        "connections_lost": stats.get("connections_lost", 0),
+        "bad_returns": stats.get("returns_bad", 0),
+    }
@@ -0,0 +1,138 @@
+"""
+Helper functions to insert season forecasts (from Monte Carlo simulations of
+the season) into simulations and query them given a simulation.
+"""
+
+from datetime import date
+
+import psycopg
+
+from backend.worker.monte_carlo import SeasonForecast
+
+# The places that qualify for the Champions League, and that are relegated.
+TOP_PLACES = 4
+RELEGATION_PLACES = 3
+
+
+def insert_forecast(conn: psycopg.Connection, simulation_id: int, forecast: SeasonForecast) -> None:
+    """
+    Given the season forecast for a simulation, insert one row per team
+    into the database, in a single COPY inside the caller's transaction.
+    """
+    with conn.cursor() as cur:
+        with cur.copy(
+            """
+            COPY team_forecast
+            (simulation_id, team_id, seasons, points_total, position_counts)
+            FROM STDIN
+            """
+        ) as copy:
+            for i, team in enumerate(forecast.teams):
+                copy.write_row(
+                    (
+                        simulation_id,
+                        team,
+                        forecast.seasons,
+                        int(forecast.points_total[i]),
+                        forecast.position_counts[i].tolist(),
+                    )
+                )
+
+
+async def get_forecast(conn: psycopg.AsyncConnection, simulation_id: int) -> list[dict]:
+    """
+    Given a simulation ID, return each team's season forecast, as the
+    probabilities of its finishing positions, ordered like a table by
+    expected points. Empty if the simulation has no forecast.
+    """
+    async with conn.cursor() as cur:
+        await cur.execute(
+            """
+            SELECT team_id, seasons, points_total, position_counts
+            FROM team_forecast
+            WHERE simulation_id = %s;
+            """,
+            (simulation_id,),
+        )
+        rows = await cur.fetchall()
+
+    return _team_forecasts(rows)
+
+
+def insert_forecast_history(
+    conn: psycopg.Connection, simulation_id: int, snapshots: list[tuple[date, SeasonForecast]]
+) -> None:
+    """
+    Given the as-of forecasts of a simulation (see
+    backend/worker/as_of.py), insert one row per team and date into the
+    database, in a single COPY inside the caller's transaction.
+    """
+    with conn.cursor() as cur:
+        with cur.copy(
+            """
+            COPY team_forecast_history
+            (simulation_id, as_of, team_id, seasons, points_total, position_counts)
+            FROM STDIN
+            """
+        ) as copy:
+            for as_of, forecast in snapshots:
+                for i, team in enumerate(forecast.teams):
+                    copy.write_row(
+                        (
+                            simulation_id,
+                            as_of,
+                            team,
+                            forecast.seasons,
+                            int(forecast.points_total[i]),
+                            forecast.position_counts[i].tolist(),
+                        )
+                    )
+
+
+async def get_forecast_history(conn: psycopg.AsyncConnection, simulation_id: int) -> list[dict]:
+    """
+    Given a simulation ID, return its as-of forecasts in date order, each
+    with every team's season forecast as of that date, like get_forecast.
+    Empty if the simulation has none.
+    """
+    async with conn.cursor() as cur:
+        await cur.execute(
+            """
+            SELECT as_of, team_id, seasons, points_total, position_counts
+            FROM team_forecast_history
+            WHERE simulation_id = %s
+            ORDER BY as_of;
+            """,
+            (simulation_id,),
+        )
+        rows = await cur.fetchall()
+
+    by_date = {}
+    for row in rows:
+        by_date.setdefault(row["as_of"], []).append(row)
+    return [{"as_of": as_of, "teams": _team_forecasts(teams)} for as_of, teams in by_date.items()]
+
+
+def _team_forecasts(rows: list[dict]) -> list[dict]:
+    """
+    Turn team_forecast rows into each team's probabilities of finishing in
+    every position, ordered like a table by expected points.
+    """
+    out = []
+    for row in rows:
+        seasons = max(row["seasons"], 1)
+        positions = [count / seasons for count in row["position_counts"]]
+        out.append(
+            {
+                "team_id": row["team_id"],
+                "seasons": row["seasons"],
+                "expected_points": row["points_total"] / seasons,
+                "p_title": positions[0],
+                "p_top4": sum(positions[:TOP_PLACES]),
+                "p_relegation": sum(positions[-RELEGATION_PLACES:]),
+                "positions": positions,
+            }
+        )
+
+    out.sort(key=lambda team: team["expected_points"], reverse=True)
+    return out
@@ -4,63 +4,131 @@ into the Redis queue more modular.
 """
 
 import psycopg
-from redis import Redis
+from psycopg.types.json import Jsonb
 from typing import Optional
 
-from backend.config import REDIS_URL
+from backend.config import JOB_QUEUE, JobType
+from backend.db.redis_client import async_redis
 
 
-def create_job_psql(conn: psycopg.Connection) -> int:
+async def create_job_psql(
+    conn: psycopg.AsyncConnection, job_type: JobType = JobType.PREDICT, params: dict | None = None
+) -> int:
     """
-    Creates a new job in the Postgres database and returns its job ID.
+    Creates a new job of the given type (with its parameters) in the
+    Postgres database and returns its job ID.
     """
-    with conn.cursor() as cur:
+    async with conn.cursor() as cur:
         # The default values are id, job_status, and created_at.
-        cur.execute("INSERT INTO job DEFAULT VALUES RETURNING id;")
-        row = cur.fetchone()
+        await cur.execute(
+            "INSERT INTO job (job_type, params) VALUES (%s, %s) RETURNING id;",
+            (job_type, Jsonb(params or {})),
+        )
+        row = await cur.fetchone()
 
-    conn.commit()
+    await conn.commit()
     return row["id"]
 
 
-def enqueue_job_hq(job_id: int) -> Optional[str]:
+async def create_sharded_job_psql(
+    conn: psycopg.AsyncConnection, job_type: JobType, params: dict, shard_type: JobType, shard_params: list[dict]
+) -> tuple[int, list[int]]:
+    """
+    Creates a job that is split into shards, and the shards themselves (one
+    per entry of `shard_params`, with a single multi-row INSERT), in one
+    transaction. Only the shards are enqueued: the job completes when the
+    last of them does.
+
+    Returns the job's ID and its shards' IDs in ascending order.
+    """
+    async with conn.cursor() as cur:
+        await cur.execute(
+            "INSERT INTO job (job_type, params) VALUES (%s, %s) RETURNING id;",
+            (job_type, Jsonb(params)),
+        )
+        job_id = (await cur.fetchone())["id"]
+        await cur.execute(
+            """INSERT INTO job (job_type, params, parent_id)
+            SELECT %s, shard_params, %s FROM unnest(%s::jsonb[]) AS shard_params
+            RETURNING id;""",
+            (shard_type, job_id, [Jsonb(p) for p in shard_params]),
+        )
+        rows = await cur.fetchall()
+
+    await conn.commit()
+    return job_id, sorted(row["id"] for row in rows)
+
+
+async def create_jobs_psql(conn: psycopg.AsyncConnection, count: int) -> list[int]:
+    """
+    Creates `count` new jobs in the Postgres database with a single
+    multi-row INSERT, and returns their job IDs in ascending order.
+    """
+    async with conn.cursor() as cur:
+        await cur.execute(
+            "INSERT INTO job (job_status) SELECT 'queued' FROM generate_series(1, %s) RETURNING id;",
+            (count,),
+        )
+        rows = await cur.fetchall()
+
+    await conn.commit()
+    return sorted(row["id"] for row in rows)
+
+
+async def enqueue_job_hq(job_id: int) -> Optional[str]:
     """
     After creating a new job in the Postgres database, enqueue the
     new job ID into the Redis queue.
 
+    Returns the error if the operation failed.
+    """
+    return await enqueue_jobs_hq([job_id])
+
+
+async def enqueue_jobs_hq(job_ids: list[int]) -> Optional[str]:
+    """
+    Enqueue several new job IDs into the Redis queue with a single command,
+    so that the first ID is the first to be taken by a worker.
+
     Returns the error if the operation failed.
     """
     try:
-        rd = Redis.from_url(REDIS_URL)
-        # Left push the job ID into Redis, prepending to the queue.
-        rd.lpush("queue", job_id)
+        # Left push the job IDs into Redis, prepending to the queue.
+        await async_redis.lpush(JOB_QUEUE, *job_ids)
     except Exception as e:
         return str(e)
 
 
-def fail_job_psql(conn: psycopg.Connection, job_id: int, error: str) -> None:
+async def fail_job_psql(conn: psycopg.AsyncConnection, job_id: int, error: str) -> None:
     """
     If enqueueing a job failed, update its job status to failed.
     """
-    with conn.cursor() as cur:
-        cur.execute(
+    await fail_jobs_psql(conn, [job_id], error)
+
+
+async def fail_jobs_psql(conn: psycopg.AsyncConnection, job_ids: list[int], error: str) -> None:
+    """
+    If enqueueing several jobs failed, update their job statuses to failed.
+    """
+    async with conn.cursor() as cur:
+        await cur.execute(
             """UPDATE job SET job_status = 'failed', finished_at = NOW(),
-            error = %s WHERE id = %s;""",
-            (error, job_id),
+            error = %s WHERE id = ANY(%s);""",
+            (error, job_ids),
         )
-    conn.commit()
+    await conn.commit()
 
 
-def get_job_info(conn: psycopg.Connection, job_id: int) -> tuple[str, int | None]:
+async def get_job_info(conn: psycopg.AsyncConnection, job_id: int) -> tuple[str, int | None]:
     """
     Given a specific job ID, returns the job's status and its corresponding
     simulation ID upon completion. This will be used to check if the job has
     finished and reached a terminal state, either successfully completing or
     failing, as well as to autopopulate the simulation select.
     """
-    with conn.cursor() as cur:
-        cur.execute("SELECT job_status, simulation_id FROM job WHERE id = %s;", (job_id,))
-        row = cur.fetchone()
+    async with conn.cursor() as cur:
+        await cur.execute("SELECT job_status, simulation_id FROM job WHERE id = %s;", (job_id,))
+        row = await cur.fetchone()
     
     if row is None:
         return "failed", None
@@ -13,37 +13,52 @@ def insert_predictions(
     """
     Given the season's predicted match outcomes for a given simulation,
     insert the predictions into the database.
+
+    All rows are streamed in a single COPY, inside the caller's transaction,
+    so the cost doesn't grow by a round trip per match.
     """
     with conn.cursor() as cur:
-        for match in predictions:
-            cur.execute(
-                """
-                INSERT INTO match
-                (simulation_id, match_date, home_id, away_id, p_home, p_draw, p_away, prediction, actual)
-                VALUES
-                (%s, %s, %s, %s, %s, %s, %s, %s, %s);
-                """,
-                (
-                    simulation_id,
-                    match.match_date,
-                    match.home_id,
-                    match.away_id,
-                    match.p_home,
-                    match.p_draw,
-                    match.p_away,
-                    match.prediction,
-                    match.actual,
-                ),
-            )
+        with cur.copy(
+            """
+            COPY match
+            (simulation_id, match_date, home_id, away_id, p_home, p_draw, p_away, prediction, actual)
+            FROM STDIN
+            """
+        ) as copy:
+            for match in predictions:
+                copy.write_row(
+                    (
+                        simulation_id,
+                        match.match_date,
+                        match.home_id,
+                        match.away_id,
+                        match.p_home,
+                        match.p_draw,
+                        match.p_away,
+                        match.prediction,
+                        match.actual,
+                    )
+                )
 
 
-def get_predictions(conn: psycopg.Connection, simulation_id: int) -> list[dict]:
+async def get_predictions(conn: psycopg.AsyncConnection, simulation_id: int) -> list[dict]:
     """
     Given a simulation ID, return all the match predictions associated
-    with the simulation.
+    with the simulation, in chronological order.
     """
-    with conn.cursor() as cur:
-        cur.execute("SELECT * FROM match WHERE simulation_id = %s;", (simulation_id,))
-        out = cur.fetchall()
+    async with conn.cursor() as cur:
+        # Only the columns of the Match schema, in match order. Both the
+        # filter and the order are served by the (simulation_id, match_date)
+        # index.
+        await cur.execute(
+            """
+            SELECT match_date, home_id, away_id, p_home, p_draw, p_away, prediction, actual
+            FROM match
+            WHERE simulation_id = %s
+            ORDER BY match_date, id;
+            """,
+            (simulation_id,),
+        )
+        out = await cur.fetchall()
 
     return out
@@ -0,0 +1,35 @@
+"""
+Shared, pooled clients for the Redis instance at REDIS_URL, so that each
+process reuses its open connections to Redis instead of connecting for
+every enqueue, publish, or pop.
+
+The API uses `async_redis`, closed by the FastAPI lifespan (see
+backend/main.py). The worker is synchronous and uses `redis_client`. Both
+connect lazily, and the pools are safe to use after forking (see
+backend/worker/supervisor.py).
+"""
+
+from redis import Redis, BlockingConnectionPool
+from redis.asyncio import Redis as AsyncRedis, BlockingConnectionPool as AsyncBlockingConnectionPool
+
+from backend.config import REDIS_URL, REDIS_MAX_CONNECTIONS, REDIS_POOL_TIMEOUT
+
+# When all connections are in use, wait up to REDIS_POOL_TIMEOUT seconds
+# for one to be returned rather than failing right away.
+redis_client = Redis.from_pool(
+    BlockingConnectionPool.from_url(
+        REDIS_URL, max_connections=REDIS_MAX_CONNECTIONS, timeout=REDIS_POOL_TIMEOUT
+    )
+)
+
+# The same, for async code.
+async_redis = AsyncRedis.from_pool(
+    AsyncBlockingConnectionPool.from_url(
+        REDIS_URL, max_connections=REDIS_MAX_CONNECTIONS, timeout=REDIS_POOL_TIMEOUT
+    )
+)
+
+
+async def close_async_redis() -> None:
+    """Close the async client's pool and all of its connections."""
+    await async_redis.aclose()
@@ -18,36 +18,57 @@ def create_simulation(conn: psycopg.Connection) -> int:
     return row["id"]
 
 
-def list_simulations(conn: psycopg.Connection) -> list[tuple]:
+async def list_simulations(conn: psycopg.AsyncConnection, limit: int | None = None, after: int = 0) -> list[tuple]:
     """
-    Lists all simulations in the database.
+    Lists the simulations in the database, oldest first, using keyset
+    pagination: only the simulations with an ID greater than `after` are
+    returned, at most `limit` of them (None = no limit). The next page
+    starts after the last ID of this one.
     """
-    with conn.cursor() as cur:
-        cur.execute("SELECT * FROM simulation;")
-        answer = cur.fetchall()
+    async with conn.cursor() as cur:
+        # LIMIT NULL means no limit. Served by the primary key index, so a
+        # page costs the same no matter how many simulations exist.
+        await cur.execute(
+            "SELECT id, created_at FROM simulation WHERE id > %s ORDER BY id LIMIT %s;",
+            (after, limit),
+        )
+        answer = await cur.fetchall()
 
     return answer
 
 
-def get_simulation(conn: psycopg.Connection, simulation_id: int) -> tuple:
+async def get_latest_simulation_id(conn: psycopg.AsyncConnection) -> int:
+    """
+    Returns the ID of the most recent simulation, or -1 if there are no
+    simulations in the database. Reads a single entry of the primary key
+    index rather than the whole table.
+    """
+    async with conn.cursor() as cur:
+        await cur.execute("SELECT id FROM simulation ORDER BY id DESC LIMIT 1;")
+        row = await cur.fetchone()
+
+    return row["id"] if row else -1
+
+
+async def get_simulation(conn: psycopg.AsyncConnection, simulation_id: int) -> tuple:
     """
     Given a specific simulation ID, return the simulation from the database.
     """
-    with conn.cursor() as cur:
-        cur.execute("SELECT * FROM simulation WHERE id = %s;", (simulation_id,))
-        answer = cur.fetchone()
+    async with conn.cursor() as cur:
+        await cur.execute("SELECT * FROM simulation WHERE id = %s;", (simulation_id,))
+        answer = await cur.fetchone()
 
     return answer
 
-def clear_database(conn: psycopg.Connection) -> None:
+async def clear_database(conn: psycopg.AsyncConnection) -> None:
     """
-    Completely empties the simulation, match, and standing tables. Also
-    restarts their auto-incrementing IDs and clears dependent tables.
-    
-    Returns true if successful.
+    Completely empties the simulation, match, and standing tables, and
+    clears dependent tables.
+
+    The auto-incrementing IDs are not restarted, so a simulation ID is never
+    reused: clients may cache a simulation's results by its ID indefinitely.
     """
-    with conn.cursor() as cur:
-        cur.execute("""TRUNCATE TABLE simulation, match, standing, job
-                    RESTART IDENTITY
+    async with conn.cursor() as cur:
+        await cur.execute("""TRUNCATE TABLE simulation, match, standing, team_forecast, job
                     CASCADE;""")
-        conn.commit()
\ No newline at end of file
+        await conn.commit()
\ No newline at end of file
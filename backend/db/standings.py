@@ -13,38 +13,49 @@ def insert_standings(
     """
     Given the computed standings for a simulation, insert the standings into
     the database.
+
+    All rows are streamed in a single COPY, inside the caller's transaction.
     """
     with conn.cursor() as cur:
-        for standing in standings:
-            cur.execute(
-                f"""
-                INSERT INTO standing
-                (simulation_id, team_id, position, played, won, drew, lost, points)
-                VALUES
-                (%s, %s, %s, %s, %s, %s, %s, %s);
-                """,
-                (
-                    simulation_id,
-                    standing.team_id,
-                    standing.position,
-                    standing.played,
-                    standing.won,
-                    standing.drew,
-                    standing.lost,
-                    standing.points,
-                ),
-            )
+        with cur.copy(
+            """
+            COPY standing
+            (simulation_id, team_id, position, played, won, drew, lost, points)
+            FROM STDIN
+            """
+        ) as copy:
+            for standing in standings:
+                copy.write_row(
+                    (
+                        simulation_id,
+                        standing.team_id,
+                        standing.position,
+                        standing.played,
+                        standing.won,
+                        standing.drew,
+                        standing.lost,
+                        standing.points,
+                    )
+                )
 
 
-def get_standings(conn: psycopg.Connection, simulation_id: int) -> list[Standing]:
+async def get_standings(conn: psycopg.AsyncConnection, simulation_id: int) -> list[Standing]:
     """
     Given a simulation ID, return all the table standings associated
-    with the simulation.
+    with the simulation, from first to last position.
     """
-    with conn.cursor() as cur:
-        cur.execute(
-            "SELECT * FROM standing WHERE simulation_id = %s;", (simulation_id,)
+    async with conn.cursor() as cur:
+        # Only the columns of the Standing schema, in table order, served by
+        # the (simulation_id, position) index.
+        await cur.execute(
+            """
+            SELECT position, team_id, played, won, drew, lost, points
+            FROM standing
+            WHERE simulation_id = %s
+            ORDER BY position;
+            """,
+            (simulation_id,),
         )
-        out = cur.fetchall()
+        out = await cur.fetchall()
 
     return out
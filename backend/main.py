@@ -1,14 +1,42 @@
 """Entry point for backend."""
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, HTTPException
+from backend.api.events import job_events
+from backend.api.predict import fixture_predictions
 from backend.api.routes import router as api_router
+from backend.db.connection import async_pool, open_async_pool, close_async_pool, pool_metrics
+from backend.db.redis_client import close_async_redis
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the database connection pool for the lifetime of the app.
+    await open_async_pool()
+    # Listen for the job status events published by the worker.
+    job_events.start()
+    # The model and features for GET /api/predict are loaded with the first
+    # request for a prediction.
+    yield
+    await fixture_predictions.stop()
+    await job_events.stop()
+    await close_async_pool()
+    await close_async_redis()
 
-app = FastAPI(title="Premier League Predictor API")
+
+app = FastAPI(title="Premier League Predictor API", lifespan=lifespan)
 
 # Include all API routes.
 app.include_router(api_router, prefix="/api")
 
 
 @app.get("/api/health")
-def health():
+async def health():
     return {"status": "ok"}
+
+
+@app.get("/api/health/db")
+async def health_db():
+    """Usage statistics of the database connection pool."""
+    return pool_metrics(async_pool)
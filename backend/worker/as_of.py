@@ -0,0 +1,127 @@
+"""
+As-of ("time travel") forecasts: what the model would have forecast for the
+rest of the season at the start of every matchweek played so far, to follow
+how the forecast drifted over the season.
+
+As of a date, only the matches before it are known: they give the teams'
+points so far, and the features of every other fixture of the season come
+from them alone, through the FeatureIndex (see model/feature_index.py),
+instead of rebuilding the features up to every date. The fixtures of all
+the dates are predicted in a single call to the model, and then simulated
+like a Monte Carlo job (see monte_carlo.py). Every date uses the same seed,
+so the forecasts only differ by what was known on each date, and not by
+sampling noise.
+"""
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from backend.worker.monte_carlo import POINTS, SeasonForecast, simulate_seasons
+from backend.worker.predictor import Predictor, team_to_id
+from backend.worker.rollout import OUTCOMES
+from model.config import END_YEAR, NUM_SEASONS, SPORTSBOOK, N_MATCHES
+from model.feature_index import FeatureIndex
+from model.load_data import get_data_only
+
+
+def build_index(predictor: Predictor) -> FeatureIndex:
+    """Index the historical seasons and the current season's matches so far."""
+    history = get_data_only(END_YEAR, NUM_SEASONS, SPORTSBOOK)
+    return FeatureIndex(pd.concat([history, predictor.current_matches], ignore_index=True), N_MATCHES)
+
+
+def matchweek_starts(dates: pd.Series, matches_per_week: int) -> list[pd.Timestamp]:
+    """
+    The date of the first match of every matchweek played so far, taking
+    each `matches_per_week` matches in date order as a matchweek, followed
+    by the day after the last match (i.e., now).
+    """
+    dates = pd.to_datetime(dates).dropna().sort_values()
+    if dates.empty:
+        return []
+    starts = list(dates.iloc[::matches_per_week].drop_duplicates())
+    return starts + [dates.iloc[-1] + pd.Timedelta(days=1)]
+
+
+def as_of_forecasts(
+    predictor: Predictor, index: FeatureIndex, seasons: int, seed: int
+) -> list[tuple[date, SeasonForecast]]:
+    """
+    Forecast the season as of the start of every matchweek so far, each by
+    simulating the fixtures not played by then `seasons` times.
+
+    Returns:
+        The date and forecast of every matchweek, in date order.
+    """
+    teams = predictor.teams
+    team_index = {team: i for i, team in enumerate(teams)}
+    played = predictor.current_matches
+    played = played[played["result"].isin(list(OUTCOMES))]
+    dates = played["date"].to_numpy()
+    played_home = played["home_team"].map(team_index).to_numpy(dtype=np.int64)
+    played_away = played["away_team"].map(team_index).to_numpy(dtype=np.int64)
+    played_outcome = played["result"].map(OUTCOMES).to_numpy(dtype=np.int64)
+    season = predictor.season
+
+    # Every fixture of a double round robin.
+    home, away = np.nonzero(~np.eye(len(teams), dtype=bool))
+
+    # The points each team had as of every date, and the fixtures not played
+    # by then, which are all predicted at once.
+    starts = matchweek_starts(played["date"], len(teams) // 2)
+    if not starts:
+        # No matchweek has been played yet.
+        return []
+    points, fixtures = [], []
+    for start in starts:
+        known = dates < np.datetime64(start)
+        team_points = np.zeros(len(teams), dtype=np.int32)
+        np.add.at(team_points, played_home[known], POINTS[played_outcome[known]])
+        np.add.at(team_points, played_away[known], POINTS[played_outcome[known] + 3])
+        points.append(team_points)
+
+        done = set(zip(played_home[known].tolist(), played_away[known].tolist()))
+        fixtures.append(np.array([(h, a) not in done for h, a in zip(home.tolist(), away.tolist())]))
+
+    probs = predict_fixtures(
+        predictor, index, starts, [home[left] for left in fixtures], [away[left] for left in fixtures], season
+    )
+
+    ids = [team_to_id[team] for team in teams]
+    out = []
+    for start, team_points, left, start_probs in zip(starts, points, fixtures, probs):
+        forecast = simulate_seasons(home[left], away[left], start_probs, ids, seasons, seed, points=team_points)
+        out.append((start.date(), forecast))
+    return out
+
+
+def predict_fixtures(
+    predictor: Predictor,
+    index: FeatureIndex,
+    starts: list[pd.Timestamp],
+    homes: list[np.ndarray],
+    aways: list[np.ndarray],
+    season: float,
+) -> list[np.ndarray]:
+    """
+    The (n_fixtures, 3) outcome probabilities of each date's fixtures (given
+    as indices into predictor.teams), as of that date, with a single call to
+    the model.
+    """
+    teams = np.array(predictor.teams)
+    home, away = np.concatenate(homes), np.concatenate(aways)
+    dates = np.repeat(np.array(starts, dtype="datetime64[ns]"), [len(h) for h in homes])
+    df = index.features(teams[home], teams[away], dates, np.full(len(home), season))
+
+    # Match-level features (odds, possession, and valuations) aren't known
+    # ahead of the match, so they are imputed with their historical mean,
+    # like the Predictor does for the current season.
+    for col in predictor.feature_cols:
+        if col not in df.columns:
+            df[col] = predictor.state.feature_means.get(col, np.nan)
+
+    classes = list(predictor.model.classes_)
+    probs = predictor.model.predict_proba(df[predictor.feature_cols])[:, [classes.index(k) for k in (0, 1, 2)]]
+    return np.split(probs, np.cumsum([len(h) for h in homes])[:-1])
@@ -0,0 +1,173 @@
+"""
+Takes jobs from the Redis queue so that none are lost when a worker dies.
+
+A worker atomically moves each job ID it takes from JOB_QUEUE to the
+JOB_PROCESSING_QUEUE list, and only removes it from there once the job has
+completed or failed. While a job runs, the worker holds a lease on it in the
+job table (see start_job), which a background thread keeps extending.
+
+If the worker crashes or is killed, the lease expires, and the reaper (run
+periodically by every worker) puts the job back in the queue, or fails it
+once it has used up its attempts. The reaper also cleans up job IDs left in
+the processing list by a worker that died before starting or after finishing
+its job.
+"""
+
+from contextlib import contextmanager
+import logging
+import threading
+from typing import Iterator
+
+from backend.config import (
+    JOB_QUEUE,
+    JOB_PROCESSING_QUEUE,
+    JOB_LEASE_DURATION,
+    JOB_HEARTBEAT_INTERVAL,
+    JobStatus,
+)
+from backend.db.connection import get_connection
+from backend.db.redis_client import redis_client as rd
+from backend.worker.jobs import extend_lease, retry_or_fail_job, merge_shards
+
+logger = logging.getLogger(__name__)
+
+def claim_job(timeout: float) -> int | None:
+    """
+    Blocks until a job is in the queue (or `timeout` seconds pass), and moves
+    its ID from the queue to the processing list in one step, so it cannot
+    be lost in between. Returns the job ID, or None on timeout.
+    """
+    # Jobs are pushed on the left, so the oldest job is on the right.
+    raw = rd.blmove(JOB_QUEUE, JOB_PROCESSING_QUEUE, timeout, "RIGHT", "LEFT")
+    return int(raw) if raw is not None else None
+
+
+def ack_job(job_id: int) -> None:
+    """Removes a job that is done with from the processing list."""
+    rd.lrem(JOB_PROCESSING_QUEUE, 1, job_id)
+
+
+def requeue_job(job_id: int) -> None:
+    """Moves a job from the processing list back to the queue."""
+    with rd.pipeline() as pipe:
+        pipe.lrem(JOB_PROCESSING_QUEUE, 1, job_id)
+        pipe.lpush(JOB_QUEUE, job_id)
+        pipe.execute()
+
+
+def release_job(job_id: int, attempt: int, error: str) -> str | None:
+    """
+    Gives up on an attempt at a job: puts it back in the queue if it has
+    attempts left, and fails it otherwise. Returns its new status.
+    """
+    status = retry_or_fail_job(job_id, attempt, error)
+    if status == JobStatus.QUEUED:
+        requeue_job(job_id)
+    elif status == JobStatus.FAILED:
+        ack_job(job_id)
+    return status
+
+
+@contextmanager
+def lease(job_id: int, attempt: int) -> Iterator[None]:
+    """
+    Keeps extending the lease on a job from a background thread for the
+    duration of the block.
+    """
+    done = threading.Event()
+
+    def heartbeat():
+        while not done.wait(JOB_HEARTBEAT_INTERVAL):
+            try:
+                if not extend_lease(job_id, attempt):
+                    logger.warning("Lost the lease on job %d (attempt %d)", job_id, attempt)
+                    return
+            except Exception as e:
+                # Try again on the next beat, the lease may not expire yet.
+                logger.warning("Could not extend the lease on job %d: %s", job_id, e)
+
+    thread = threading.Thread(target=heartbeat, name=f"lease-{job_id}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        done.set()
+        thread.join()
+
+
+def reap_expired_jobs() -> None:
+    """
+    Retries or fails every running job whose lease expired, finishes sharded
+    jobs whose last shard's worker died before merging them, and cleans up
+    the processing list. Safe to run from several workers at once, since a
+    job is only moved if it is still in the state the reaper saw.
+    """
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """SELECT id, attempts FROM job
+                WHERE job_status = 'running' AND lease_expires_at < NOW();"""
+            )
+            expired = cur.fetchall()
+            cur.execute(
+                """SELECT parent.id FROM job parent
+                WHERE parent.job_status IN ('queued', 'running')
+                AND EXISTS (SELECT 1 FROM job shard WHERE shard.parent_id = parent.id)
+                AND NOT EXISTS (
+                    SELECT 1 FROM job shard
+                    WHERE shard.parent_id = parent.id AND shard.job_status IN ('queued', 'running')
+                );"""
+            )
+            unmerged = cur.fetchall()
+
+    for row in expired:
+        status = release_job(row["id"], row["attempts"], "Lease expired, the worker likely died")
+        if status is not None:
+            logger.warning("Job %d lease expired on attempt %d, now %s", row["id"], row["attempts"], status)
+
+    for row in unmerged:
+        merge_shards(row["id"])
+
+    _reap_processing_list()
+
+
+def _reap_processing_list() -> None:
+    """
+    Handles the job IDs in the processing list that no worker is working on:
+    those whose job already completed or failed are removed, and those whose
+    job never started are put back in the queue.
+
+    A job that was taken but not started yet is given a lease the first time
+    the reaper sees it, and is only put back once that lease expires, so the
+    reaper doesn't race a worker that is just starting it.
+    """
+    job_ids = [int(raw) for raw in rd.lrange(JOB_PROCESSING_QUEUE, 0, -1)]
+    if not job_ids:
+        return
+
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """UPDATE job SET lease_expires_at = NOW() + make_interval(secs => %s)
+                WHERE id = ANY(%s) AND job_status = 'queued' AND lease_expires_at IS NULL;""",
+                (JOB_LEASE_DURATION, job_ids),
+            )
+            cur.execute(
+                """UPDATE job SET lease_expires_at = NULL
+                WHERE id = ANY(%s) AND job_status = 'queued' AND lease_expires_at < NOW()
+                RETURNING id;""",
+                (job_ids,),
+            )
+            unstarted = [row["id"] for row in cur.fetchall()]
+            cur.execute(
+                "SELECT id FROM job WHERE id = ANY(%s) AND job_status IN ('queued', 'running');",
+                (job_ids,),
+            )
+            active = {row["id"] for row in cur.fetchall()}
+        conn.commit()
+
+    for job_id in unstarted:
+        logger.warning("Job %d was taken but never started, requeuing it", job_id)
+        requeue_job(job_id)
+    for job_id in set(job_ids) - active:
+        ack_job(job_id)
@@ -1,106 +1,439 @@
-from backend.db.connection import get_connection
+import json
+import logging
+import time
+
+import psycopg
+from psycopg.types.json import Jsonb
+
+from backend.api.schemas import Match
+from backend.db.connection import get_connection, pool_metrics
+from backend.db.redis_client import redis_client
 from backend.db.predictions import insert_predictions
 from backend.db.simulations import create_simulation
 from backend.db.standings import insert_standings
-from backend.worker.predictor import Predictor
-from backend.worker.generate_table import compute_standings
-from backend.config import JobStatus
+from backend.worker.predictor import predictor_service
+from backend.db.forecasts import insert_forecast, insert_forecast_history
+from backend.worker.generate_table import compute_standings, get_teams
+from backend.worker.monte_carlo import SeasonForecast, match_arrays, simulate_seasons
+from backend.worker.rollout import SeasonRollout
+from backend.worker.as_of import as_of_forecasts, build_index
+from backend.config import JOB_EVENTS_CHANNEL, JOB_LEASE_DURATION, JobStatus, JobType
 
+logger = logging.getLogger(__name__)
 
-def _get_job_status(job_id: int) -> str:
+def _update_job(job_id: int, query: str, params: tuple) -> dict | None:
     """
-    Interacts with the PostgreSQL database to retrieve the status corresponding
-    to the given job ID. Used for validating status updates.
+    Interacts with the PostgreSQL database to move the given job to a new
+    status. The query should update the job only if it is still in the
+    expected state, and return its new status and simulation ID.
+
+    Returns the updated row, or None if the job was not updated.
     """
     # Connect to PostgreSQL database via psycopg connection.
     with get_connection() as conn:
         with conn.cursor() as cur:
-            cur.execute("SELECT job_status FROM job WHERE id = %s;", (job_id,))
+            cur.execute(query, params)
             row = cur.fetchone()
-    return row["job_status"]
+
+        conn.commit()
+
+    # Let the API stream the change to the clients watching this job.
+    if row is not None:
+        _publish_status(job_id, row["job_status"], row["simulation_id"])
+    return row
 
 
-def _update_job(job_id: int, status: str) -> None:
+def _publish_status(job_id: int, status: str, simulation_id: int | None) -> None:
     """
-    Interacts with the PostgreSQL database to update the status corresponding
-    to the given job ID. Also updates the corresponding timestamp for the job
-    with the current time.
+    Publish a job's new status to its Redis channel (see backend/api/events.py),
+    in the same shape as GET /api/jobs. The database stays the source of
+    truth, so a failure to publish doesn't fail the job.
     """
-    # Connect to PostgreSQL database via psycopg connection.
-    with get_connection() as conn:
-        with conn.cursor() as cur:
-            # Update the job status and timestamp.
-            # Note that the column name will differ based on the new job status.
-            if status == JobStatus.RUNNING:
-                cur.execute(
-                    """UPDATE job
-                    SET job_status = 'running', started_at = NOW()
-                    WHERE id = %s""",
-                    (job_id,),
-                )
-            elif status == JobStatus.COMPLETED:
-                cur.execute(
-                    """UPDATE job
-                    SET job_status = 'completed', finished_at = NOW()
-                    WHERE id = %s""",
-                    (job_id,),
-                )
-            else:
-                # If a job is being updated to something other than "running",
-                # or "completed", it is not a valid job.
-                return -1
-        
-        conn.commit()
+    event = {"ok": True, "jobStatus": str(status), "simulationId": simulation_id}
+    try:
+        redis_client.publish(f"{JOB_EVENTS_CHANNEL}:{job_id}", json.dumps(event))
+    except Exception as e:
+        logger.warning("Could not publish the status of job %d: %s", job_id, e)
 
 
-def start_job(job_id: int) -> None:
+def start_job(job_id: int) -> dict | None:
     """
-    Takes a previously 'queued' job and changes its status to 'running'.
+    Takes a previously 'queued' job and changes its status to 'running',
+    giving this worker a lease on it for JOB_LEASE_DURATION seconds.
+
+    Returns the job's type, parameters, parent job (for shards), and attempt
+    number, which the worker uses to prove it still holds the lease when it
+    finishes the job. Returns None if the job was not 'queued', e.g.,
+    because another worker already took it.
     """
     # A job that was not previously in the 'queued' status cannot
     # now become 'running'.
-    if _get_job_status(job_id) == JobStatus.QUEUED:
-        return _update_job(job_id, JobStatus.RUNNING)
+    row = _update_job(
+        job_id,
+        """UPDATE job
+        SET job_status = 'running', started_at = NOW(), attempts = attempts + 1,
+            lease_expires_at = NOW() + make_interval(secs => %s)
+        WHERE id = %s AND job_status = 'queued'
+        RETURNING job_status, simulation_id, attempts, job_type, params, parent_id""",
+        (JOB_LEASE_DURATION, job_id),
+    )
+    return row
+
+
+def extend_lease(job_id: int, attempt: int) -> bool:
+    """
+    Extends the lease on a running job by JOB_LEASE_DURATION seconds.
+
+    Returns False if the lease was lost, i.e., the job was given to another
+    worker (or failed) after the lease expired.
+    """
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """UPDATE job
+                SET lease_expires_at = NOW() + make_interval(secs => %s)
+                WHERE id = %s AND job_status = 'running' AND attempts = %s""",
+                (JOB_LEASE_DURATION, job_id, attempt),
+            )
+            extended = cur.rowcount == 1
+        conn.commit()
+    return extended
 
 
-def do_job(job_id: int) -> None:
+def do_job(
+    job_id: int,
+    attempt: int,
+    job_type: str = JobType.PREDICT,
+    params: dict | None = None,
+    parent_id: int | None = None,
+) -> None:
     """
-    For a given job ID, reates a Predictor object to predict all match
-    outcomes for the season, compute table standings, and then save the
-    results to a new simulation in the database.
+    For a given job ID, uses the worker's resident predictor to predict all
+    match outcomes for the season, compute table standings, and then save the
+    results to a new simulation in the database and complete the job, as
+    long as this worker still holds its lease (see finish_job).
+
+    Monte Carlo jobs also simulate the season `params["seasons"]` times from
+    the predicted probabilities (seeded with `params["seed"]`), and save the
+    resulting season forecast with the simulation. Monte Carlo shards only
+    simulate their blocks of seasons (see do_shard). Rollout jobs forecast
+    the season by rolling the remaining fixtures out instead (see
+    rollout_season), and as-of jobs forecast it as of every matchweek so
+    far, keeping the latest as the simulation's forecast (see
+    forecast_history).
     """
-    # Start the simulation, predict match outcomes, and compute table
-    # standings. These are the heavy computations.
-    predictor = Predictor()
+    params = params or {}
+    if job_type == JobType.MONTE_CARLO_SHARD:
+        return do_shard(job_id, attempt, params, parent_id)
+
+    start = time.perf_counter()
+
+    # Bring the predictor up to date. This only reloads what changed since
+    # the last job (see PredictorService), so it is usually cheap.
+    predictor = predictor_service.refresh()
+    refreshed = time.perf_counter()
+
+    # Predict match outcomes, and compute table standings.
     matches = predictor.predict_current_season()
     standings = compute_standings(matches)
-    
-    # Create new simulation ID and save the results to database.
-    try:
-        with get_connection() as conn:
-            with conn.transaction():
-                # Create a new simulation in the database.
-                simulation_id = create_simulation(conn)
-                # Insert the match predictions and table standings for this
-                # simulation.
-                insert_predictions(conn, simulation_id, matches)
-                insert_standings(conn, simulation_id, standings)
-                # Update the simulation ID for this job.
+    predicted = time.perf_counter()
+
+    forecast = None
+    history = None
+    if job_type == JobType.MONTE_CARLO:
+        forecast = forecast_season(matches, params["seasons"], params["seed"])
+    elif job_type == JobType.ROLLOUT:
+        forecast = rollout_season(predictor, params["seasons"], params["seed"], params.get("sample", True))
+    elif job_type == JobType.AS_OF:
+        history = forecast_history(predictor, params["seasons"], params["seed"])
+        if history:
+            forecast = history[-1][1]
+    simulated = time.perf_counter()
+
+    # Create new simulation ID and save the results to database, in the same
+    # transaction as completing the job. If this fails, the caller retries
+    # or fails the job (see retry_or_fail_job).
+    finish_job(
+        job_id,
+        attempt,
+        lambda conn: _save_simulation(conn, job_id, matches, standings, forecast, history),
+    )
+
+    saved = time.perf_counter()
+    logger.info(
+        "Job %d (%s) took %.3fs (refresh %.3fs, predict %.3fs, simulate %.3fs, save %.3fs, avg pool wait %.1fms)",
+        job_id,
+        job_type,
+        saved - start,
+        refreshed - start,
+        predicted - refreshed,
+        simulated - predicted,
+        saved - simulated,
+        pool_metrics()["wait_ms_avg"],
+    )
+
+
+def _save_simulation(
+    conn,
+    job_id: int,
+    matches: list,
+    standings: list,
+    forecast: SeasonForecast | None,
+    history: list | None = None,
+) -> int:
+    """
+    Within the caller's transaction, create a new simulation with the given
+    results, and attach it to the job. Returns the simulation ID.
+    """
+    # Create a new simulation in the database.
+    simulation_id = create_simulation(conn)
+    # Insert the match predictions and table standings for this
+    # simulation.
+    insert_predictions(conn, simulation_id, matches)
+    insert_standings(conn, simulation_id, standings)
+    if forecast is not None:
+        insert_forecast(conn, simulation_id, forecast)
+    if history:
+        insert_forecast_history(conn, simulation_id, history)
+    # Update the simulation ID for this job.
+    with conn.cursor() as cur:
+        cur.execute("UPDATE job SET simulation_id = %s WHERE id = %s;", (simulation_id, job_id))
+    return simulation_id
+
+
+def forecast_season(matches: list, seasons: int, seed: int, blocks: range = None) -> SeasonForecast:
+    """
+    Simulate the season `seasons` times (or only the given blocks of those
+    seasons) from the predicted match outcome probabilities, and log the
+    throughput.
+    """
+    start = time.perf_counter()
+    teams = get_teams()
+    forecast = simulate_seasons(*match_arrays(matches, teams), teams, seasons, seed, blocks)
+    elapsed = time.perf_counter() - start
+    logger.info(
+        "Simulated %d seasons of %d matches in %.3fs (%.0f seasons/s)",
+        forecast.seasons,
+        len(matches),
+        elapsed,
+        forecast.seasons / elapsed,
+    )
+    return forecast
+
+
+def rollout_season(predictor, seasons: int, seed: int, sample: bool = True) -> SeasonForecast:
+    """
+    Roll the rest of the season out `seasons` times from the predictor's
+    current state, and log the throughput.
+    """
+    start = time.perf_counter()
+    rollout = SeasonRollout(predictor)
+    forecast = rollout.run(seasons, seed, sample)
+    elapsed = time.perf_counter() - start
+    logger.info(
+        "Rolled out %d seasons of %d remaining matches (%d matchweeks) in %.3fs (%.0f seasons/s)",
+        forecast.seasons,
+        len(rollout.home),
+        len(rollout.bounds) - 1,
+        elapsed,
+        forecast.seasons / elapsed,
+    )
+    return forecast
+
+
+def forecast_history(predictor, seasons: int, seed: int) -> list:
+    """
+    Forecast the season as of the start of every matchweek so far, each from
+    `seasons` simulated seasons, and log the throughput.
+    """
+    start = time.perf_counter()
+    history = as_of_forecasts(predictor, build_index(predictor), seasons, seed)
+    elapsed = time.perf_counter() - start
+    logger.info(
+        "Forecast the season as of %d matchweeks (%d seasons each) in %.3fs",
+        len(history),
+        seasons,
+        elapsed,
+    )
+    return history
+
+
+def do_shard(job_id: int, attempt: int, params: dict, parent_id: int) -> None:
+    """
+    Simulate one shard of a Monte Carlo job: the blocks of seasons in
+    `params["blocks"]`, out of `params["seasons"]`. The partial forecast is
+    kept with the shard as it completes, for the last shard to finish to
+    merge (see merge_shards).
+    """
+    # The parent job is running as soon as any of its shards is.
+    _update_job(
+        parent_id,
+        """UPDATE job SET job_status = 'running', started_at = NOW()
+        WHERE id = %s AND job_status = 'queued'
+        RETURNING job_status, simulation_id""",
+        (parent_id,),
+    )
+
+    matches = _shard_matches(parent_id)
+    forecast = forecast_season(matches, params["seasons"], params["seed"], range(*params["blocks"]))
+
+    def save(conn) -> None:
+        with conn.cursor() as cur:
+            cur.execute("UPDATE job SET result = %s WHERE id = %s;", (Jsonb(forecast.to_dict()), job_id))
+
+    finish_job(job_id, attempt, save)
+
+
+def _shard_matches(parent_id: int) -> list[Match]:
+    """
+    The predicted matches that every shard of the given job simulates. The
+    first shard to run predicts them and pins them in the job's result, so
+    the shards (whichever worker runs them, and either side of a refresh of
+    the data or the model) and the merge all use the same probabilities,
+    and the forecast only depends on the seed.
+    """
+    with get_connection() as conn:
+        with conn.transaction():
+            with conn.cursor() as cur:
+                # Locked, so that when several shards start at once, only
+                # one of them predicts.
+                cur.execute("SELECT result FROM job WHERE id = %s FOR UPDATE;", (parent_id,))
+                parent = cur.fetchone()
+                if parent is None:
+                    raise LookupError(f"Job {parent_id} no longer exists")
+                if parent["result"] is not None:
+                    return [Match.model_validate(m) for m in parent["result"]["matches"]]
+
+                matches = predictor_service.refresh().predict_current_season()
+                result = {"matches": [m.model_dump(mode="json") for m in matches]}
+                cur.execute("UPDATE job SET result = %s WHERE id = %s;", (Jsonb(result), parent_id))
+    return matches
+
+
+def merge_shards(parent_id: int) -> None:
+    """
+    If any shard of the given job failed, fail the job. Otherwise, once every
+    shard has completed, merge their partial forecasts into a new simulation
+    for the job, and complete it.
+
+    The job's row is locked while merging, so that when several shards
+    finish at once, only one of them merges.
+    """
+    with get_connection() as conn:
+        with conn.transaction():
+            with conn.cursor() as cur:
+                cur.execute("SELECT job_status, result FROM job WHERE id = %s FOR UPDATE;", (parent_id,))
+                parent = cur.fetchone()
+                if parent is None or parent["job_status"] not in (JobStatus.QUEUED, JobStatus.RUNNING):
+                    return
+                cur.execute("SELECT job_status, result FROM job WHERE parent_id = %s ORDER BY id;", (parent_id,))
+                shards = cur.fetchall()
+
+            statuses = {shard["job_status"] for shard in shards}
+            if not shards or (JobStatus.FAILED not in statuses and statuses != {JobStatus.COMPLETED}):
+                return
+
+            if JobStatus.FAILED in statuses:
+                status, simulation_id = JobStatus.FAILED, None
                 with conn.cursor() as cur:
-                    cur.execute("UPDATE job SET simulation_id = %s WHERE id = %s;", (simulation_id, job_id))
-    except Exception as e:
-        # If the job failed, update the error description for this job.
-        with get_connection() as conn:
+                    cur.execute(
+                        """UPDATE job SET job_status = 'failed', finished_at = NOW(), error = 'A shard failed'
+                        WHERE id = %s;""",
+                        (parent_id,),
+                    )
+            else:
+                # Counts add up exactly, so the order of the shards doesn't
+                # matter.
+                forecast = SeasonForecast.from_dict(shards[0]["result"])
+                for shard in shards[1:]:
+                    forecast = forecast.merge(SeasonForecast.from_dict(shard["result"]))
+
+                # The matches the shards simulated, not predicted again.
+                matches = [Match.model_validate(m) for m in parent["result"]["matches"]]
+                standings = compute_standings(matches)
+                status = JobStatus.COMPLETED
+                simulation_id = _save_simulation(conn, parent_id, matches, standings, forecast)
+                with conn.cursor() as cur:
+                    cur.execute(
+                        "UPDATE job SET job_status = 'completed', finished_at = NOW() WHERE id = %s;",
+                        (parent_id,),
+                    )
+
+    logger.info("Job %d merged %d shards: %s", parent_id, len(shards), status)
+    _publish_status(parent_id, status, simulation_id)
+
+
+def finish_job(job_id: int, attempt: int, save=None) -> bool:
+    """
+    Takes a previously 'running' job and changes its status to 'completed',
+    in one transaction with saving its results through `save(conn)`, which
+    returns the job's new simulation ID, if any.
+
+    Nothing is saved unless the job is still running this attempt, so a
+    worker whose lease expired (and a crash before the commit) leaves no
+    results behind for the retried attempt to duplicate.
+
+    Returns whether the job was completed.
+    """
+    with get_connection() as conn:
+        with conn.transaction():
+            # A job that was not previously in the 'running' status cannot
+            # now become 'completed', and neither can one whose lease was
+            # lost. This also locks the job's row, so the reaper can't
+            # retry it until the results are saved.
             with conn.cursor() as cur:
-                cur.execute("UPDATE job SET error = %s WHERE id = %s;", (str(e), job_id))
-            conn.commit()
+                cur.execute(
+                    """UPDATE job
+                    SET job_status = 'completed', finished_at = NOW(), lease_expires_at = NULL
+                    WHERE id = %s AND job_status = 'running' AND attempts = %s
+                    RETURNING job_status, simulation_id, parent_id""",
+                    (job_id, attempt),
+                )
+                row = cur.fetchone()
+            if row is None:
+                raise psycopg.Rollback()
+
+            simulation_id = row["simulation_id"]
+            if save is not None:
+                simulation_id = save(conn)
 
+    if row is None:
+        logger.warning("Lost the lease on job %d (attempt %d), discarding its results", job_id, attempt)
+        return False
 
-def finish_job(job_id: int) -> None:
+    # Let the clients know once the results are committed.
+    _publish_status(job_id, row["job_status"], simulation_id)
+
+    # The last shard of a job to finish completes the job.
+    if row["parent_id"] is not None:
+        merge_shards(row["parent_id"])
+    return True
+
+
+def retry_or_fail_job(job_id: int, attempt: int, error: str) -> str | None:
     """
-    Takes a previously 'running' job and changes its status to 'completed'.
+    Takes a 'running' job that failed or whose lease expired, and changes its
+    status back to 'queued' if it has attempts left, or to 'failed' otherwise.
+    The error is recorded either way.
+
+    Returns the new status, or None if the job was no longer running this
+    attempt (e.g., another worker or reaper already handled it).
     """
-    # A job that was not previously in the 'running' status cannot
-    # now become 'completed'.
-    if _get_job_status(job_id) == JobStatus.RUNNING:
-        return _update_job(job_id, JobStatus.COMPLETED)
+    row = _update_job(
+        job_id,
+        """UPDATE job
+        SET job_status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+            finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE NOW() END,
+            lease_expires_at = NULL,
+            error = %s
+        WHERE id = %s AND job_status = 'running' AND attempts = %s
+        RETURNING job_status, simulation_id, parent_id""",
+        (error, job_id, attempt),
+    )
+    if row is None:
+        return None
+
+    # A job fails as soon as any of its shards does.
+    if row["job_status"] == JobStatus.FAILED and row["parent_id"] is not None:
+        merge_shards(row["parent_id"])
+    return row["job_status"]
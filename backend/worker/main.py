@@ -1,12 +1,18 @@
-from redis import Redis
+import logging
+import signal
 import time
 
-from backend.config import REDIS_URL
-from backend.worker.jobs import start_job, do_job, finish_job
+from backend.config import WORKER_CONCURRENCY, WORKER_POLL_TIMEOUT, JOB_REAP_INTERVAL
+from backend.db.connection import open_pool, close_pool
+from backend.worker.jobs import start_job, do_job
+from backend.worker.job_queue import claim_job, ack_job, release_job, lease, reap_expired_jobs
+from backend.worker.predictor import predictor_service
+from backend.worker.supervisor import Supervisor
 
+logger = logging.getLogger(__name__)
 
-# Connect to Redis queue of jobs.
-rd = Redis.from_url(REDIS_URL)
+# Set on SIGTERM, so the worker stops after its current job.
+stopping = False
 
 
 def consume_job(job_id: int) -> None:
@@ -14,25 +20,83 @@ def consume_job(job_id: int) -> None:
     The worker instance watches the queue and pulls jobs as they are enqueued.
     When a job is pulled, it should get the corresponding job entry in the
     Postgres database and update its status.
+
+    The job stays in the processing list until it is done with, so that if
+    this worker dies partway, the job is retried (see job_queue.py).
     """
     # Update job database to reflect the job is being worked on.
-    start_job(job_id)
+    job = start_job(job_id)
+    if job is None:
+        # The job was not waiting to run (e.g., it was taken twice).
+        ack_job(job_id)
+        return
+    attempt = job["attempts"]
 
-    # Perform the simulation and table computations for the current job.
-    do_job(job_id)
+    try:
+        # Perform the simulation and table computations for the current job,
+        # extending the lease on it while it runs, and complete it.
+        with lease(job_id, attempt):
+            do_job(job_id, attempt, job["job_type"], job["params"], job["parent_id"])
+    except Exception as e:
+        # Retry the job if it has attempts left, or fail it.
+        logger.exception("Job %d failed on attempt %d", job_id, attempt)
+        release_job(job_id, attempt, str(e))
+        return
 
-    # Update job database to reflect the job has been completed.
-    finish_job(job_id)
+    ack_job(job_id)
 
 
-# Entry point for main: continuously pull jobs and work on them.
-if __name__ == "__main__":
-    while True:
+def _request_stop(signum: int, frame) -> None:
+    global stopping
+    stopping = True
+
+
+def run_worker() -> None:
+    """
+    Continuously pull jobs and work on them, until SIGTERM. This runs either
+    as the only worker, or as one of the processes forked by the supervisor.
+    """
+    signal.signal(signal.SIGTERM, _request_stop)
+
+    # Open the database connection pool shared by all jobs. Each process needs
+    # its own, so it is opened here rather than before forking.
+    open_pool()
+
+    next_reap = time.monotonic()
+    while not stopping:
         try:
+            # Every so often, retry the jobs of workers that died.
+            if time.monotonic() >= next_reap:
+                next_reap = time.monotonic() + JOB_REAP_INTERVAL
+                reap_expired_jobs()
+
             # Blocks until work exists, and once a job exists the worker
-            # will pull the first job_id from the queue.
-            _, raw = rd.brpop("queue")
-            consume_job(job_id=int(raw))
-        except Exception:
+            # will pull the first job_id from the queue. Wakes up every
+            # WORKER_POLL_TIMEOUT seconds to check whether to stop.
+            job_id = claim_job(timeout=WORKER_POLL_TIMEOUT)
+            if job_id is not None:
+                consume_job(job_id)
+        except Exception as e:
+            # E.g., Redis or Postgres is unreachable. A job taken before the
+            # error is left in the processing list, for the reaper to retry.
+            logger.warning("Worker loop failed (%s), retrying", e)
             time.sleep(1)
             continue
+
+    close_pool()
+
+
+# Entry point for main: continuously pull jobs and work on them.
+if __name__ == "__main__":
+    # Show the cache hit/miss messages and the latency of each job, and which
+    # worker process they come from.
+    logging.basicConfig(level=logging.INFO, format="%(process)d %(name)s: %(message)s")
+
+    # Load the model and feature state once, before taking any jobs. With
+    # several workers, this happens before forking, so they all share it.
+    predictor_service.refresh()
+
+    if WORKER_CONCURRENCY > 1:
+        Supervisor(run_worker, WORKER_CONCURRENCY).run()
+    else:
+        run_worker()
@@ -0,0 +1,215 @@
+"""
+Monte Carlo simulation of whole seasons from the predicted match outcome
+probabilities.
+
+Instead of building a single table from each match's most likely outcome
+(see generate_table.py), every match is sampled from its (p_home, p_draw,
+p_away) in each of many simulated seasons, and the teams' finishing
+positions are counted across the seasons. This gives each team's
+probability of finishing in every position, and from that, e.g., of winning
+the title, finishing in the top 4, or being relegated.
+
+Seasons are simulated in blocks of MONTE_CARLO_BLOCK_SIZE as batched array
+operations. Each block has its own random stream, derived from the seed and
+the block's index, so a block gives the same result no matter which worker
+simulates it, or with which other blocks (see SeasonForecast.merge).
+"""
+
+import numpy as np
+
+from backend.api.schemas import Match
+from backend.config import MONTE_CARLO_BLOCK_SIZE
+
+# Points for a home win, draw, and away win, for the home team (first three)
+# and the away team (last three).
+POINTS = np.array([3, 1, 0, 0, 1, 3], dtype=np.int8)
+
+
+class SeasonForecast:
+    """
+    The aggregated result of simulating `seasons` seasons: for each team, how
+    many times it finished in each position, and its total points over all
+    the seasons. Integer counts, so that forecasts of disjoint blocks of
+    seasons can be merged exactly.
+    """
+
+    def __init__(self, teams: list[str], position_counts: np.ndarray, points_total: np.ndarray, seasons: int):
+        self.teams = teams
+        # position_counts[i, k]: seasons in which team i finished in position k + 1.
+        self.position_counts = position_counts
+        self.points_total = points_total
+        self.seasons = seasons
+
+    @classmethod
+    def empty(cls, teams: list[str]) -> "SeasonForecast":
+        n = len(teams)
+        return cls(teams, np.zeros((n, n), dtype=np.int64), np.zeros(n, dtype=np.int64), 0)
+
+    def merge(self, other: "SeasonForecast") -> "SeasonForecast":
+        """Combine the forecasts of two disjoint sets of seasons."""
+        assert self.teams == other.teams
+        return SeasonForecast(
+            self.teams,
+            self.position_counts + other.position_counts,
+            self.points_total + other.points_total,
+            self.seasons + other.seasons,
+        )
+
+    def to_dict(self) -> dict:
+        """A JSON-serializable copy, e.g., to keep a shard's partial forecast."""
+        return {
+            "teams": self.teams,
+            "position_counts": self.position_counts.tolist(),
+            "points_total": self.points_total.tolist(),
+            "seasons": self.seasons,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SeasonForecast":
+        return cls(
+            data["teams"],
+            np.array(data["position_counts"], dtype=np.int64),
+            np.array(data["points_total"], dtype=np.int64),
+            data["seasons"],
+        )
+
+    def position_probabilities(self) -> np.ndarray:
+        """Probability of each team (row) finishing in each position (column)."""
+        return self.position_counts / max(self.seasons, 1)
+
+    def expected_points(self) -> np.ndarray:
+        """Average points of each team."""
+        return self.points_total / max(self.seasons, 1)
+
+
+def match_arrays(matches: list[Match], teams: list[str]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Convert predicted matches to the arrays the simulator works on: the home
+    and away team indices (into `teams`), and the (n_matches, 3) outcome
+    probabilities.
+    """
+    index = {team: i for i, team in enumerate(teams)}
+    home = np.array([index[m.home_id] for m in matches], dtype=np.int64)
+    away = np.array([index[m.away_id] for m in matches], dtype=np.int64)
+    probs = np.array([(m.p_home, m.p_draw, m.p_away) for m in matches], dtype=np.float64)
+    return home, away, probs
+
+
+def block_count(seasons: int) -> int:
+    """The number of blocks that `seasons` seasons are simulated in."""
+    return -(-seasons // MONTE_CARLO_BLOCK_SIZE)
+
+
+def shard_blocks(seasons: int, shards: int) -> list[range]:
+    """
+    Split the blocks of `seasons` seasons into `shards` contiguous, nearly
+    equal ranges, one per shard. Since each block has its own random stream,
+    the merged result is the same whatever the number of shards.
+    """
+    blocks = block_count(seasons)
+    bounds = [blocks * k // shards for k in range(shards + 1)]
+    return [range(bounds[k], bounds[k + 1]) for k in range(shards)]
+
+
+def simulate_seasons(
+    home: np.ndarray,
+    away: np.ndarray,
+    probs: np.ndarray,
+    teams: list[str],
+    seasons: int,
+    seed: int,
+    blocks: range = None,
+    points: np.ndarray = None,
+) -> SeasonForecast:
+    """
+    Simulate `seasons` seasons of the given matches.
+
+    Args:
+        home, away, probs: The matches, as returned by `match_arrays`.
+        teams: The teams, in the order `home` and `away` index into.
+        seasons: The total number of seasons to simulate.
+        seed: Seed of the random streams.
+        blocks: Which blocks of seasons to simulate (None = all of them), to
+            split the seasons between several jobs.
+        points: Points every team already has before the given matches
+            (None = none), e.g., to only simulate the rest of a season.
+    """
+    if blocks is None:
+        blocks = range(block_count(seasons))
+    if points is None:
+        points = np.zeros(len(teams), dtype=np.int32)
+
+    # Cumulative probabilities, to turn a uniform sample into an outcome.
+    # Normalized in case the model's probabilities don't sum exactly to 1.
+    cumulative = np.cumsum(probs / probs.sum(axis=1, keepdims=True), axis=1)[:, :2].astype(np.float32)
+
+    # Every match appears twice in a team's points, once for each side. Order
+    # these (match, side) appearances by team, so each team's points are the
+    # sum of one contiguous run of them.
+    teams_of = np.concatenate([home, away])
+    order = np.argsort(teams_of, kind="stable")
+    matches_of = np.concatenate([np.arange(len(home))] * 2)[order]
+    # Offset into POINTS of the side: 0 for the home team, 3 for the away team.
+    sides_of = np.repeat(np.array([0, 3], dtype=np.int8), len(home))[order]
+    # Teams without any match (e.g., early in the season) have an empty run,
+    # which reduceat can't express, so only the other teams get one.
+    active = np.isin(np.arange(len(teams)), teams_of)
+    starts = np.searchsorted(teams_of[order], np.flatnonzero(active))
+    layout = (matches_of, sides_of, starts, active)
+
+    forecast = SeasonForecast.empty(teams)
+    for block in blocks:
+        size = min(MONTE_CARLO_BLOCK_SIZE, seasons - block * MONTE_CARLO_BLOCK_SIZE)
+        if size <= 0:
+            continue
+        rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(block,)))
+        forecast = forecast.merge(_simulate_block(cumulative, layout, teams, points, size, rng))
+    return forecast
+
+
+def _simulate_block(
+    cumulative: np.ndarray,
+    layout: tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+    teams: list[str],
+    start_points: np.ndarray,
+    size: int,
+    rng: np.random.Generator,
+) -> SeasonForecast:
+    """Simulate one block of `size` seasons at once."""
+    matches_of, sides_of, starts, active = layout
+
+    # Outcome of every match in every season: 0 = home win, 1 = draw,
+    # 2 = away win. Shape (size, n_matches).
+    u = rng.random((size, len(cumulative)), dtype=np.float32)
+    outcome = (u >= cumulative[:, 0]).astype(np.int8) + (u >= cumulative[:, 1])
+
+    # Points of every team in every season, as integers: the points each
+    # appearance earned, summed over each team's run of appearances, on top
+    # of the points they start with.
+    points = np.tile(start_points.astype(np.int32), (size, 1))
+    if len(starts):
+        earned = POINTS[outcome[:, matches_of] + sides_of]
+        points[:, active] += np.add.reduceat(earned, starts, axis=1, dtype=np.int32)
+
+    return tabulate_seasons(points, teams, rng)
+
+
+def tabulate_seasons(points: np.ndarray, teams: list[str], rng: np.random.Generator) -> SeasonForecast:
+    """
+    Count the finishing positions of the teams in a block of simulated
+    seasons, given every team's (column) final points in every season (row).
+    """
+    size, n_teams = points.shape
+
+    # Finishing positions: sort each season's table by points, breaking ties
+    # at random (a fraction below 1) since goals aren't simulated.
+    order = np.argsort(-(points + rng.random((size, n_teams))), axis=1)
+    positions = np.empty_like(order)
+    np.put_along_axis(positions, order, np.arange(n_teams), axis=1)
+
+    # How many times each team finished in each position.
+    team_position = np.arange(n_teams) * n_teams + positions
+    position_counts = np.bincount(team_position.ravel(), minlength=n_teams * n_teams).reshape(n_teams, n_teams)
+
+    return SeasonForecast(teams, position_counts, points.sum(axis=0), size)
+
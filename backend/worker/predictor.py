@@ -9,22 +9,47 @@ historical data. If it only used matches from the current season, these
 all would be weaker.
 """
 
+import logging
+import os
+
 from joblib import load
 import pandas as pd
 
-from backend.config import FOOTBALL_DATA_URL, FOOTBALL_DATA_PATH, MODEL_PATH
+from backend.config import MODEL_PATH
 from backend.api.schemas import Match
+from backend.worker.season_data import season_data
 from model.config import END_YEAR, NUM_SEASONS, SPORTSBOOK, N_MATCHES
-from model.load_data import get_data_only
-from model.build_features import build_rolling_features, get_feature_columns
+from model.build_features import get_feature_columns
+from model.feature_state import FeatureState, load_feature_state, state_source
+
+logger = logging.getLogger(__name__)
 
 
 def get_latest_season() -> pd.DataFrame:
-    """Get the latest Premier League data from Football-Data.co.uk to a CSV."""
-    df = pd.read_csv(FOOTBALL_DATA_URL)
-    # Save to CSV for debugging.
-    df.to_csv(FOOTBALL_DATA_PATH, index=False)
-    return df
+    """
+    Get the latest Premier League data from Football-Data.co.uk. The CSV is
+    only downloaded again when the local copy is stale and the server has a
+    newer one (see season_data.py).
+    """
+    return season_data.fetch().copy()
+
+
+def season_of(day) -> float:
+    """The season a date is in, numbered like normalize_current does."""
+    return float(day.year if day.month >= 8 else day.year - 1)
+
+
+def season_so_far(df: pd.DataFrame) -> tuple[float, pd.Timestamp]:
+    """
+    The current season, and the date of its last match played so far, from
+    its normalized matches. Before the season's first match, these are the
+    season of today, and yesterday, so that the next matchday is today.
+    """
+    played = df[df["result"].isin(["H", "D", "A"]) & df["date"].notna()]
+    if played.empty:
+        today = pd.Timestamp.today().normalize()
+        return season_of(today), today - pd.Timedelta(days=1)
+    return played["season"].max(), played["date"].max()
 
 
 def normalize_current(df: pd.DataFrame, sportsbook: str) -> pd.DataFrame:
@@ -123,37 +148,45 @@ team_to_id = {
 }
 
 class Predictor:
-    def __init__(self):
+    """
+    Predicts the current season's matches.
+
+    Args:
+        model: The trained model (None = load from MODEL_PATH).
+        state: The feature state of the historical seasons (None = load the
+            snapshot). It is not modified.
+        df_current_raw: The current season's Football-Data.co.uk data
+            (None = download it).
+    """
+    def __init__(self, model=None, state: FeatureState = None, df_current_raw: pd.DataFrame = None):
         # Load the model from the path.
-        self.model = load(MODEL_PATH)
+        self.model = load(MODEL_PATH) if model is None else model
 
         # Get all data from the current season.
-        df_current_raw = get_latest_season()
-        df_current_raw["is_current_season"] = True
+        if df_current_raw is None:
+            df_current_raw = get_latest_season()
+        df_current_raw = df_current_raw.assign(is_current_season=True)
         df_current = normalize_current(df_current_raw, SPORTSBOOK)
+        self.current_matches = df_current
+        self.season, self.last_played = season_so_far(df_current)
 
         # Determine the teams from this season.
         self.teams = sorted(
             pd.concat([df_current["home_team"], df_current["away_team"]]).unique()
         )
 
-        # Get all historical data from the previous 10 seasons.
-        df_historical = get_data_only(END_YEAR, NUM_SEASONS, SPORTSBOOK)
-        df_historical["is_current_season"] = False
+        # Load the feature state built from the previous 10 seasons of
+        # historical data, and apply this season's matches on top of (a copy
+        # of) it to engineer features for the current season. The updated
+        # copy is kept, to roll the rest of the season out from (see
+        # rollout.py).
+        if state is None:
+            state = load_feature_state(END_YEAR, NUM_SEASONS, SPORTSBOOK, N_MATCHES)
+        self.state = state.copy()
+        self.current_feature_matrix = self.state.update(df_current)
 
-        # Combine all data into one to engineer features for current season.
-        df_all = pd.concat([df_historical, df_current], ignore_index=True)
-
-        # Build the feature matrix.
-        self.feature_matrix = build_rolling_features(df_all, N_MATCHES)
-        
         # Cache feature columns from engineered DataFrame.
-        self.feature_cols = get_feature_columns(self.feature_matrix.columns)
-
-        # Grab current season engineered rows.
-        self.current_feature_matrix = self.feature_matrix[
-            self.feature_matrix["is_current_season"]
-        ].copy()
+        self.feature_cols = get_feature_columns(self.current_feature_matrix.columns)
 
         # Impute columns with missing values (valuation, possession).
         # NOTE: A future extension could be rewriting Max's webscraping code
@@ -171,7 +204,7 @@ class Predictor:
                 # Impute using mean.
                 self.current_feature_matrix[col] = self.current_feature_matrix[
                     col
-                ].fillna(self.feature_matrix[col].mean())
+                ].fillna(state.feature_means[col])
 
     def predict_current_season(self) -> list[Match]:
         """
@@ -223,3 +256,60 @@ class Predictor:
             )
 
         return out
+
+
+class PredictorService:
+    """
+    Long-lived predictor for the worker process. The model, the historical
+    feature state, and the current season's features stay in memory between
+    jobs, and `refresh` only reloads the parts whose source changed:
+        - The model, when the file at MODEL_PATH changes.
+        - The feature state, when the historical data or feature settings
+          change (see model/feature_state.py:state_source).
+        - The current season's features, when the downloaded CSV changes.
+    """
+    def __init__(self):
+        self.model = None
+        self.model_version = None
+        self.state = None
+        self.season_digest = None
+        self.predictor = None
+
+    def refresh(self) -> Predictor:
+        """Bring the predictor up to date, and return it."""
+        changed = []
+
+        version = _file_version(MODEL_PATH)
+        if version != self.model_version:
+            self.model = load(MODEL_PATH)
+            self.model_version = version
+            changed.append("model")
+
+        if self.state is None or self.state.source != state_source(END_YEAR, NUM_SEASONS, SPORTSBOOK, N_MATCHES):
+            self.state = load_feature_state(END_YEAR, NUM_SEASONS, SPORTSBOOK, N_MATCHES)
+            changed.append("feature state")
+
+        df_current_raw = get_latest_season()
+        if season_data.digest != self.season_digest:
+            self.season_digest = season_data.digest
+            changed.append("current season")
+
+        if self.predictor is None or any(part != "model" for part in changed):
+            self.predictor = Predictor(self.model, self.state, df_current_raw)
+        elif changed:
+            # Only the model changed: the features are still valid.
+            self.predictor.model = self.model
+
+        if changed:
+            logger.info("Predictor refreshed: %s", ", ".join(changed))
+        return self.predictor
+
+
+def _file_version(path) -> tuple:
+    """Modification time and size of a file, to tell when it was replaced."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+# The worker's resident predictor (see backend/worker/main.py).
+predictor_service = PredictorService()
@@ -0,0 +1,339 @@
+"""
+Autoregressive simulation of the rest of the season, one matchweek at a time.
+
+The Monte Carlo simulator (see monte_carlo.py) samples every match from
+probabilities that were all predicted up front, from the form, Elo ratings,
+and H2H records as they stand today. But a team's form in March depends on
+its results in February. A rollout instead predicts one matchweek, samples
+(or takes the most likely) outcomes, and feeds them back into the teams'
+state before predicting the next matchweek.
+
+The state starts as the feature state after the matches played so far (see
+model/feature_state.py), copied into arrays with a leading dimension of
+simulated seasons, so that a whole block of seasons advances with a few
+array operations and a single call to the model per matchweek:
+    - form: each team's rolling window of match stats, as a ring buffer.
+    - streak: each team's current win streak.
+    - elo: each team's Elo rating.
+    - H2H: a remaining fixture's window can only change by the earlier
+      remaining fixture between the same teams, so the windows are built
+      once and patched with that fixture's simulated outcome.
+
+Only results are simulated, not the match stats. A simulated match adds the
+average scoreline of its result (over all the matches in the state) to the
+goal stats, and each team's current window averages to its other stats
+(e.g., shots on target).
+"""
+
+import numpy as np
+import pandas as pd
+
+from backend.config import ROLLOUT_BLOCK_SIZE
+from backend.worker.monte_carlo import POINTS, SeasonForecast, tabulate_seasons
+from backend.worker.predictor import Predictor, team_to_id
+from model.build_features import add_diff_features
+from model.feature_state import STATS
+from model.h2h import H2H_COLUMNS, h2h_from_windows
+from model.team_form import FORM_COLUMNS
+
+# Outcome of each Football-Data.co.uk result: 0 = home win, 1 = draw,
+# 2 = away win, as in monte_carlo.py.
+OUTCOMES = {"H": 0, "D": 1, "A": 2}
+
+# Positions in STATS of the stats set from the simulated result, and of the
+# stats carried over from the team's window averages.
+WINS, POINTS_STAT, GOALS_SCORED, GOALS_CONCEDED = (
+    STATS.index(stat) for stat in ("wins", "points", "goals_scored", "goals_conceded")
+)
+AVERAGED = [STATS.index(stat) for stat in ("shots_on_target", "fouls_committed", "possession_pct")]
+
+
+def schedule_fixtures(
+    n_teams: int, played_home: np.ndarray, played_away: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    The fixtures of a double round robin between `n_teams` teams that have
+    not been played yet, split into matchweeks in which every team plays at
+    most once.
+
+    Football-Data.co.uk only lists played matches, so the order of the rest
+    is made up: the fixtures are taken in the order of a circle method
+    schedule, and each one goes into the first matchweek in which neither
+    team plays yet.
+
+    Returns:
+        The home and away team indices of the fixtures, and the matchweek of
+        each (counting from 0), sorted by matchweek.
+    """
+    played = set(zip(np.asarray(played_home).tolist(), np.asarray(played_away).tolist()))
+
+    # Circle method: the first slot stays put while the others rotate, with
+    # a bye (-1) when the number of teams is odd. The second half of the
+    # season repeats the first with home and away swapped.
+    slots = list(range(n_teams)) + ([-1] if n_teams % 2 else [])
+    n = len(slots)
+    rounds = []
+    for r in range(n - 1):
+        pairs = [(slots[i], slots[n - 1 - i]) for i in range(n // 2)]
+        rounds.append([(h, a) if r % 2 == 0 else (a, h) for h, a in pairs])
+        slots = [slots[0], slots[-1]] + slots[1:-1]
+    rounds += [[(a, h) for h, a in pairs] for pairs in rounds]
+
+    home, away, week = [], [], []
+    busy = []
+    for pairs in rounds:
+        for h, a in pairs:
+            if h < 0 or a < 0 or (h, a) in played:
+                continue
+            w = next((w for w, teams in enumerate(busy) if h not in teams and a not in teams), len(busy))
+            if w == len(busy):
+                busy.append(set())
+            busy[w].update((h, a))
+            home.append(h)
+            away.append(a)
+            week.append(w)
+
+    order = np.argsort(np.array(week, dtype=np.int64), kind="stable")
+    return (
+        np.array(home, dtype=np.int64)[order],
+        np.array(away, dtype=np.int64)[order],
+        np.array(week, dtype=np.int64)[order],
+    )
+
+
+class SeasonRollout:
+    """
+    Rolls the rest of the current season out, from the predictor's model and
+    its feature state after the matches played so far (neither is modified).
+    """
+
+    def __init__(self, predictor: Predictor):
+        state = predictor.state
+        self.model = predictor.model
+        self.feature_cols = predictor.feature_cols
+        self.teams = predictor.teams
+        self.flags = state.elo, state.h2h, state.diff, state.delete_original_diff
+
+        # Columns of each class in the model's probabilities, in outcome order.
+        classes = list(self.model.classes_)
+        self.class_order = [classes.index(outcome) for outcome in (0, 1, 2)]
+
+        # Match-level features (odds, possession, and valuations) aren't known
+        # for future fixtures, so they are imputed with their historical mean,
+        # like the Predictor does for the current season.
+        self.fill = {col: state.feature_means.get(col, np.nan) for col in self.feature_cols}
+
+        index = {team: i for i, team in enumerate(self.teams)}
+        played = predictor.current_matches
+        played = played[played["result"].isin(list(OUTCOMES))]
+        played_home = played["home_team"].map(index).to_numpy(dtype=np.int64)
+        played_away = played["away_team"].map(index).to_numpy(dtype=np.int64)
+        played_outcome = played["result"].map(OUTCOMES).to_numpy(dtype=np.int64)
+
+        # Points already won, which every simulated season starts from.
+        self.points = np.zeros(len(self.teams), dtype=np.int32)
+        np.add.at(self.points, played_home, POINTS[played_outcome])
+        np.add.at(self.points, played_away, POINTS[played_outcome + 3])
+
+        # The remaining fixtures, and where each matchweek's run of them starts.
+        self.home, self.away, week = schedule_fixtures(len(self.teams), played_home, played_away)
+        self.bounds = np.searchsorted(week, np.arange(week[-1] + 2 if len(week) else 1))
+
+        # The teams' state going in, by index into self.teams.
+        codes = np.array([state.team_codes[team] for team in self.teams], dtype=np.int64)
+        self.form = state.form[codes]
+        self.streak = state.streak[codes]
+        season = np.full(len(codes), predictor.season)
+        self.elo, _ = state.ratings.peek(codes, codes, season)
+        self.K, self.home_adv = state.ratings.K, state.ratings.home_adv
+
+        # Average (home, away) goals of each outcome.
+        self.scorelines = state.scorelines()
+
+        if state.h2h:
+            self._prepare_h2h(state, codes, predictor.last_played)
+
+    def _prepare_h2h(self, state, codes: np.ndarray, last_date: pd.Timestamp) -> None:
+        """
+        Build the H2H features of every remaining fixture as of now, and as
+        they would be with one more, more recent, encounter.
+        """
+        home, away = codes[self.home], codes[self.away]
+        # Any date after the last played match sees all of them.
+        dates = np.full(len(home), (pd.Timestamp(last_date) + pd.Timedelta(days=1)).value, dtype=np.int64)
+        windows = state.pairs.peek(home, away, dates)
+        self.h2h = h2h_from_windows(windows, home, **state.records)
+
+        # A full window drops its oldest encounter to make room.
+        full = (windows >= 0).all(axis=1)
+        shifted = np.concatenate([windows[:, 1:], np.full((len(home), 1), -1)], axis=1)
+        self.h2h_before = h2h_from_windows(np.where(full[:, None], shifted, windows), home, **state.records)
+
+        # The earlier remaining fixture between the same teams (the reverse
+        # fixture, when it is in an earlier matchweek), or -1.
+        position = {(h, a): i for i, (h, a) in enumerate(zip(self.home.tolist(), self.away.tolist()))}
+        self.previous = np.array(
+            [position.get((a, h), -1) for h, a in zip(self.home.tolist(), self.away.tolist())], dtype=np.int64
+        )
+        self.previous[self.previous > np.arange(len(self.previous))] = -1
+
+    def run(self, seasons: int, seed: int, sample: bool = True) -> SeasonForecast:
+        """
+        Roll the season out `seasons` times, in blocks of ROLLOUT_BLOCK_SIZE
+        seasons, each with its own random stream derived from the seed.
+
+        Args:
+            seasons: The number of seasons to simulate.
+            seed: Seed of the random streams.
+            sample: Sample each outcome from its probabilities, or take the
+                most likely one. Without sampling, every season is the same,
+                so one is enough.
+        """
+        teams = [team_to_id[team] for team in self.teams]
+        forecast = SeasonForecast.empty(teams)
+        for block in range(-(-seasons // ROLLOUT_BLOCK_SIZE)):
+            size = min(ROLLOUT_BLOCK_SIZE, seasons - block * ROLLOUT_BLOCK_SIZE)
+            rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(block,)))
+            points = self._roll_block(size, rng, sample)
+            forecast = forecast.merge(tabulate_seasons(points, teams, rng))
+        return forecast
+
+    def _roll_block(self, size: int, rng: np.random.Generator, sample: bool) -> np.ndarray:
+        """Roll out one block of `size` seasons, and return their final points."""
+        n_matches = self.form.shape[1]
+        form = np.broadcast_to(self.form, (size,) + self.form.shape).copy()
+        streak = np.broadcast_to(self.streak, (size, len(self.teams))).copy()
+        elo = np.broadcast_to(self.elo, (size, len(self.teams))).copy()
+        points = np.broadcast_to(self.points, (size, len(self.teams))).copy()
+        # Slot in each team's window that its next match overwrites: the
+        # windows start oldest first, and every season plays the same
+        # fixtures, so the slots are the same in all of them.
+        head = np.zeros(len(self.teams), dtype=np.int64)
+        outcome = np.empty((size, len(self.home)), dtype=np.int8)
+
+        for start, stop in zip(self.bounds[:-1], self.bounds[1:]):
+            week = slice(start, stop)
+            home, away = self.home[week], self.away[week]
+            teams = np.concatenate([home, away])
+
+            # Form going into the matchweek, like FeatureState._team_form.
+            window = form[:, teams]
+            counts = (~np.isnan(window)).sum(axis=2)
+            sums = np.nansum(window, axis=2)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                means = np.where(counts > 0, sums / counts, np.nan)
+            team_form = np.concatenate(
+                [np.where(counts[..., :-1] > 0, sums[..., :-1], np.nan), streak[:, teams, None], means[..., -1:]],
+                axis=2,
+            )
+
+            # Predict the whole matchweek of every season at once.
+            probs = self._predict(week, team_form, elo[:, home], elo[:, away], outcome)
+            if sample:
+                cumulative = np.cumsum(probs / probs.sum(axis=2, keepdims=True), axis=2)
+                u = rng.random((size, len(home)))
+                result = (u >= cumulative[..., 0]).astype(np.int8) + (u >= cumulative[..., 1])
+            else:
+                result = probs.argmax(axis=2).astype(np.int8)
+            outcome[:, week] = result
+
+            # Feed the outcomes back: points, Elo, streaks, and form windows.
+            points[:, home] += POINTS[result]
+            points[:, away] += POINTS[result + 3]
+
+            s_home = 1.0 - result / 2.0
+            expected = 1.0 / (1.0 + 10.0 ** ((elo[:, away] - (elo[:, home] + self.home_adv)) / 400.0))
+            change = self.K * (s_home - expected)
+            elo[:, home] += change
+            elo[:, away] -= change
+
+            stats = np.empty((size, len(teams), len(STATS)))
+            stats[..., WINS] = np.concatenate([result == 0, result == 2], axis=1)
+            stats[..., POINTS_STAT] = np.concatenate([POINTS[result], POINTS[result + 3]], axis=1)
+            home_goals, away_goals = self.scorelines[result, 0], self.scorelines[result, 1]
+            stats[..., GOALS_SCORED] = np.concatenate([home_goals, away_goals], axis=1)
+            stats[..., GOALS_CONCEDED] = np.concatenate([away_goals, home_goals], axis=1)
+            stats[..., AVERAGED] = means[..., AVERAGED]
+
+            streak[:, teams] = np.where(stats[..., WINS] == 1, streak[:, teams] + 1, 0)
+            form[:, teams, head[teams]] = stats
+            head[teams] = (head[teams] + 1) % n_matches
+
+        return points
+
+    def _predict(
+        self,
+        week: slice,
+        team_form: np.ndarray,
+        elo_home: np.ndarray,
+        elo_away: np.ndarray,
+        outcome: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Build the feature rows of a matchweek in every season (season-major),
+        in the same columns as FeatureState.update, and return the (seasons,
+        fixtures, 3) outcome probabilities.
+        """
+        elo, h2h, diff, delete_original_diff = self.flags
+        size, n = elo_home.shape
+        columns = {}
+
+        if elo:
+            columns["elo_home_pre"] = elo_home
+            columns["elo_away_pre"] = elo_away
+            columns["elo_diff_pre"] = elo_home - elo_away
+        if h2h:
+            columns.update(self._h2h(week, outcome))
+        for k, col in enumerate(FORM_COLUMNS):
+            columns[f"{col}_home"] = team_form[:, :n, k]
+            columns[f"{col}_away"] = team_form[:, n:, k]
+
+        df = pd.DataFrame({col: np.broadcast_to(values, (size, n)).ravel() for col, values in columns.items()})
+        if diff:
+            df = add_diff_features(df, delete_original=delete_original_diff)
+        for col in self.feature_cols:
+            if col not in df.columns:
+                df[col] = self.fill[col]
+
+        probs = self.model.predict_proba(df[self.feature_cols])
+        return probs[:, self.class_order].reshape(size, n, 3)
+
+    def _h2h(self, week: slice, outcome: np.ndarray) -> dict:
+        """
+        The H2H features of a matchweek's fixtures in every season: as
+        prepared, unless the same teams already met earlier in the rollout.
+        """
+        columns = {col: values[week] for col, values in self.h2h.items()}
+        previous = self.previous[week]
+        patched = previous >= 0
+        if not patched.any():
+            return columns
+
+        # The earlier fixture's outcome, seen by this fixture's home team,
+        # which was the away team then.
+        result = outcome[:, previous[patched]]
+        before = {col: values[week][patched] for col, values in self.h2h_before.items()}
+        matches = before["h2h_matches"] + 1
+        home_wins = before["h2h_home_wins"] + (result == 2)
+        away_wins = before["h2h_away_wins"] + (result == 0)
+        scored = before["h2h_home_goals_scored"] + self.scorelines[result, 1]
+        conceded = before["h2h_home_goals_conceded"] + self.scorelines[result, 0]
+        new = {
+            "h2h_matches": matches,
+            "h2h_home_wins": home_wins,
+            "h2h_away_wins": away_wins,
+            "h2h_draws": matches - home_wins - away_wins,
+            "h2h_home_goals_scored": scored,
+            "h2h_home_goals_conceded": conceded,
+            "h2h_away_goals_scored": conceded,
+            "h2h_away_goals_conceded": scored,
+            "h2h_home_win_pct": home_wins / matches,
+            "h2h_away_win_pct": away_wins / matches,
+        }
+
+        size = len(outcome)
+        for col in H2H_COLUMNS:
+            values = np.broadcast_to(columns[col].astype(float), (size, len(previous))).copy()
+            values[:, patched] = new[col]
+            columns[col] = values
+        return columns
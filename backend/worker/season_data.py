@@ -0,0 +1,128 @@
+"""
+Conditional-fetch cache of the current season's Football-Data.co.uk CSV.
+
+The CSV is kept in FOOTBALL_DATA_PATH, next to a small JSON file holding its
+ETag, Last-Modified date, and when it was last checked. Within the freshness
+window the local copy is used as is. After that, the server is asked with a
+conditional request, and only sends the CSV again if it changed. If the
+server can't be reached, the last good copy is used.
+"""
+import hashlib
+import json
+import logging
+import time
+from pathlib import Path
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+import pandas as pd
+
+from backend.config import (
+    FOOTBALL_DATA_URL,
+    FOOTBALL_DATA_PATH,
+    FOOTBALL_DATA_MAX_AGE,
+    FOOTBALL_DATA_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class SeasonData:
+    """
+    Local, conditionally refreshed copy of a CSV served over HTTP.
+
+    Args:
+        url: Where to download the CSV from.
+        path: Where to keep the local copy.
+        max_age: Seconds the local copy is used before checking the server.
+        timeout: Seconds to wait for the server.
+    """
+    def __init__(
+        self,
+        url: str = FOOTBALL_DATA_URL,
+        path: Path = FOOTBALL_DATA_PATH,
+        max_age: float = FOOTBALL_DATA_MAX_AGE,
+        timeout: float = FOOTBALL_DATA_TIMEOUT,
+    ):
+        self.url = url
+        self.path = Path(path)
+        self.meta_path = self.path.with_suffix(".meta.json")
+        self.max_age = max_age
+        self.timeout = timeout
+
+        # Parsed copy of the local file, and the hash of its contents, so
+        # the CSV is only parsed again when it changes.
+        self.digest = None
+        self.df = None
+
+    def fetch(self) -> pd.DataFrame:
+        """
+        Return the current season's data, downloading it only if the local
+        copy is stale and the server has a newer one.
+        """
+        meta = self._read_meta()
+        if not self.path.exists() or time.time() - meta.get("checked_at", 0) >= self.max_age:
+            try:
+                self._download(meta)
+            except (HTTPError, URLError, OSError, ValueError) as e:
+                if not self.path.exists():
+                    raise
+                logger.warning("Could not fetch %s (%s), using the last good copy", self.url, e)
+
+        return self._load()
+
+    def _download(self, meta: dict) -> None:
+        """Send a conditional request, and store the CSV if it changed."""
+        headers = {}
+        if self.path.exists():
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        try:
+            with urlopen(Request(self.url, headers=headers), timeout=self.timeout) as response:
+                body = response.read()
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+        except HTTPError as e:
+            if e.code != 304:
+                raise
+            logger.info("Season data not modified: %s", self.url)
+            self._write_meta({**meta, "checked_at": time.time()})
+            return
+
+        # Make sure the new copy parses before replacing the last good one.
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_bytes(body)
+        try:
+            pd.read_csv(tmp, nrows=1)
+        except Exception:
+            tmp.unlink()
+            raise ValueError("downloaded data is not a CSV")
+        tmp.replace(self.path)
+
+        logger.info("Season data downloaded: %s (%d bytes)", self.url, len(body))
+        self._write_meta({"etag": etag, "last_modified": last_modified, "checked_at": time.time()})
+
+    def _load(self) -> pd.DataFrame:
+        """Parse the local copy, unless it is the one already parsed."""
+        digest = hashlib.sha256(self.path.read_bytes()).hexdigest()
+        if digest != self.digest:
+            self.df = pd.read_csv(self.path)
+            self.digest = digest
+        return self.df
+
+    def _read_meta(self) -> dict:
+        if not self.meta_path.exists():
+            return {}
+        with open(self.meta_path) as f:
+            return json.load(f)
+
+    def _write_meta(self, meta: dict) -> None:
+        with open(self.meta_path, "w") as f:
+            json.dump(meta, f)
+
+
+# The worker's copy of the current season (see predictor.py:get_latest_season).
+season_data = SeasonData()
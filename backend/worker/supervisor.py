@@ -0,0 +1,118 @@
+"""
+Runs several worker processes on one node, sharing a single copy of the
+model and feature state.
+
+The supervisor loads everything the workers need before forking them, so
+the children start with those pages already in memory and share them
+copy-on-write instead of each loading their own copy. It then restarts any
+worker that exits, and on SIGTERM (e.g., from Kubernetes) asks the workers
+to finish their current job and stop.
+"""
+
+import gc
+import logging
+import os
+import signal
+import time
+from typing import Callable
+
+from backend.config import WORKER_SHUTDOWN_TIMEOUT, WORKER_RESTART_DELAY
+
+logger = logging.getLogger(__name__)
+
+
+class Supervisor:
+    """Forks `concurrency` processes running `target`, and keeps them running."""
+
+    def __init__(self, target: Callable[[], None], concurrency: int):
+        self.target = target
+        self.concurrency = concurrency
+        # Slot (0 to concurrency - 1) of each running worker, by process ID,
+        # and when each slot's worker was last started.
+        self.workers: dict[int, int] = {}
+        self.started: dict[int, float] = {}
+        self.stopping = False
+
+    def run(self) -> None:
+        """Start the workers, and supervise them until SIGTERM or SIGINT."""
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+
+        # Move everything loaded so far out of the garbage collector's reach,
+        # so that collections in the workers don't write to (and so copy) the
+        # shared pages.
+        gc.freeze()
+
+        for slot in range(self.concurrency):
+            self._spawn(slot)
+        logger.info("Started %d workers", self.concurrency)
+
+        while not self.stopping:
+            self._reap()
+            time.sleep(0.5)
+
+        self._shutdown()
+
+    def _request_stop(self, signum: int, frame) -> None:
+        self.stopping = True
+
+    def _spawn(self, slot: int) -> None:
+        """Fork a worker for the given slot."""
+        pid = os.fork()
+        if pid == 0:
+            # Worker process: SIGINT (e.g., Ctrl-C in a terminal reaches the
+            # whole process group) is left to the supervisor, which passes it
+            # on as SIGTERM.
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            code = 0
+            try:
+                self.target()
+            except BaseException:
+                logger.exception("Worker %d crashed", slot)
+                code = 1
+            finally:
+                # Don't return into the supervisor's code.
+                os._exit(code)
+
+        self.workers[pid] = slot
+        self.started[slot] = time.monotonic()
+
+    def _reap(self) -> None:
+        """Collect exited workers, and start a new one in each of their slots."""
+        while self.workers:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                return
+            slot = self.workers.pop(pid)
+            logger.warning(
+                "Worker %d (pid %d) exited with code %d, restarting",
+                slot,
+                pid,
+                os.waitstatus_to_exitcode(status),
+            )
+
+            # Don't restart a worker that keeps failing right away in a loop.
+            if time.monotonic() - self.started[slot] < WORKER_RESTART_DELAY:
+                time.sleep(WORKER_RESTART_DELAY)
+            if not self.stopping:
+                self._spawn(slot)
+
+    def _shutdown(self) -> None:
+        """Ask every worker to stop, and kill those that don't in time."""
+        logger.info("Stopping %d workers", len(self.workers))
+        for pid in self.workers:
+            os.kill(pid, signal.SIGTERM)
+
+        deadline = time.monotonic() + WORKER_SHUTDOWN_TIMEOUT
+        while self.workers and time.monotonic() < deadline:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                time.sleep(0.1)
+            else:
+                self.workers.pop(pid, None)
+
+        for pid in self.workers:
+            logger.warning("Worker (pid %d) did not stop in time, killing it", pid)
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
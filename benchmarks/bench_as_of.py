@@ -0,0 +1,75 @@
+"""
+Benchmark as-of feature queries: the features of every fixture of the last
+historical season, as of the start of each of its matchweeks.
+
+Compares the FeatureIndex used by as-of jobs (built once, then one query for
+all the matchweeks) against rebuilding the feature state from the matches
+before each matchweek and updating it with the fixtures, checks that both
+give the same features, and reports the time of each.
+
+Run from the project root:
+    python -m benchmarks.bench_as_of
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from backend.worker.as_of import matchweek_starts
+from model.config import END_YEAR, NUM_SEASONS, SPORTSBOOK, N_MATCHES
+from model.feature_index import FeatureIndex
+from model.feature_state import FeatureState
+from model.load_data import get_data_only
+
+
+def fixtures_as_of(df: pd.DataFrame, start: pd.Timestamp) -> pd.DataFrame:
+    """Every fixture of the last season, as unplayed rows dated `start`."""
+    season = df[df["season"] == df["season"].max()]
+    teams = sorted(pd.concat([season["home_team"], season["away_team"]]).unique())
+    pairs = [(h, a) for h in teams for a in teams if h != a]
+    fixtures = pd.DataFrame({col: np.nan for col in df.columns}, index=range(len(pairs)))
+    fixtures["home_team"] = [h for h, _ in pairs]
+    fixtures["away_team"] = [a for _, a in pairs]
+    fixtures["date"] = start
+    fixtures["season"] = season["season"].iloc[0]
+    fixtures["result"] = None
+    return fixtures
+
+
+if __name__ == "__main__":
+    df = get_data_only(END_YEAR, NUM_SEASONS, SPORTSBOOK)
+    df["date"] = pd.to_datetime(df["date"])
+    last = df[df["season"] == df["season"].max()]
+    starts = matchweek_starts(last["date"], 10)
+    fixtures = [fixtures_as_of(df, start) for start in starts]
+    print(f"{len(starts)} matchweeks x {len(fixtures[0])} fixtures, {len(df)} matches of history\n")
+
+    start = time.perf_counter()
+    rebuilt = []
+    for as_of, week in zip(starts, fixtures):
+        state = FeatureState.from_history(df[df["date"] < as_of], N_MATCHES)
+        rebuilt.append(state.update(week))
+    rebuild_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = FeatureIndex(df, N_MATCHES)
+    build_time = time.perf_counter() - start
+    all_fixtures = pd.concat(fixtures, ignore_index=True)
+    start = time.perf_counter()
+    indexed = index.features(all_fixtures["home_team"], all_fixtures["away_team"], all_fixtures["date"], all_fixtures["season"])
+    query_time = time.perf_counter() - start
+
+    # update() returns the fixtures sorted by date, which they all share, so
+    # the rows line up once those of teams without any form yet, which it
+    # drops, are dropped from the index's as well.
+    expected = pd.concat(rebuilt, ignore_index=True)
+    form = [col for col in indexed.columns if col.startswith("form_") and "possession" not in col]
+    kept = indexed[indexed[form].notna().all(axis=1)]
+    for col in indexed.columns:
+        assert np.allclose(kept[col].to_numpy(float), expected[col].to_numpy(float), equal_nan=True), col
+
+    index_time = build_time + query_time
+    print(f"{'method':<22} {'time (s)':>9} {'per matchweek (ms)':>19}")
+    print(f"{'rebuild per matchweek':<22} {rebuild_time:>9.3f} {1000 * rebuild_time / len(starts):>19.1f}")
+    print(f"{'index (build + query)':<22} {index_time:>9.3f} {1000 * index_time / len(starts):>19.1f}")
+    print(f"\nindex build {build_time:.3f}s, query {query_time:.3f}s, speedup {rebuild_time / index_time:.0f}x")
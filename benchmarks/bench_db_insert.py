@@ -0,0 +1,91 @@
+"""
+Benchmark writing a simulation's predictions to PostgreSQL, comparing the
+previous row-by-row INSERTs with the COPY-based `insert_predictions`.
+
+Needs a PostgreSQL database with the schema in db/ applied, at DATABASE_URL.
+Every round runs inside a transaction that is rolled back, so the database
+is left unchanged.
+
+Run from the project root:
+    python -m benchmarks.bench_db_insert
+"""
+import random
+import time
+from datetime import date, timedelta
+
+from backend.api.schemas import Match
+from backend.db.connection import get_connection
+from backend.db.predictions import insert_predictions
+from backend.db.simulations import create_simulation
+
+TEAMS = ["ARS", "AVL", "BOU", "BRE", "BHA", "BUR", "CHE", "CRY", "EVE", "FUL",
+         "LEE", "LIV", "MCI", "MUN", "NEW", "NFO", "SUN", "TOT", "WHU", "WOL"]
+OUTCOMES = ["home_win", "draw", "away_win"]
+
+
+def insert_predictions_rowwise(conn, simulation_id, predictions):
+    """The previous implementation: one INSERT (and round trip) per match."""
+    with conn.cursor() as cur:
+        for match in predictions:
+            cur.execute(
+                """
+                INSERT INTO match
+                (simulation_id, match_date, home_id, away_id, p_home, p_draw, p_away, prediction, actual)
+                VALUES
+                (%s, %s, %s, %s, %s, %s, %s, %s, %s);
+                """,
+                (
+                    simulation_id,
+                    match.match_date,
+                    match.home_id,
+                    match.away_id,
+                    match.p_home,
+                    match.p_draw,
+                    match.p_away,
+                    match.prediction,
+                    match.actual,
+                ),
+            )
+
+
+def synthetic_matches(n: int, seed: int = 0) -> list[Match]:
+    """n random match predictions."""
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        home, away = rng.sample(TEAMS, 2)
+        p_home, p_draw = rng.uniform(0, 0.6), rng.uniform(0, 0.4)
+        out.append(
+            Match(
+                match_date=date(2025, 8, 15) + timedelta(days=i % 280),
+                home_id=home,
+                away_id=away,
+                p_home=p_home,
+                p_draw=p_draw,
+                p_away=1 - p_home - p_draw,
+                prediction=rng.choice(OUTCOMES),
+                actual=rng.choice(OUTCOMES),
+            )
+        )
+    return out
+
+
+def time_insert(insert, matches: list[Match]) -> float:
+    """Time one insert in a transaction that is rolled back afterwards."""
+    with get_connection() as conn:
+        simulation_id = create_simulation(conn)
+        start = time.perf_counter()
+        insert(conn, simulation_id, matches)
+        elapsed = time.perf_counter() - start
+        conn.rollback()
+    return elapsed
+
+
+if __name__ == "__main__":
+    print(f"{'rows':>8} {'row-by-row (s)':>15} {'COPY (s)':>9} {'speedup':>8}")
+
+    for n in [380, 3_800, 38_000]:
+        matches = synthetic_matches(n)
+        rowwise = time_insert(insert_predictions_rowwise, matches)
+        bulk = time_insert(insert_predictions, matches)
+        print(f"{n:>8} {rowwise:>15.3f} {bulk:>9.3f} {rowwise / bulk:>7.1f}x")
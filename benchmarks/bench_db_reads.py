@@ -0,0 +1,109 @@
+"""
+Benchmark reading one simulation's match predictions and table standings
+(`get_predictions` and `get_standings`) from a database seeded with 10,000
+simulations, with and without the indexes from
+db/04_add_simulation_indexes.sql.
+
+Needs a PostgreSQL database with the schema in db/ applied, at DATABASE_URL.
+The seeding, and dropping and recreating the indexes, all happen inside a
+transaction that is rolled back, so the database is left unchanged.
+
+Run from the project root:
+    python -m benchmarks.bench_db_reads
+"""
+import asyncio
+import random
+import statistics
+import time
+
+import psycopg
+from psycopg.rows import dict_row
+
+from backend.config import DATABASE_URL
+from backend.db.predictions import get_predictions
+from backend.db.standings import get_standings
+
+NUM_SIMULATIONS = 10_000
+MATCHES_PER_SIMULATION = 380
+TEAMS_PER_SIMULATION = 20
+NUM_READS = 200
+SEED = 0
+
+
+async def seed(conn: psycopg.AsyncConnection) -> list[int]:
+    """Insert the synthetic simulations, and return their IDs."""
+    async with conn.cursor() as cur:
+        await cur.execute(
+            "INSERT INTO simulation (created_at) SELECT NOW() FROM generate_series(1, %s) RETURNING id;",
+            (NUM_SIMULATIONS,),
+        )
+        ids = [row["id"] for row in await cur.fetchall()]
+        await cur.execute(
+            """
+            INSERT INTO match
+            (simulation_id, match_date, home_id, away_id, p_home, p_draw, p_away, prediction, actual)
+            SELECT s, DATE '2025-08-15' + (g % 280), 'ARS', 'CHE', 0.5, 0.25, 0.25, 'home_win', 'draw'
+            FROM unnest(%s::bigint[]) AS s, generate_series(1, %s) AS g;
+            """,
+            (ids, MATCHES_PER_SIMULATION),
+        )
+        await cur.execute(
+            """
+            INSERT INTO standing
+            (simulation_id, team_id, position, played, won, drew, lost, points)
+            SELECT s, 'ARS', g, 38, 20, 10, 8, 70
+            FROM unnest(%s::bigint[]) AS s, generate_series(1, %s) AS g;
+            """,
+            (ids, TEAMS_PER_SIMULATION),
+        )
+        await cur.execute("ANALYZE match; ANALYZE standing;")
+    return ids
+
+
+async def time_reads(conn: psycopg.AsyncConnection, read, simulation_ids: list[int]) -> tuple[float, float]:
+    """The median and p99 latency (in ms) of reading the given simulations."""
+    latencies = []
+    for simulation_id in simulation_ids:
+        start = time.perf_counter()
+        await read(conn, simulation_id)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(0.99 * (len(latencies) - 1))]
+
+
+async def report(label: str, conn: psycopg.AsyncConnection, simulation_ids: list[int]) -> None:
+    for name, read in [("get_predictions", get_predictions), ("get_standings", get_standings)]:
+        p50, p99 = await time_reads(conn, read, simulation_ids)
+        print(f"{label:>10} {name:>16} {p50:>9.2f} {p99:>9.2f}")
+
+
+async def main() -> None:
+    async with await psycopg.AsyncConnection.connect(DATABASE_URL, row_factory=dict_row) as conn:
+        print(f"Seeding {NUM_SIMULATIONS} simulations...")
+        ids = await seed(conn)
+        sample = random.Random(SEED).choices(ids, k=NUM_READS)
+
+        print(f"{'indexes':>10} {'read':>16} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+
+        async with conn.cursor() as cur:
+            await cur.execute("DROP INDEX IF EXISTS match_simulation_id_match_date_idx;")
+            await cur.execute("DROP INDEX IF EXISTS standing_simulation_id_position_idx;")
+        await report("without", conn, sample)
+
+        async with conn.cursor() as cur:
+            with open("db/04_add_simulation_indexes.sql") as f:
+                # The migration's own BEGIN/COMMIT would end our transaction.
+                statements = [
+                    s for s in f.read().split(";")
+                    if "CREATE INDEX" in s
+                ]
+            for statement in statements:
+                await cur.execute(statement)
+            await cur.execute("ANALYZE match; ANALYZE standing;")
+        await report("with", conn, sample)
+
+        await conn.rollback()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+"""
+Benchmark the Elo feature stage as the history grows from 10 to 100+ seasons.
+
+Compares the array-backed engine used by `add_elo_features` against the
+previous row-by-row implementation, and checks the outputs are identical.
+
+Run from the project root:
+    python -m benchmarks.bench_elo
+"""
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import synthetic_history
+from model.build_features import add_elo_features
+
+
+def add_elo_features_iterrows(df, K=24.0, base=1500.0, home_adv=60.0, season_regress=0.25):
+    """The previous `df.iterrows()` implementation, kept as the baseline."""
+    df = df.sort_values(["season", "date"]).reset_index(drop=True).copy()
+    elo_home_pre, elo_away_pre = [], []
+    current_season = None
+    ratings = {}
+
+    for _, row in df.iterrows():
+        season, home, away, result = row["season"], row["home_team"], row["away_team"], row["result"]
+        if season != current_season:
+            if current_season is not None and season_regress > 0.0:
+                for t in ratings.keys():
+                    ratings[t] = (1 - season_regress) * ratings[t] + season_regress * base
+            current_season = season
+        ratings.setdefault(home, base)
+        ratings.setdefault(away, base)
+
+        Rh, Ra = ratings[home], ratings[away]
+        elo_home_pre.append(Rh)
+        elo_away_pre.append(Ra)
+
+        exp_home = 1.0 / (1.0 + 10.0 ** ((Ra - (Rh + home_adv)) / 400.0))
+        exp_away = 1.0 - exp_home
+        if result == "H":
+            s_home, s_away = 1.0, 0.0
+        elif result == "A":
+            s_home, s_away = 0.0, 1.0
+        else:
+            s_home, s_away = 0.5, 0.5
+
+        ratings[home] = Rh + K * (s_home - exp_home)
+        ratings[away] = Ra + K * (s_away - exp_away)
+
+    df["elo_home_pre"] = np.array(elo_home_pre, dtype=float)
+    df["elo_away_pre"] = np.array(elo_away_pre, dtype=float)
+    df["elo_diff_pre"] = df["elo_home_pre"] - df["elo_away_pre"]
+    return df
+
+
+def best_of(fn, repeat=3):
+    """Return the fastest of `repeat` runs, in seconds, and the last result."""
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+if __name__ == "__main__":
+    cols = ["elo_home_pre", "elo_away_pre", "elo_diff_pre"]
+    print(f"{'seasons':>8} {'matches':>8} {'iterrows (s)':>13} {'array (s)':>10} {'speedup':>8}  identical")
+
+    for num_seasons in [10, 25, 50, 100, 200]:
+        df = synthetic_history(num_seasons)
+        t_old, old = best_of(lambda: add_elo_features_iterrows(df), repeat=1)
+        t_new, new = best_of(lambda: add_elo_features(df))
+
+        # Bit-identical: compare the raw float64 bits, not just values.
+        same = all(
+            np.array_equal(old[c].to_numpy().view(np.int64), new[c].to_numpy().view(np.int64))
+            for c in cols
+        )
+        print(f"{num_seasons:>8} {len(df):>8} {t_old:>13.3f} {t_new:>10.4f} {t_old / t_new:>7.0f}x  {same}")
@@ -0,0 +1,29 @@
+"""
+Benchmark the full feature build (`build_rolling_features`) as the history
+grows, reporting both runtime and peak memory.
+
+Run from the project root:
+    python -m benchmarks.bench_features
+"""
+import time
+import tracemalloc
+
+from benchmarks.synthetic import synthetic_history
+from model.build_features import build_rolling_features
+from model.config import N_MATCHES
+
+
+if __name__ == "__main__":
+    print(f"{'seasons':>8} {'matches':>8} {'time (s)':>9} {'peak memory (MB)':>17}")
+
+    for num_seasons in [10, 25, 50, 100, 200]:
+        df = synthetic_history(num_seasons)
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        build_rolling_features(df, N_MATCHES)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(f"{num_seasons:>8} {len(df):>8} {elapsed:>9.3f} {peak / 1e6:>17.1f}")
@@ -0,0 +1,67 @@
+"""
+Benchmark the Monte Carlo season simulator on a full 380-match season with
+random outcome probabilities, from 10^4 to 10^6 simulated seasons.
+
+Compares the batched simulator used by Monte Carlo jobs against simulating
+one season at a time in Python, and reports throughput in seasons/s.
+
+Run from the project root:
+    python -m benchmarks.bench_monte_carlo
+"""
+import time
+
+import numpy as np
+
+from backend.worker.monte_carlo import simulate_seasons
+
+
+def synthetic_season(n_teams=20, seed=0):
+    """Every pairing of `n_teams` teams, home and away, with random probabilities."""
+    rng = np.random.default_rng(seed)
+    pairs = [(h, a) for h in range(n_teams) for a in range(n_teams) if h != a]
+    home = np.array([h for h, _ in pairs])
+    away = np.array([a for _, a in pairs])
+    probs = rng.dirichlet([4, 2, 3], size=len(pairs))
+    return home, away, probs
+
+
+def simulate_seasons_loop(home, away, probs, n_teams, seasons, seed):
+    """One season at a time, one match at a time, kept as the baseline."""
+    rng = np.random.default_rng(seed)
+    counts = np.zeros((n_teams, n_teams), dtype=np.int64)
+    for _ in range(seasons):
+        points = [0] * n_teams
+        for h, a, p in zip(home, away, probs):
+            outcome = rng.choice(3, p=p)
+            if outcome == 0:
+                points[h] += 3
+            elif outcome == 1:
+                points[h] += 1
+                points[a] += 1
+            else:
+                points[a] += 3
+        order = sorted(range(n_teams), key=lambda t: (points[t], rng.random()), reverse=True)
+        for position, team in enumerate(order):
+            counts[team, position] += 1
+    return counts
+
+
+if __name__ == "__main__":
+    home, away, probs = synthetic_season()
+    teams = [f"T{i}" for i in range(20)]
+
+    # The loop is far too slow for more seasons.
+    loop_seasons = 200
+    start = time.perf_counter()
+    simulate_seasons_loop(home, away, probs, len(teams), loop_seasons, seed=0)
+    loop_rate = loop_seasons / (time.perf_counter() - start)
+    print(f"Python loop: {loop_rate:,.0f} seasons/s ({loop_seasons} seasons)\n")
+
+    print(f"{'seasons':>10} {'time (s)':>9} {'seasons/s':>11} {'speedup':>8}")
+    for seasons in [10_000, 100_000, 1_000_000]:
+        start = time.perf_counter()
+        forecast = simulate_seasons(home, away, probs, teams, seasons, seed=0)
+        elapsed = time.perf_counter() - start
+        assert forecast.position_counts.sum() == seasons * len(teams)
+        rate = seasons / elapsed
+        print(f"{seasons:>10,} {elapsed:>9.2f} {rate:>11,.0f} {rate / loop_rate:>7.0f}x")
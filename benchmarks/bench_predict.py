@@ -0,0 +1,105 @@
+"""
+Load test GET /api/predict: clients asking for random fixtures between this
+season's teams, most of them upcoming (answered from memory) and some as of
+a random earlier date of the season (predicted by the model, then cached).
+
+Start the API first, e.g.,
+    uvicorn backend.main:app
+then run from the project root:
+    python -m benchmarks.bench_predict --url http://localhost:8000
+
+Reports requests per second and p50/p99 latency of each kind of request.
+Needs httpx (pip install httpx).
+"""
+import argparse
+import asyncio
+import datetime
+import random
+import statistics
+import time
+from collections import defaultdict
+
+import httpx
+
+from backend.worker.generate_table import get_teams
+from benchmarks.load_test import percentile
+
+
+async def client(
+    http: httpx.AsyncClient,
+    deadline: float,
+    dated_ratio: float,
+    teams: list[str],
+    dates: list[str],
+    rng: random.Random,
+    latencies: dict,
+    errors: dict,
+) -> None:
+    """Send requests back to back until the deadline."""
+    while time.perf_counter() < deadline:
+        home, away = rng.sample(teams, 2)
+        params = {"home": home, "away": away}
+        name = "upcoming"
+        if rng.random() < dated_ratio:
+            name = "dated"
+            params["date"] = rng.choice(dates)
+
+        start = time.perf_counter()
+        try:
+            response = await http.get("/api/predict", params=params)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        latencies[name].append(time.perf_counter() - start)
+        if not ok:
+            errors[name] += 1
+
+
+async def main(args: argparse.Namespace) -> None:
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    teams = args.teams.split(",") if args.teams else get_teams()
+
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30) as http:
+        # Wait for the API to load the model, and find the next matchday, to
+        # pick the dated requests from the weeks before it.
+        while True:
+            response = await http.get("/api/predict", params={"home": teams[0], "away": teams[1]})
+            if response.status_code != 503:
+                break
+            await asyncio.sleep(1)
+        response.raise_for_status()
+        next_matchday = datetime.date.fromisoformat(response.json()["matchDate"])
+        dates = [str(next_matchday - datetime.timedelta(days=7 * k)) for k in range(1, args.dates + 1)]
+
+        deadline = time.perf_counter() + args.duration
+        await asyncio.gather(*[
+            client(http, deadline, args.dated_ratio, teams, dates, random.Random(args.seed + i), latencies, errors)
+            for i in range(args.concurrency)
+        ])
+
+    print(f"{args.concurrency} clients for {args.duration}s, {args.dated_ratio:.0%} dated over {args.dates} dates")
+    print(f"{'requests':>10} {'count':>9} {'errors':>7} {'rps':>8} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    every = [latency for values in latencies.values() for latency in values]
+    rows = sorted(latencies.items()) + [("all", every)]
+    for name, values in rows:
+        if not values:
+            continue
+        n_errors = sum(errors.values()) if name == "all" else errors[name]
+        print(
+            f"{name:>10} {len(values):>9} {n_errors:>7} {len(values) / args.duration:>8.1f} "
+            f"{statistics.median(values) * 1000:>9.2f} {percentile(values, 0.99) * 1000:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL of the API.")
+    parser.add_argument("--concurrency", type=int, default=20, help="Number of concurrent clients.")
+    parser.add_argument("--duration", type=float, default=20, help="Length of the test, in seconds.")
+    parser.add_argument("--dated-ratio", type=float, default=0.05, help="Share of requests with an earlier date.")
+    parser.add_argument("--dates", type=int, default=4, help="Number of earlier weekly dates to ask for.")
+    parser.add_argument("--teams", default=None, help="Comma-separated team IDs (default: backend/datasets/teams.json).")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the workload.")
+    asyncio.run(main(parser.parse_args()))
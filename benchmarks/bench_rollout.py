@@ -0,0 +1,99 @@
+"""
+Benchmark the autoregressive season rollout on the current season, cut
+after its first `--played` matches, from 100 to 5,000 rolled out seasons.
+
+Compares the batched rollout used by rollout jobs against rolling out one
+season at a time with FeatureState.update and one model call per matchweek,
+and reports throughput in seasons/s. Both are dominated by the model, so
+the time the batched rollout spends outside of it is reported too.
+
+Needs the trained model and the current season's data (downloaded like the
+worker does). Run from the project root:
+    python -m benchmarks.bench_rollout [--played 100]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from backend.worker.monte_carlo import POINTS
+from backend.worker.predictor import Predictor, get_latest_season
+from backend.worker.rollout import SeasonRollout
+
+
+def rollout_loop(predictor: Predictor, rollout: SeasonRollout, seed: int) -> np.ndarray:
+    """One season at a time, updating a copy of the feature state, kept as the baseline."""
+    rng = np.random.default_rng(seed)
+    state = predictor.state.copy()
+    teams = np.array(predictor.teams)
+    current = predictor.current_matches
+    date, season = current["date"].max(), current["season"].max()
+    points = rollout.points.copy()
+
+    for k, (start, stop) in enumerate(zip(rollout.bounds[:-1], rollout.bounds[1:])):
+        home, away = rollout.home[start:stop], rollout.away[start:stop]
+        week = pd.DataFrame({col: np.nan for col in current.columns}, index=range(stop - start))
+        week["date"] = date + pd.Timedelta(days=7 * (k + 1))
+        week["home_team"], week["away_team"] = teams[home], teams[away]
+        week["season"] = season
+        week["result"] = None
+
+        X = state.update(week)[predictor.feature_cols].fillna(rollout.fill)
+        probs = predictor.model.predict_proba(X)[:, rollout.class_order]
+        cumulative = np.cumsum(probs / probs.sum(axis=1, keepdims=True), axis=1)
+        u = rng.random(len(probs))
+        outcome = (u >= cumulative[:, 0]).astype(int) + (u >= cumulative[:, 1])
+
+        week["result"] = np.array(["H", "D", "A"])[outcome]
+        week["home_goals"] = rollout.scorelines[outcome, 0]
+        week["away_goals"] = rollout.scorelines[outcome, 1]
+        # Rows without form are dropped, so the other stats can't stay NaN.
+        for col in ["home_shots_on_target", "away_shots_on_target", "home_fouls", "away_fouls"]:
+            week[col] = current[col].mean()
+        state.update(week)
+        np.add.at(points, home, POINTS[outcome])
+        np.add.at(points, away, POINTS[outcome + 3])
+
+    return points
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--played", type=int, default=100, help="Matches of the season already played.")
+    args = parser.parse_args()
+
+    predictor = Predictor(df_current_raw=get_latest_season().iloc[: args.played])
+    rollout = SeasonRollout(predictor)
+    print(f"{len(rollout.home)} remaining matches in {len(rollout.bounds) - 1} matchweeks\n")
+
+    # The loop is far too slow for more seasons.
+    loop_seasons = 3
+    start = time.perf_counter()
+    for seed in range(loop_seasons):
+        rollout_loop(predictor, rollout, seed)
+    loop_rate = loop_seasons / (time.perf_counter() - start)
+    print(f"Loop: {loop_rate:,.2f} seasons/s ({loop_seasons} seasons)\n")
+
+    # Time spent in the model, to tell it apart from the rollout's own work.
+    predict_proba = predictor.model.predict_proba
+    model_time = 0.0
+
+    def timed_predict_proba(X):
+        global model_time
+        start = time.perf_counter()
+        probs = predict_proba(X)
+        model_time += time.perf_counter() - start
+        return probs
+
+    rollout.model.predict_proba = timed_predict_proba
+
+    print(f"{'seasons':>8} {'time (s)':>9} {'model (s)':>10} {'seasons/s':>10} {'speedup':>8}")
+    for seasons in [100, 1_000, 5_000]:
+        model_time = 0.0
+        start = time.perf_counter()
+        forecast = rollout.run(seasons, seed=0)
+        elapsed = time.perf_counter() - start
+        assert forecast.position_counts.sum() == seasons * len(rollout.teams)
+        rate = seasons / elapsed
+        print(f"{seasons:>8,} {elapsed:>9.2f} {model_time:>10.2f} {rate:>10,.1f} {rate / loop_rate:>7.0f}x")
@@ -0,0 +1,97 @@
+"""
+Load test the API with a mixed workload: clients polling a job's status
+(as the frontend does while a simulation runs) alongside clients reading
+match predictions and table standings.
+
+Start the API (and its database) first, e.g.,
+    uvicorn backend.main:app
+then run from the project root:
+    python -m benchmarks.load_test --url http://localhost:8000
+
+Run it against the API before and after a change to compare requests per
+second and p99 latency. Needs httpx (pip install httpx).
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from collections import defaultdict
+
+import httpx
+
+
+async def client(
+    http: httpx.AsyncClient,
+    deadline: float,
+    poll_ratio: float,
+    job_id: int,
+    simulation_ids: list[int],
+    rng: random.Random,
+    latencies: dict,
+    errors: dict,
+) -> None:
+    """Send requests back to back until the deadline."""
+    while time.perf_counter() < deadline:
+        if rng.random() < poll_ratio:
+            name, url = "jobs", f"/api/jobs?job_id={job_id}"
+        else:
+            name = rng.choice(["matches", "table"])
+            url = f"/api/{name}?simulation={rng.choice(simulation_ids)}"
+
+        start = time.perf_counter()
+        try:
+            response = await http.get(url)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        latencies[name].append(time.perf_counter() - start)
+        if not ok:
+            errors[name] += 1
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def main(args: argparse.Namespace) -> None:
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30) as http:
+        # Read the simulations that exist (0 = the latest one).
+        response = await http.get("/api/simulations", params={"limit": 1000})
+        simulation_ids = [sim["id"] for sim in response.json()] or [0]
+
+        deadline = time.perf_counter() + args.duration
+        await asyncio.gather(*[
+            client(http, deadline, args.poll_ratio, args.job_id, simulation_ids,
+                   random.Random(args.seed + i), latencies, errors)
+            for i in range(args.concurrency)
+        ])
+
+    print(f"{args.concurrency} clients for {args.duration}s, {args.poll_ratio:.0%} job polling")
+    print(f"{'endpoint':>10} {'requests':>9} {'errors':>7} {'rps':>8} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    every = [latency for values in latencies.values() for latency in values]
+    rows = sorted(latencies.items()) + [("all", every)]
+    for name, values in rows:
+        if not values:
+            continue
+        n_errors = sum(errors.values()) if name == "all" else errors[name]
+        print(
+            f"{name:>10} {len(values):>9} {n_errors:>7} {len(values) / args.duration:>8.1f} "
+            f"{statistics.median(values) * 1000:>9.2f} {percentile(values, 0.99) * 1000:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL of the API.")
+    parser.add_argument("--concurrency", type=int, default=50, help="Number of concurrent clients.")
+    parser.add_argument("--duration", type=float, default=20, help="Length of the test, in seconds.")
+    parser.add_argument("--poll-ratio", type=float, default=0.7, help="Share of requests polling /api/jobs.")
+    parser.add_argument("--job-id", type=int, default=1, help="Job ID to poll.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the workload.")
+    asyncio.run(main(parser.parse_args()))
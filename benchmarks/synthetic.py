@@ -0,0 +1,86 @@
+"""
+Generate synthetic match histories with the same schema as the merged raw
+DataFrame (see model/load_data.py:get_data_only), so the feature pipeline
+can be benchmarked on far more seasons than we have real data for.
+"""
+import numpy as np
+import pandas as pd
+
+
+def synthetic_history(num_seasons: int, n_teams: int = 20, seed: int = 0) -> pd.DataFrame:
+    """
+    Build `num_seasons` double round-robin seasons of fake matches, with
+    three teams swapped out for new ones every season to mimic promotion
+    and relegation.
+    """
+    rng = np.random.default_rng(seed)
+    teams = [f"Team {i}" for i in range(n_teams)]
+    next_team = n_teams
+    frames = []
+
+    for season in range(num_seasons):
+        # Every ordered pair plays once, one round per weekend.
+        pairs, dates = [], []
+        start = pd.Timestamp(year=2000 + season, month=8, day=10)
+        for rnd, fixtures in enumerate(round_robin(teams)):
+            pairs += fixtures
+            dates += [start + pd.Timedelta(weeks=rnd)] * len(fixtures)
+        n = len(pairs)
+        dates = pd.DatetimeIndex(dates)
+
+        home_goals = rng.poisson(1.5, n)
+        away_goals = rng.poisson(1.2, n)
+        result = np.where(home_goals > away_goals, "H", np.where(home_goals < away_goals, "A", "D"))
+
+        frames.append(pd.DataFrame({
+            "date": dates.strftime("%Y-%m-%d"),
+            "home_team": [h for h, _ in pairs],
+            "away_team": [a for _, a in pairs],
+            "home_goals": home_goals,
+            "away_goals": away_goals,
+            "home_shots_on_target": rng.poisson(5, n),
+            "away_shots_on_target": rng.poisson(4, n),
+            "home_fouls": rng.poisson(11, n),
+            "away_fouls": rng.poisson(11, n),
+            "result": result,
+            "odds_home_win": rng.uniform(1.2, 6.0, n).round(2),
+            "odds_draw": rng.uniform(3.0, 5.0, n).round(2),
+            "odds_away_win": rng.uniform(1.2, 9.0, n).round(2),
+            "season": season,
+            "home_possession_pct": rng.uniform(30, 70, n).round(1),
+            "away_possession_pct": np.nan,
+            "possession_diff": np.nan,
+            "home_squad_value_log_z": rng.normal(size=n),
+            "away_squad_value_log_z": rng.normal(size=n),
+            "squad_value_log_advantage_z": rng.normal(size=n),
+        }))
+
+        # Relegate three teams and promote three new ones.
+        teams = teams[:-3] + [f"Team {next_team + i}" for i in range(3)]
+        next_team += 3
+        rng.shuffle(teams)
+
+    df = pd.concat(frames, ignore_index=True)
+    df["away_possession_pct"] = 100 - df["home_possession_pct"]
+    df["possession_diff"] = df["home_possession_pct"] - df["away_possession_pct"]
+    return df
+
+
+def round_robin(teams: list) -> list:
+    """
+    Schedule a double round robin with the circle method, so each team plays
+    exactly once per round. Returns a list of rounds of (home, away) pairs.
+    """
+    teams = list(teams)
+    n = len(teams)
+    rounds = []
+    for rnd in range(n - 1):
+        fixtures = []
+        for i in range(n // 2):
+            h, a = teams[i], teams[n - 1 - i]
+            fixtures.append((h, a) if (rnd + i) % 2 == 0 else (a, h))
+        rounds.append(fixtures)
+        # Keep the first team fixed and rotate the rest.
+        teams = [teams[0], teams[-1]] + teams[1:-1]
+    # The second half of the season reverses every fixture.
+    return rounds + [[(a, h) for h, a in fixtures] for fixtures in rounds]
@@ -0,0 +1,19 @@
+-- 04_add_simulation_indexes.sql
+--
+-- Adds indexes for reading a single simulation's match predictions and
+-- table standings, which would otherwise scan the whole table once many
+-- simulations exist.
+--
+-- Each index leads with simulation_id, so it serves plain simulation_id
+-- lookups as well as returning the rows already ordered by match date or
+-- table position.
+
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS match_simulation_id_match_date_idx
+    ON match (simulation_id, match_date);
+
+CREATE INDEX IF NOT EXISTS standing_simulation_id_position_idx
+    ON standing (simulation_id, position);
+
+COMMIT;
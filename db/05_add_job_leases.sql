@@ -0,0 +1,25 @@
+-- 05_add_job_leases.sql
+--
+-- Tracks the jobs that workers are working on, so that a job whose worker
+-- crashed or was killed is retried (or failed) instead of staying in
+-- 'running' forever.
+--
+-- A worker holds a lease on its job until lease_expires_at, and keeps
+-- extending it while the job runs. Once a lease expires, the reaper puts the
+-- job back in the queue, unless it has already used up max_attempts.
+--
+-- The error column is also widened, since it holds exception messages.
+
+BEGIN;
+
+ALTER TABLE job
+    ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN max_attempts INTEGER NOT NULL DEFAULT 3,
+    ADD COLUMN lease_expires_at TIMESTAMPTZ,
+    ALTER COLUMN error TYPE TEXT;
+
+CREATE INDEX IF NOT EXISTS job_lease_expires_at_idx
+    ON job (lease_expires_at)
+    WHERE job_status IN ('queued', 'running');
+
+COMMIT;
@@ -0,0 +1,20 @@
+-- 07_add_job_shards.sql
+--
+-- Lets a large job be split into shards that run on any free worker, in
+-- parallel. Each shard is a job of its own, pointing to the job it is part
+-- of through parent_id, and keeps its partial result in result until the
+-- last shard finishes and the results are merged into the parent job's
+-- simulation. The parent job's result pins the predicted matches that all
+-- of its shards simulate.
+
+BEGIN;
+
+ALTER TABLE job
+    ADD COLUMN parent_id BIGINT REFERENCES job(id),
+    ADD COLUMN result JSONB;
+
+CREATE INDEX IF NOT EXISTS job_parent_id_idx
+    ON job (parent_id)
+    WHERE parent_id IS NOT NULL;
+
+COMMIT;
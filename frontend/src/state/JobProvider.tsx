@@ -58,76 +58,64 @@ export function JobProvider({
     toast.info(`Simulation #${jobId} began`);
   }, []);
 
+  // Open job status streams, keyed by job ID.
+  const streamsRef = useRef(new Map<JobId, EventSource>());
+
+  // Handle a job reaching a terminal state.
+  const onJobFinished = useCallback(async (id: JobId, data: JobPollResponse) => {
+    // Close the stream, and remove the job from the list.
+    streamsRef.current.get(id)?.close();
+    streamsRef.current.delete(id);
+    setActiveJobIds((ids) => ids.filter((jobId) => jobId !== id));
+
+    if (data.jobStatus == "completed") {
+      // Refresh the simulation store.
+      await refreshRef.current();
+
+      // Update the search parameter with the simulation just completed.
+      if (data.simulationId != null && simCompleteRef.current) {
+        simCompleteRef.current(data.simulationId);
+      }
+
+      // Toast notification.
+      toast.success(`Simulation #${data.simulationId} complete!`);
+    } else {
+      // Toast notification.
+      toast.error(`Simulation #${data.simulationId} failed...`);
+    }
+  }, []);
+
   useEffect(() => {
-    // This poll and update should only run there are any active jobs.
-    if (activeJobIds.length === 0) return;
-
-    // Every second, poll each running job in parallel.
-    const interval = setInterval(() => {
-      (async () => {
-        try {
-          // (1) Store results of each poll.
-          const results = await Promise.all(
-            activeJobIds.map(async (id) => {
-              const response = await fetch(`/api/jobs?job_id=${id}`);
-              if (!response.ok) {
-                throw new Error(`HTTP ${response.status}`);
-              } else {
-                return {
-                  id: id,
-                  data: (await response.json()) as JobPollResponse,
-                };
-              }
-            }),
-          );
-
-          // (2) Determine all completed and failed jobs in the last tick.
-          const completedJobs = results.filter(
-            (r) => r.data?.jobStatus == "completed",
-          );
-          const failedJobs = results.filter(
-            (r) => r.data?.jobStatus == "failed",
-          );
-
-          // (3) Side effects: refreshing simulation store, toast notifications, etc.
-          if (completedJobs.length > 0) {
-            // Refresh the simulation store.
-            await refreshRef.current();
-
-            // Update the search parameter with the latest simulation completed in the previous tick.
-            const simId =
-              completedJobs[completedJobs.length - 1].data.simulationId;
-
-            if (simId != null && simCompleteRef.current) {
-              simCompleteRef.current(simId);
-            }
-
-            for (const r of completedJobs) {
-              // Toast notification.
-              toast.success(`Simulation #${r.data.simulationId} complete!`);
-            }
-          }
-
-          for (const r of failedJobs) {
-            // Toast notification.
-            toast.error(`Simulation #${r.data.simulationId} failed...`);
-          }
-
-          // (4) Remove finished jobs from list.
-          const finishedIds = new Set<JobId>([
-            ...completedJobs.map((r) => r.id),
-            ...failedJobs.map((r) => r.id),
-          ]);
-          setActiveJobIds((ids) => ids.filter((id) => !finishedIds.has(id)));
-        } catch (e) {
-          console.log("Polling failed: ", e);
+    // Instead of polling, subscribe to each active job's status stream,
+    // which the backend pushes status changes to as they happen.
+    const streams = streamsRef.current;
+    for (const id of activeJobIds) {
+      if (streams.has(id)) continue;
+
+      const source = new EventSource(`/api/jobs/events?job_id=${id}`);
+      source.onmessage = (event) => {
+        const data = JSON.parse(event.data) as JobPollResponse;
+        if (data.jobStatus == "completed" || data.jobStatus == "failed") {
+          onJobFinished(id, data);
         }
-      })();
-    }, 1000);
-
-    // Cleanup function to clear the interval when the component unmounts.
-    return () => clearInterval(interval);
-  }, [activeJobIds]);
+      };
+      // EventSource reconnects by itself after an error, and the stream
+      // starts again with the current status.
+      source.onerror = (e) => {
+        console.log("Job status stream failed: ", e);
+      };
+      streams.set(id, source);
+    }
+  }, [activeJobIds, onJobFinished]);
+
+  // Close all streams when the component unmounts.
+  useEffect(() => {
+    const streams = streamsRef.current;
+    return () => {
+      streams.forEach((source) => source.close());
+      streams.clear();
+    };
+  }, []);
 
   // Only recreate this object if its contents actually change.
   const value = useMemo(
@@ -19,6 +19,9 @@ type SimulationsContextValue = {
   setSimulations: React.Dispatch<React.SetStateAction<Simulation[]>>;
 };
 
+// Number of simulations requested per page from /api/simulations.
+const PAGE_SIZE = 1000;
+
 // Initialize the simulations context to null.
 const SimulationsContext = createContext<SimulationsContextValue | null>(null);
 
@@ -33,14 +36,22 @@ export function SimulationProvider({ children }: { children: React.ReactNode })
     setLoading(true);
 
     try {
-      const res = await fetch("/api/simulations");
-      if (!res.ok) {
-        throw new Error("Failed to fetch simulations");
-      } else {
-        const data: Simulation[] = await res.json();
-        setSimulations(data);
-        return data;
+      // The endpoint returns one page of simulations at a time, so keep
+      // requesting the page after the last simulation received until a
+      // page comes back short.
+      const data: Simulation[] = [];
+      while (true) {
+        const after = data.length > 0 ? data[data.length - 1].id : 0;
+        const res = await fetch(`/api/simulations?limit=${PAGE_SIZE}&after=${after}`);
+        if (!res.ok) {
+          throw new Error("Failed to fetch simulations");
+        }
+        const page: Simulation[] = await res.json();
+        data.push(...page);
+        if (page.length < PAGE_SIZE) break;
       }
+      setSimulations(data);
+      return data;
     } catch (e: any) {
       setError(e.message ?? "Unknown error.");
       return [];
@@ -0,0 +1,34 @@
+-- 06_add_season_forecasts.sql
+--
+-- Adds job types, so that a job can do more than predict the season once,
+-- and a table for the results of Monte Carlo season simulations.
+--
+-- A job's type selects what the worker does, and its parameters (e.g., how
+-- many seasons to simulate, and the random seed) are kept as JSON so each
+-- job type can define its own.
+--
+-- A season forecast stores counts rather than every simulated season: for
+-- each team, how many of the simulated seasons it finished in each
+-- position, and its total points over all of them. Probabilities (e.g., of
+-- winning the title) are these counts divided by the number of seasons.
+
+BEGIN;
+
+ALTER TABLE job
+    ADD COLUMN job_type VARCHAR(20) NOT NULL DEFAULT 'predict',
+    ADD COLUMN params JSONB NOT NULL DEFAULT '{}';
+
+CREATE TABLE team_forecast (
+    id BIGSERIAL NOT NULL PRIMARY KEY,
+    simulation_id BIGINT NOT NULL REFERENCES simulation(id),
+
+    team_id VARCHAR(3) NOT NULL,
+    seasons BIGINT NOT NULL,
+    points_total BIGINT NOT NULL,
+    -- position_counts[k]: seasons in which the team finished in position k.
+    position_counts BIGINT[] NOT NULL,
+
+    UNIQUE (simulation_id, team_id)
+);
+
+COMMIT;
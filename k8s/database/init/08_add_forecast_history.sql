@@ -0,0 +1,23 @@
+-- 08_add_forecast_history.sql
+--
+-- Adds the forecasts of as-of jobs: for every matchweek of the season so
+-- far, the season forecast the model would have made at its start, knowing
+-- only the matches played before it. They are stored like team_forecast,
+-- with the date each forecast is as of.
+
+BEGIN;
+
+CREATE TABLE team_forecast_history (
+    id BIGSERIAL NOT NULL PRIMARY KEY,
+    simulation_id BIGINT NOT NULL REFERENCES simulation(id),
+    as_of DATE NOT NULL,
+
+    team_id VARCHAR(3) NOT NULL,
+    seasons BIGINT NOT NULL,
+    points_total BIGINT NOT NULL,
+    position_counts BIGINT[] NOT NULL,
+
+    UNIQUE (simulation_id, as_of, team_id)
+);
+
+COMMIT;
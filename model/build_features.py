@@ -4,18 +4,24 @@ Using the loaded data, generate the feature matrix to train the model.
 import numpy as np
 import pandas as pd
 
-from model.load_data import get_data_only
+from model.elo import EloEngine, encode_results
+from model.h2h import PairHistory, h2h_from_windows
+from model.team_form import team_match_long, compute_team_form
+
+# Elo parameters used for the Elo features (see add_elo_features).
+ELO_PARAMS = dict(K=24.0, base=1500.0, home_adv=60.0, season_regress=0.25)
 
 def get_feature_matrix(end_year, num_seasons, n_matches, sportsbook):
     """
     Helper function to automate X_train, y_train, X_test, and y_test based on
     configuration parameters.
     """
-    # Get the raw DataFrame using the previous helper function.
-    df_raw = get_data_only(end_year, num_seasons, sportsbook)
-    
-    # Engineer feature matrix.    
-    df = build_rolling_features(df=df_raw, n_matches=n_matches)
+    # Imported here, since the feature cache builds on this module.
+    from model.feature_cache import cached_feature_matrix
+
+    # Engineer feature matrix, or load it from the cache if none of the data
+    # files or feature settings changed since it was last built.
+    df = cached_feature_matrix(end_year, num_seasons, sportsbook, n_matches)
     
     # Use a 70-30 chronological train-test split.
     # returns X_train, y_train, X_test, y_test.
@@ -54,18 +60,7 @@ def build_rolling_features(
     Returns:
         A DataFrame with our pre-processed features.
     """
-    # Import config here to avoid circular imports
-    from model.config import USE_ELO, USE_H2H, USE_DIFF, DELETE_ORIGINAL_DIFF
-    
-    # Use config defaults if not explicitly provided
-    if elo is None:
-        elo = USE_ELO
-    if h2h is None:
-        h2h = USE_H2H
-    if diff is None:
-        diff = USE_DIFF
-    if delete_original_diff is None:
-        delete_original_diff = DELETE_ORIGINAL_DIFF
+    elo, h2h, diff, delete_original_diff = resolve_feature_flags(elo, h2h, diff, delete_original_diff)
     
     # Ensure data is chronologically sorted (although, it already should be).
     # Adding 'season' as a grouping key prevents rolling windows from crossing
@@ -74,113 +69,56 @@ def build_rolling_features(
 
     if elo:
         # Add ELo: Season regress starts off new seasons by returning elo closer to base.
-        df = add_elo_features(df, K=24.0, base=1500.0, home_adv=60.0, season_regress=0.25)
+        df = add_elo_features(df, **ELO_PARAMS)
     
     if h2h:
         # Add head-to-head history features
         df = add_h2h_features(df, n_h2h_matches=n_matches)
     
-    def compute_team_form(team_name: str) -> pd.DataFrame:
-        """Compute rolling form features for a single team."""
-        # Only consider entries that include the team as either the home or away team.
-        team_df = df[(df["home_team"] == team_name) | (df["away_team"] == team_name)].copy()
-        team_df = team_df.sort_values(["season", "date"]).reset_index(drop=True)
-        
-        # Boolean mask to know whether to use "home" or "away" columns in dataset.
-        mask_home = team_df["home_team"] == team_name
-        
-        # Wins (0 or 1)
-        team_df["wins"] = (
-            # This team was home and the home team won, OR
-            (mask_home & (team_df["result"] == "H")) |
-            # This team was away and the away team won.
-            (~mask_home & (team_df["result"] == "A"))
-        ).astype(int)
-
-        # Points add 3 for a win 1 for a draw and 0 for a loss 
-        team_df["points"] = (3 * team_df["wins"] + (team_df["result"] == "D").astype(int)).astype(int)
-        
-        # Goals scored
-        team_df["goals_scored"] = team_df["home_goals"].where(mask_home, team_df["away_goals"])
-        
-        # Goals conceded
-        team_df["goals_conceded"] = team_df["away_goals"].where(mask_home, team_df["home_goals"])
-        
-        # Shots on target
-        team_df["shots_on_target"] = team_df["home_shots_on_target"].where(mask_home, team_df["away_shots_on_target"])
-        
-        # Fouls committed
-        team_df["fouls_committed"] = team_df["home_fouls"].where(mask_home, team_df["away_fouls"])
-        
-        # Possession percentage
-        team_df["possession_pct"] = team_df["home_possession_pct"].where(mask_home, team_df["away_possession_pct"])
+    # Stack the home and away perspectives of every match into one long table,
+    # and compute each team's form going into every match in a single pass.
+    home, away, _ = encode_teams(df["home_team"], df["away_team"])
+    form = compute_team_form(team_match_long(df, home, away), n_matches)
 
-        # Win streak
-        team_df["form_win_streak"] = consecutive_win_streak_before(team_df["wins"])
-        
-        # For each of the metrics we just computed, calculate the total metrics over the
-        # previous n_matches games.
-        for col in ["wins", "points", "goals_scored", "goals_conceded", "shots_on_target", "fouls_committed"]:
-            # shift() prevents data leakage by shifting the current row down and only including prior rows.
-            # rolling(n_matches) creates rolling window of n_matches entries
-            team_df[f"form_{col}"] = team_df[col].shift().rolling(n_matches, min_periods=1).sum()
-        
-        # For possession_pct, use mean instead of sum (more meaningful for percentages)
-        team_df["form_possession_pct"] = team_df["possession_pct"].shift().rolling(n_matches, min_periods=1).mean()
-            
-        # Add the team name as an identifier.
-        team_df["team"] = team_name
-        
-        # Return only the features useful for the model.
-        return team_df[
-            [
-                "season",
-                "date",
-                "team",
-                "form_wins",
-                "form_points",
-                "form_goals_scored",
-                "form_goals_conceded",
-                "form_shots_on_target",
-                "form_fouls_committed",
-                "form_win_streak",
-                "form_possession_pct"
-            ]
-        ]
-    
-    # Call helper function to compute team form for each team in the dataset.
-    all_teams = pd.concat(
-        [compute_team_form(team) for team in pd.concat([df["home_team"], df["away_team"]]).unique()],
-        ignore_index=True
-    )
+    # The first len(df) rows of the long table are the home perspectives and
+    # the rest are the away perspectives, so attach them to the matches by position.
+    n = len(df)
+    home_form = form.iloc[:n].add_suffix("_home").set_index(df.index)
+    away_form = form.iloc[n:].add_suffix("_away").set_index(df.index)
+    df = pd.concat([df, home_form, away_form], axis=1)
     
-    # For each match, attach the home team's form stats (from the all_teams df)
-    # based on date and team name.
-    df = df.merge(
-        all_teams,
-        # Merge if df["date"] == all_teams["date"] and df["home_team"] == all_teams["team"]
-        left_on=["season", "date", "home_team"],
-        right_on=["season", "date", "team"],
-        # Keep rows from left (df), and bring in matching rows from right (all_teams)
-        how="left",
-        # Add "_home" to overlapping column names to distinguish them before the away merge
-        suffixes=("", "_home")
-    )
-    
-    # Do the same for the away team.
-    df = df.merge(
-        all_teams,
-        left_on=["season", "date", "away_team"],
-        right_on=["season", "date", "team"],
-        how="left",
-        # Now, since the left DataFrame already contains "_home" columns,
-        # we use suffixes=("_home", "_away") to ensure this merge adds distinct "_away" columns
-        suffixes=("_home", "_away")
-    )
+    return finish_features(df, diff=diff, delete_original_diff=delete_original_diff)
+
+def resolve_feature_flags(
+    elo: bool = None,
+    h2h: bool = None,
+    diff: bool = None,
+    delete_original_diff: bool = None
+) -> tuple:
+    """
+    Fill in any feature flag that was not explicitly provided with its config
+    default, and return (elo, h2h, diff, delete_original_diff).
+    """
+    # Import config here to avoid circular imports
+    from model.config import USE_ELO, USE_H2H, USE_DIFF, DELETE_ORIGINAL_DIFF
     
-    # Now that the data has been merged, we can drop redundant team_home and team_away columns.
-    df = df.drop(columns=["team_home", "team_away"])
+    # Use config defaults if not explicitly provided
+    if elo is None:
+        elo = USE_ELO
+    if h2h is None:
+        h2h = USE_H2H
+    if diff is None:
+        diff = USE_DIFF
+    if delete_original_diff is None:
+        delete_original_diff = DELETE_ORIGINAL_DIFF
     
+    return elo, h2h, diff, delete_original_diff
+
+def finish_features(df: pd.DataFrame, diff: bool, delete_original_diff: bool) -> pd.DataFrame:
+    """
+    Final step of the feature build: drop rows without form history, and add
+    the difference features if enabled.
+    """
     # Since we're using rolling averages, the first n_matches games will have NaN values, so drop them.
     # Only drop if both teams has missing data, since dropping rows hurts debugging.
     # df = df.dropna(subset=["form_goals_scored_home", "form_goals_scored_away"], how="all").reset_index(drop=True)
@@ -208,7 +146,8 @@ def add_elo_features(
     """
     Adds pre-match Elo features:
         - elo_home_pre, elo_away_pre, elo_diff_pre
-    And also keeps post-match ratings for debugging (elo_home_post, elo_away_post).
+    Post-match ratings are also computed by the engine (see model/elo.py), but
+    are not attached since they leak the match result.
 
     Parameters
     ----------
@@ -229,66 +168,17 @@ def add_elo_features(
     # Work on a copy, sorted chronologically per your pipeline
     df = df.sort_values(["season", "date"]).reset_index(drop=True).copy()
 
-    # Storage for output columns
-    elo_home_pre, elo_away_pre = [], []
-    elo_home_post, elo_away_post = [], []
-
-    # Ratings dict, reset / regressed each season
-    current_season = None
-    ratings = {}
-
-    for idx, row in df.iterrows():
-        season = row["season"]
-        home = row["home_team"]
-        away = row["away_team"]
-        result = row["result"]  # 'H', 'D', or 'A'
-
-        # When season changes, optionally regress everyone toward base
-        if season != current_season:
-            if current_season is not None and season_regress > 0.0:
-                for t in ratings.keys():
-                    ratings[t] = (1 - season_regress) * ratings[t] + season_regress * base
-            current_season = season
-
-        # Ensure teams exist in ratings dict
-        if home not in ratings:
-            ratings[home] = base
-        if away not in ratings:
-            ratings[away] = base
-
-        Rh, Ra = ratings[home], ratings[away]
+    # Encode teams as integer codes so ratings can live in a NumPy array.
+    home, away, teams = encode_teams(df["home_team"], df["away_team"])
 
-        # Pre-match ratings (what you’ll actually use as features)
-        elo_home_pre.append(Rh)
-        elo_away_pre.append(Ra)
-
-        # Expected score for home with home-adv bump
-        # E_home = 1 / (1 + 10^((Ra - (Rh + home_adv))/400))
-        Rh_adj = Rh + home_adv
-        exp_home = 1.0 / (1.0 + 10.0 ** ((Ra - Rh_adj) / 400.0))
-        exp_away = 1.0 - exp_home
-
-        # Actual scores
-        if result == "H":
-            s_home, s_away = 1.0, 0.0
-        elif result == "A":
-            s_home, s_away = 0.0, 1.0
-        else:  # 'D'
-            s_home, s_away = 0.5, 0.5
-
-        # Elo updates
-        Rh_new = Rh + K * (s_home - exp_home)
-        Ra_new = Ra + K * (s_away - exp_away)
-
-        ratings[home] = Rh_new
-        ratings[away] = Ra_new
-
-        elo_home_post.append(Rh_new)
-        elo_away_post.append(Ra_new)
+    engine = EloEngine(len(teams), K=K, base=base, home_adv=home_adv, season_regress=season_regress)
+    home_pre, away_pre, _, _ = engine.run(
+        home, away, encode_results(df["result"]), df["season"].to_numpy()
+    )
 
     # Attach to df
-    df["elo_home_pre"] = np.array(elo_home_pre, dtype=float)
-    df["elo_away_pre"] = np.array(elo_away_pre, dtype=float)
+    df["elo_home_pre"] = home_pre
+    df["elo_away_pre"] = away_pre
     df["elo_diff_pre"] = df["elo_home_pre"] - df["elo_away_pre"]
 
     return df
@@ -311,7 +201,9 @@ def add_h2h_features(df: pd.DataFrame, n_h2h_matches: int) -> pd.DataFrame:
         - Away team goals conceded in H2H
         
     This is done in a leak-free manner by only considering matches that occurred
-    before the current match date.
+    before the current match date. The history of each pair is kept in a
+    bounded buffer during a single chronological pass (see model/h2h.py),
+    so the cost grows linearly with the number of matches.
     
     Parameters
     ----------
@@ -328,115 +220,24 @@ def add_h2h_features(df: pd.DataFrame, n_h2h_matches: int) -> pd.DataFrame:
     # Ensure sorted
     df = df.sort_values(["season", "date"]).reset_index(drop=True).copy()
     
-    # Initialize columns for H2H features
-    h2h_features = {
-        'h2h_matches': [],
-        'h2h_home_wins': [],
-        'h2h_away_wins': [],
-        'h2h_draws': [],
-        'h2h_home_goals_scored': [],
-        'h2h_home_goals_conceded': [],
-        'h2h_away_goals_scored': [],
-        'h2h_away_goals_conceded': [],
-        'h2h_home_win_pct': [],
-        'h2h_away_win_pct': []
-    }
-    
     df["date"] = pd.to_datetime(df["date"], errors="coerce")
 
-    # For each match, compute H2H statistics
-    for idx, row in df.iterrows():
-        home_team = row['home_team']
-        away_team = row['away_team']
-        current_date = row['date']
-        
-        # Find all previous matches between these two teams (in either order)
-        # Only look at matches before the current date to prevent data leakage
-        h2h_matches = df[
-            (
-                ((df['home_team'] == home_team) & (df['away_team'] == away_team)) |
-                ((df['home_team'] == away_team) & (df['away_team'] == home_team))
-            ) &
-            (df['date'] < current_date)
-        ].tail(n_h2h_matches).copy()
-        
-        # If no previous H2H matches, fill with zeros
-        if len(h2h_matches) == 0:
-            h2h_features['h2h_matches'].append(0)
-            h2h_features['h2h_home_wins'].append(0)
-            h2h_features['h2h_away_wins'].append(0)
-            h2h_features['h2h_draws'].append(0)
-            h2h_features['h2h_home_goals_scored'].append(0)
-            h2h_features['h2h_home_goals_conceded'].append(0)
-            h2h_features['h2h_away_goals_scored'].append(0)
-            h2h_features['h2h_away_goals_conceded'].append(0)
-            h2h_features['h2h_home_win_pct'].append(0.0)
-            h2h_features['h2h_away_win_pct'].append(0.0)
-            continue
-        
-        # Count total H2H matches
-        n_h2h = len(h2h_matches)
-        
-        # For each H2H match, determine which team was home and which was away
-        # and compute outcomes from the perspective of the CURRENT match's home/away teams
-        home_wins = 0
-        away_wins = 0
-        draws = 0
-        home_goals_scored = 0
-        home_goals_conceded = 0
-        away_goals_scored = 0
-        away_goals_conceded = 0
-        
-        for _, h2h_row in h2h_matches.iterrows():
-            h2h_home = h2h_row['home_team']
-            h2h_away = h2h_row['away_team']
-            h2h_result = h2h_row['result']
-            h2h_home_goals = h2h_row['home_goals']
-            h2h_away_goals = h2h_row['away_goals']
-            
-            # Check if current home team was home or away in this H2H match
-            if h2h_home == home_team:
-                # Current home team was playing at home in H2H match
-                home_goals_scored += h2h_home_goals
-                home_goals_conceded += h2h_away_goals
-                away_goals_scored += h2h_away_goals
-                away_goals_conceded += h2h_home_goals
-                
-                if h2h_result == 'H':
-                    home_wins += 1
-                elif h2h_result == 'A':
-                    away_wins += 1
-                else:
-                    draws += 1
-            else:
-                # Current home team was playing away in H2H match
-                home_goals_scored += h2h_away_goals
-                home_goals_conceded += h2h_home_goals
-                away_goals_scored += h2h_home_goals
-                away_goals_conceded += h2h_away_goals
-                
-                if h2h_result == 'A':
-                    home_wins += 1
-                elif h2h_result == 'H':
-                    away_wins += 1
-                else:
-                    draws += 1
-        
-        # Calculate win percentages
-        home_win_pct = home_wins / n_h2h if n_h2h > 0 else 0.0
-        away_win_pct = away_wins / n_h2h if n_h2h > 0 else 0.0
-        
-        # Store features
-        h2h_features['h2h_matches'].append(n_h2h)
-        h2h_features['h2h_home_wins'].append(home_wins)
-        h2h_features['h2h_away_wins'].append(away_wins)
-        h2h_features['h2h_draws'].append(draws)
-        h2h_features['h2h_home_goals_scored'].append(home_goals_scored)
-        h2h_features['h2h_home_goals_conceded'].append(home_goals_conceded)
-        h2h_features['h2h_away_goals_scored'].append(away_goals_scored)
-        h2h_features['h2h_away_goals_conceded'].append(away_goals_conceded)
-        h2h_features['h2h_home_win_pct'].append(home_win_pct)
-        h2h_features['h2h_away_win_pct'].append(away_win_pct)
+    # Single chronological pass: for each match, collect the rows of the last
+    # N encounters between the two teams (in either order) on earlier dates.
+    home, away, _ = encode_teams(df["home_team"], df["away_team"])
+    dates = df["date"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+    windows = PairHistory(n_h2h_matches).advance(home, away, dates)
+
+    # Aggregate the encounters from the perspective of the CURRENT match's
+    # home/away teams, flipping the ones where the sides were swapped.
+    h2h_features = h2h_from_windows(
+        windows,
+        home,
+        record_home=home,
+        record_s_home=encode_results(df["result"]),
+        record_home_goals=df["home_goals"].to_numpy(),
+        record_away_goals=df["away_goals"].to_numpy(),
+    )
     
     # Add all H2H features to the dataframe
     for feature_name, feature_values in h2h_features.items():
@@ -444,16 +245,19 @@ def add_h2h_features(df: pd.DataFrame, n_h2h_matches: int) -> pd.DataFrame:
     
     return df
 
-# Compute win streak
-def consecutive_win_streak_before(wins: pd.Series) -> pd.Series:
+def encode_teams(home_teams: pd.Series, away_teams: pd.Series) -> tuple:
     """
-    Returns the number of consecutive wins before each game.
-    Example: wins = [1,1,0,1] -> streak = [0,1,0,0]
+    Encode the home and away team names as integer codes that share a single
+    index, so arrays of per-team state can be indexed directly by team.
+
+    Returns:
+        The home codes, the away codes, and the team names indexed by code.
     """
-    prev = wins.shift(1).fillna(0).astype(int)   # only look at prior results (leak-free)
-    # Vectorized run-length cumsum over blocks separated by zeros
-    groups = (prev == 0).cumsum()
-    return prev.groupby(groups).cumsum()
+    codes, teams = pd.factorize(
+        pd.concat([home_teams, away_teams], ignore_index=True), use_na_sentinel=False
+    )
+    n = len(home_teams)
+    return codes[:n], codes[n:], teams
 
 def add_diff_features(df: pd.DataFrame, delete_original: bool = False) -> pd.DataFrame:
     """
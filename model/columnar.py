@@ -0,0 +1,157 @@
+"""
+Store a DataFrame as a directory of one binary .npy file per column, plus a
+JSON manifest. Numeric and datetime columns are memory-mapped on load, so
+reading a stored frame does not have to parse anything.
+
+A frame is written to a temporary directory next to its own, which is then
+renamed into place, so a stored frame is never modified: processes that
+have it memory-mapped can't see a partially written file.
+
+Frames can optionally be stored compactly: string columns as integer codes
+into their categories, and numeric columns in the smallest dtype that holds
+their values exactly. They are restored to their original dtypes on load.
+"""
+import json
+import os
+from pathlib import Path
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+MANIFEST = "manifest.json"
+
+
+def save_frame(df: pd.DataFrame, directory: Path, meta: dict = None, compact: bool = False) -> None:
+    """
+    Save a DataFrame to `directory` in the columnar format. If another
+    process saved a complete frame there first, that one is kept, since
+    the directories are named after their contents (see feature_cache.py
+    and raw_snapshot.py).
+
+    Args:
+        df: The DataFrame to store.
+        directory: Where to write the column files and the manifest.
+        meta: Extra JSON-serializable information to keep in the manifest.
+        compact: Store string columns as categorical codes, and numeric
+            columns in the smallest lossless dtype.
+    """
+    directory = Path(directory)
+    directory.parent.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(dir=directory.parent, prefix=f".{directory.name}.", suffix=".tmp"))
+    # mkdtemp only lets its owner in, unlike the directory it replaces.
+    os.chmod(tmp, 0o755)
+    try:
+        _write_frame(df, tmp, meta, compact)
+        _publish(tmp, directory)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _publish(tmp: Path, directory: Path) -> None:
+    """Rename a written frame into place, unless a complete one is already there."""
+    try:
+        os.rename(tmp, directory)
+    except OSError:
+        if read_manifest(directory) is not None:
+            return
+        # A directory without a manifest was left by an interrupted write
+        # from before frames were published by renaming.
+        shutil.rmtree(directory, ignore_errors=True)
+        os.rename(tmp, directory)
+
+
+def _write_frame(df: pd.DataFrame, directory: Path, meta: dict, compact: bool) -> None:
+    """Write the column files and the manifest of a frame into `directory`."""
+    columns = []
+    for i, (name, series) in enumerate(df.items()):
+        entry = {"name": name, "file": f"{i}.npy", "dtype": str(series.dtype)}
+
+        if series.dtype == object and compact:
+            # Categorical: codes into the unique values, -1 for missing.
+            codes, categories = pd.factorize(series)
+            values = codes.astype(_smallest_int(-1, len(categories)))
+            entry["categories"] = f"{i}.categories.npy"
+            np.save(directory / entry["categories"], np.array(categories.astype(str).tolist(), dtype=str))
+        elif series.dtype == object:
+            # Object (string) columns are stored as fixed-width unicode, with
+            # a separate mask marking the missing values.
+            missing = series.isna().to_numpy()
+            values = np.array(series.where(~missing, "").astype(str).tolist(), dtype=str)
+            if missing.any():
+                entry["missing"] = f"{i}.missing.npy"
+                np.save(directory / entry["missing"], missing)
+        else:
+            values = series.to_numpy()
+            if compact:
+                values = _downcast(values)
+
+        np.save(directory / entry["file"], values, allow_pickle=False)
+        columns.append(entry)
+
+    with open(directory / MANIFEST, "w") as f:
+        json.dump({"columns": columns, "rows": len(df), "meta": meta or {}}, f, indent=2)
+
+
+def load_frame(directory: Path, mmap: bool = True) -> pd.DataFrame:
+    """
+    Load a DataFrame saved with `save_frame`.
+
+    Args:
+        directory: The directory the frame was saved to.
+        mmap: Memory-map the numeric and datetime columns (copy-on-write, so
+            the frame can still be modified without touching the files).
+            Each column is kept in a block of its own, since consolidating
+            columns of the same dtype into a 2-D block would copy them.
+    """
+    directory = Path(directory)
+    manifest = read_manifest(directory)
+    mode = "c" if mmap else None
+
+    data = {}
+    for entry in manifest["columns"]:
+        # A plain ndarray view still reads from the mapped file.
+        values = np.load(directory / entry["file"], mmap_mode=mode, allow_pickle=False).view(np.ndarray)
+        if "categories" in entry:
+            categories = np.load(directory / entry["categories"]).astype(object)
+            values = np.append(categories, np.nan)[values]
+        elif entry["dtype"] == "object":
+            values = values.astype(object)
+            if "missing" in entry:
+                values[np.load(directory / entry["missing"])] = np.nan
+        elif str(values.dtype) != entry["dtype"]:
+            # Compactly stored numeric column.
+            values = values.astype(entry["dtype"])
+        data[entry["name"]] = pd.Series(values, copy=False)
+
+    return pd.DataFrame(data, index=pd.RangeIndex(manifest["rows"]), copy=False)
+
+
+def _smallest_int(low: int, high: int) -> np.dtype:
+    """The smallest signed integer dtype holding every value in [low, high]."""
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def _downcast(values: np.ndarray) -> np.ndarray:
+    """Store numeric values in a smaller dtype, only if it is lossless."""
+    if values.dtype.kind == "i" and len(values):
+        return values.astype(_smallest_int(values.min(), values.max()))
+    if values.dtype == np.float64:
+        single = values.astype(np.float32)
+        if np.array_equal(single.astype(np.float64), values, equal_nan=True):
+            return single
+    return values
+
+
+def read_manifest(directory: Path) -> dict:
+    """Read the manifest of a stored frame, or None if there is no complete frame."""
+    path = Path(directory) / MANIFEST
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
@@ -10,6 +10,9 @@ PROJECT_ROOT = Path(__file__).resolve().parents[1]
 # Path to the model.
 MODEL_PATH = PROJECT_ROOT / "model" / "model.joblib"
 
+# Directory holding the raw Football-Data.co.uk season CSVs and scraped data.
+DATA_DIR = PROJECT_ROOT / "model" / "data"
+
 # Path to the TransferMarkt squad valuation data.
 VALUATION_PATH = PROJECT_ROOT / "model" / "data" / "valuations_raw.csv"
 
@@ -19,6 +22,25 @@ POSSESSION_PATH = PROJECT_ROOT / "model" / "data" / "possession_raw.csv"
 # Path to the cached data, before feature matrix engineering.
 RAW_DATA_PATH = PROJECT_ROOT / "model" / "data" / "raw_data.csv"
 
+# Path to the snapshot of the feature state built from the historical seasons
+# (see feature_state.py), so it only has to be built once.
+FEATURE_STATE_PATH = PROJECT_ROOT / "model" / "feature_state.joblib"
+
+# Maximum number of season CSVs parsed concurrently by load_all_seasons
+# (None = let ThreadPoolExecutor decide based on the number of CPUs).
+LOAD_WORKERS = None
+
+# Directory of the binary snapshots of the merged raw data (see
+# raw_snapshot.py), keyed by a hash of the source files.
+RAW_SNAPSHOT_DIR = PROJECT_ROOT / "model" / "cache" / "raw"
+
+# Also write the merged raw data to RAW_DATA_PATH as a CSV, for debugging.
+EXPORT_RAW_DATA = False
+
+# Directory of the content-addressed cache of engineered feature matrices
+# (see feature_cache.py). Each entry is keyed by a hash of its inputs.
+FEATURE_CACHE_DIR = PROJECT_ROOT / "model" / "cache" / "features"
+
 # The number of previous matches to be included to represent a team's current form.
 N_MATCHES = 5
 
@@ -53,4 +75,4 @@ DELETE_ORIGINAL_DIFF = True
 #   - form_win_streak_diff, form_shots_on_target_diff
 #   - odds_home_win, odds_away_win, odds_draw
 #   - form_goals_scored_diff, form_wins_diff, h2h_draws
-FEWER_FEATURES = False
\ No newline at end of file
+FEWER_FEATURES = False
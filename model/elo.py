@@ -0,0 +1,165 @@
+"""
+Array-backed Elo rating engine used to engineer the Elo features.
+
+Ratings live in a NumPy array indexed by integer team codes, so the match
+history can be fed in as pre-encoded arrays instead of DataFrame rows.
+"""
+import numpy as np
+
+
+def encode_results(results) -> np.ndarray:
+    """
+    Encode match results ('H', 'D', or 'A') as the actual score of the home
+    team (1.0, 0.5, or 0.0). Anything that is not a home or away win counts
+    as a draw, which is how the Elo update has always treated it.
+    """
+    results = np.asarray(results, dtype=object)
+    return np.where(results == "H", 1.0, np.where(results == "A", 0.0, 0.5))
+
+
+class EloEngine:
+    """
+    Elo ratings for a fixed number of teams, stored in a NumPy array.
+
+    Parameters
+    ----------
+    n_teams : int
+        Number of integer team codes the engine should hold ratings for.
+    K : float
+        Elo K-factor (update size). Typical 16–32 for soccer.
+    base : float
+        Starting rating for all teams.
+    home_adv : float
+        Home-advantage rating bump (e.g., +60 Elo for the home team).
+    season_regress : float in [0,1]
+        At a new season, ratings := (1 - season_regress) * old + season_regress * base.
+        Set to 0.0 to disable regression.
+    """
+
+    def __init__(
+        self,
+        n_teams: int,
+        K: float = 24.0,
+        base: float = 1500.0,
+        home_adv: float = 60.0,
+        season_regress: float = 0.25,
+    ):
+        self.K = K
+        self.base = base
+        self.home_adv = home_adv
+        self.season_regress = season_regress
+
+        # Every team starts at the base rating. Only teams that have already
+        # played are regressed at a new season, so track those as well.
+        self.ratings = np.full(n_teams, base, dtype=float)
+        self.seen = np.zeros(n_teams, dtype=bool)
+
+        # The season of the last processed match (None before any match).
+        self.season = None
+
+    def grow(self, n_teams: int) -> None:
+        """Make room for team codes up to `n_teams - 1` (e.g., promoted teams)."""
+        extra = n_teams - len(self.ratings)
+        if extra > 0:
+            self.ratings = np.concatenate([self.ratings, np.full(extra, self.base)])
+            self.seen = np.concatenate([self.seen, np.zeros(extra, dtype=bool)])
+
+    def regress(self) -> None:
+        """Regress every team that has played toward the base rating."""
+        if self.season_regress > 0.0:
+            r = self.season_regress
+            self.ratings[self.seen] = (1 - r) * self.ratings[self.seen] + r * self.base
+
+    def peek(self, home: np.ndarray, away: np.ndarray, season: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Pre-match ratings for fixtures that have not been played yet, without
+        changing any ratings. Fixtures in a new season see regressed ratings.
+        """
+        home_pre, away_pre = self.ratings[home], self.ratings[away]
+        if self.season is not None and self.season_regress > 0.0:
+            r = self.season_regress
+            regressed = np.where(self.seen, (1 - r) * self.ratings + r * self.base, self.ratings)
+            new_season = np.asarray(season) != self.season
+            home_pre = np.where(new_season, regressed[home], home_pre)
+            away_pre = np.where(new_season, regressed[away], away_pre)
+        return home_pre, away_pre
+
+    def expected_home(self, rating_home: float, rating_away: float) -> float:
+        """
+        Expected score for home with home-adv bump:
+        E_home = 1 / (1 + 10^((Ra - (Rh + home_adv))/400))
+        """
+        return 1.0 / (1.0 + 10.0 ** ((rating_away - (rating_home + self.home_adv)) / 400.0))
+
+    def _update(self, Rh: float, Ra: float, s_home: float) -> tuple[float, float]:
+        """The Elo update itself, kept in plain floats for speed."""
+        exp_home = self.expected_home(Rh, Ra)
+        exp_away = 1.0 - exp_home
+        s_away = 1.0 - s_home
+
+        Rh_new = Rh + self.K * (s_home - exp_home)
+        Ra_new = Ra + self.K * (s_away - exp_away)
+        return Rh_new, Ra_new
+
+    def run(
+        self,
+        home: np.ndarray,
+        away: np.ndarray,
+        s_home: np.ndarray,
+        season: np.ndarray,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Process a chronologically sorted block of matches.
+
+        Args:
+            home: Integer team codes of the home teams.
+            away: Integer team codes of the away teams.
+            s_home: Actual home scores (see `encode_results`).
+            season: Season of each match. Ratings are regressed whenever the
+                season changes between consecutive matches.
+
+        Returns:
+            Four float arrays: home_pre, away_pre, home_post, away_post.
+        """
+        n = len(home)
+        home_pre = np.empty(n, dtype=float)
+        away_pre = np.empty(n, dtype=float)
+        home_post = np.empty(n, dtype=float)
+        away_post = np.empty(n, dtype=float)
+        if n == 0:
+            return home_pre, away_pre, home_post, away_post
+
+        # Split the history into runs of the same season. Comparing neighbours
+        # (rather than using np.diff) keeps NaN seasons behaving like `!=`.
+        season = np.asarray(season)
+        changes = np.flatnonzero(season[1:] != season[:-1]) + 1
+        bounds = np.concatenate([[0], changes, [n]])
+
+        home_list = np.asarray(home).tolist()
+        away_list = np.asarray(away).tolist()
+        s_list = np.asarray(s_home, dtype=float).tolist()
+
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            # When the season changes, regress the whole array at once.
+            if self.season is not None and season[start] != self.season:
+                self.regress()
+            self.season = season[start]
+
+            # Walk the season on a plain list of floats, which is much cheaper
+            # than indexing NumPy scalars one at a time.
+            ratings = self.ratings.tolist()
+            for i in range(start, stop):
+                h, a = home_list[i], away_list[i]
+                Rh, Ra = ratings[h], ratings[a]
+                Rh_new, Ra_new = self._update(Rh, Ra, s_list[i])
+                ratings[h] = Rh_new
+                ratings[a] = Ra_new
+
+                home_pre[i], away_pre[i] = Rh, Ra
+                home_post[i], away_post[i] = Rh_new, Ra_new
+
+            self.ratings = np.array(ratings, dtype=float)
+            self.seen[home_list[start:stop]] = True
+            self.seen[away_list[start:stop]] = True
+
+        return home_pre, away_pre, home_post, away_post
@@ -0,0 +1,81 @@
+"""
+Content-addressed on-disk cache of engineered feature matrices.
+
+Each cached matrix is keyed by a hash of everything it was built from: the
+season CSVs, the possession and valuation data, N_MATCHES, and the feature
+flags. A hit loads the stored columns (memory-mapped, see columnar.py)
+instead of re-running get_data_only and build_rolling_features.
+"""
+import json
+import logging
+
+import pandas as pd
+
+from model.build_features import build_rolling_features, resolve_feature_flags
+from model.columnar import save_frame, load_frame, read_manifest
+from model.config import FEATURE_CACHE_DIR
+from model.fingerprint import source_digests, fingerprint, changed_inputs
+from model.load_data import get_data_only
+
+logger = logging.getLogger(__name__)
+
+# Pointer to the inputs of the most recently built entry, used to explain
+# why the next lookup missed.
+LATEST = "latest.json"
+
+
+def feature_inputs(end_year: int, num_seasons: int, sportsbook: str, n_matches: int) -> dict:
+    """Describe everything the feature matrix for this configuration depends on."""
+    elo, h2h, diff, delete_original_diff = resolve_feature_flags()
+    return {
+        "files": source_digests(end_year, num_seasons),
+        "params": {
+            "end_year": end_year,
+            "num_seasons": num_seasons,
+            "sportsbook": sportsbook,
+            "n_matches": n_matches,
+            "use_elo": elo,
+            "use_h2h": h2h,
+            "use_diff": diff,
+            "delete_original_diff": delete_original_diff,
+        },
+    }
+
+
+def feature_key(end_year: int, num_seasons: int, sportsbook: str, n_matches: int) -> str:
+    """The cache key of the feature matrix for this configuration."""
+    return fingerprint(feature_inputs(end_year, num_seasons, sportsbook, n_matches))
+
+
+def cached_feature_matrix(end_year: int, num_seasons: int, sportsbook: str, n_matches: int) -> pd.DataFrame:
+    """
+    Return the engineered feature matrix for the configured seasons, loading
+    it from the cache when its inputs are unchanged, and building and caching
+    it otherwise.
+    """
+    inputs = feature_inputs(end_year, num_seasons, sportsbook, n_matches)
+    key = fingerprint(inputs)
+    entry = FEATURE_CACHE_DIR / key
+
+    if read_manifest(entry) is not None:
+        logger.info("Feature cache hit: %s", key)
+        return load_frame(entry)
+
+    logger.info("Feature cache miss: %s (%s)", key, "; ".join(_miss_reasons(inputs)))
+    df = build_rolling_features(get_data_only(end_year, num_seasons, sportsbook), n_matches)
+    save_frame(df, entry, meta={"inputs": inputs})
+
+    with open(FEATURE_CACHE_DIR / LATEST, "w") as f:
+        json.dump({"key": key, "inputs": inputs}, f, indent=2)
+
+    return df
+
+
+def _miss_reasons(inputs: dict) -> list[str]:
+    """Explain a miss by comparing against the inputs of the latest entry."""
+    path = FEATURE_CACHE_DIR / LATEST
+    if not path.exists():
+        return ["no cached feature matrix yet"]
+    with open(path) as f:
+        latest = json.load(f)
+    return changed_inputs(latest["inputs"], inputs) or ["entry was removed"]
@@ -0,0 +1,252 @@
+"""
+As-of index of the match history, to compute the features any fixture would
+have had on any date without replaying the history up to that date.
+
+build_rolling_features (and FeatureState) walk the history once, in order,
+so the features they give are those going into each match as it was played.
+To ask what the features of a fixture were as of an earlier date, e.g., to
+see how a forecast drifted over the season, the history would have to be
+rebuilt up to every date. The FeatureIndex instead keeps:
+    - Per team, prefix sums of its match stats over the long table (see
+      team_form.py), so its rolling form before any date is the difference
+      of two prefix sums found by binary search.
+    - Per team, its Elo rating after each of its matches, so its rating on
+      any date is its rating after its last match before that date,
+      regressed once for every new season since.
+    - Per pair of teams, prefix sums of their encounters, for the H2H
+      features, like the form.
+
+A query for a whole array of fixtures is a handful of vectorized binary
+searches and subtractions.
+"""
+import numpy as np
+import pandas as pd
+
+from model.build_features import ELO_PARAMS, add_diff_features, encode_teams, resolve_feature_flags
+from model.elo import EloEngine, encode_results
+from model.feature_state import STATS
+from model.h2h import H2H_COLUMNS
+from model.team_form import FORM_COLUMNS, SUM_STATS, team_match_long
+
+# Search keys pack a team (or pair of teams) code and a date, as days since
+# the epoch, into a single int64, so each binary search is a single
+# np.searchsorted on one sorted array.
+DAY_BITS = 32
+
+
+def _days(dates) -> np.ndarray:
+    """Dates as whole days since the epoch."""
+    return pd.to_datetime(pd.Series(dates), errors="coerce").to_numpy(dtype="datetime64[D]").astype(np.int64)
+
+
+class FeatureIndex:
+    """
+    As-of index of the form, Elo, and H2H features of a match history.
+
+    Args:
+        df: Our raw DataFrame (see model/load_data.py:get_data_only),
+            optionally with the current season's matches appended. Matches
+            without a date are left out.
+        n_matches: Number of matches for rolling window.
+        elo: Enable Elo features (None = use config default).
+        h2h: Enable H2H features (None = use config default).
+        diff: Enable difference features (None = use config default).
+        delete_original_diff: Delete original home/away columns when using diff (None = use config default).
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        n_matches: int,
+        elo: bool = None,
+        h2h: bool = None,
+        diff: bool = None,
+        delete_original_diff: bool = None,
+    ):
+        self.n_matches = n_matches
+        self.elo, self.h2h, self.diff, self.delete_original_diff = resolve_feature_flags(
+            elo, h2h, diff, delete_original_diff
+        )
+
+        df = df.assign(date=pd.to_datetime(df["date"], errors="coerce"))
+        df = df[df["date"].notna()].sort_values(["season", "date"]).reset_index(drop=True)
+        home, away, teams = encode_teams(df["home_team"], df["away_team"])
+        self.team_codes = {team: code for code, team in enumerate(teams)}
+        days = _days(df["date"])
+
+        # Every team's matches, as one run of the long table per team in
+        # chronological order, with a key of (team, day) for each row.
+        long = team_match_long(df, home, away)
+        team = long["team"].to_numpy()
+        match = long["match"].to_numpy()
+        order = np.lexsort((match, days[match], team))
+        team, match = team[order], match[order]
+        self.keys = (team << DAY_BITS) | days[match]
+
+        # Prefix sums (with a leading row of zeros) of the stats, and of how
+        # many of them are present, since rolling sums skip NaN.
+        values = long[STATS].to_numpy(dtype=float)[order]
+        present = ~np.isnan(values)
+        self.sums = _prefix(np.where(present, values, 0.0))
+        self.counts = _prefix(present.astype(np.int64))
+
+        # Position of the latest non-win of each row's team up to that row
+        # (or just before the team's run), to count win streaks.
+        rows = np.arange(len(team))
+        run_start = np.searchsorted(self.keys, team << DAY_BITS)
+        wins = long["wins"].to_numpy()[order]
+        self.last_non_win = np.maximum.accumulate(np.where(wins == 0, rows, run_start - 1))
+
+        if self.elo:
+            # Ratings after each match, and the season of each match, for
+            # every row of the long table.
+            engine = EloEngine(len(teams), **ELO_PARAMS)
+            season = df["season"].to_numpy()
+            _, _, home_post, away_post = engine.run(home, away, encode_results(df["result"]), season)
+            self.post = np.concatenate([home_post, away_post])[order]
+            self.row_season = np.concatenate([season, season])[order]
+            self.seasons = np.unique(season)
+
+        if self.h2h:
+            # Every encounter of every pair (lower code first), with the
+            # stats of both sides.
+            low, high = np.minimum(home, away), np.maximum(home, away)
+            pair = low * len(teams) + high
+            pair_order = np.lexsort((np.arange(len(df)), days, pair))
+            self.pair_keys = (pair[pair_order] << DAY_BITS) | days[pair_order]
+
+            s_home = encode_results(df["result"])
+            low_is_home = home == low
+            s_low = np.where(low_is_home, s_home, 1.0 - s_home)
+            goals = df[["home_goals", "away_goals"]].to_numpy(dtype=float)
+            low_goals = np.where(low_is_home, goals[:, 0], goals[:, 1])
+            high_goals = np.where(low_is_home, goals[:, 1], goals[:, 0])
+            encounters = np.column_stack([s_low == 1.0, s_low == 0.0, low_goals, high_goals])
+            self.pair_sums = _prefix(encounters[pair_order].astype(float))
+
+    def features(self, home_teams, away_teams, dates, seasons) -> pd.DataFrame:
+        """
+        The features of fixtures as of the given dates, i.e., from the matches
+        before those dates only, with the columns FeatureState.update gives
+        (without the match's own columns, e.g., the odds). Rows are never
+        dropped, so they line up with the fixtures.
+
+        Args:
+            home_teams, away_teams: Team names of the fixtures.
+            dates: The date each fixture's features are as of.
+            seasons: The season each fixture is in, for the Elo regression.
+        """
+        home = self._encode(home_teams)
+        away = self._encode(away_teams)
+        days = _days(dates)
+        out = {}
+
+        if self.elo:
+            home_pre = self._elo(home, days, np.asarray(seasons))
+            away_pre = self._elo(away, days, np.asarray(seasons))
+            out["elo_home_pre"] = home_pre
+            out["elo_away_pre"] = away_pre
+            out["elo_diff_pre"] = home_pre - away_pre
+
+        if self.h2h:
+            out.update(self._h2h(home, away, days))
+
+        home_form, away_form = self._form(home, days), self._form(away, days)
+        for k, col in enumerate(FORM_COLUMNS):
+            out[f"{col}_home"] = home_form[:, k]
+        for k, col in enumerate(FORM_COLUMNS):
+            out[f"{col}_away"] = away_form[:, k]
+
+        df = pd.DataFrame(out)
+        if self.diff:
+            df = add_diff_features(df, delete_original=self.delete_original_diff)
+        return df
+
+    def _encode(self, names) -> np.ndarray:
+        """Team codes of the names, and -1 for teams without any match."""
+        return np.array([self.team_codes.get(name, -1) for name in names], dtype=np.int64)
+
+    def _runs(self, keys: np.ndarray, codes: np.ndarray, days: np.ndarray, n: int) -> tuple:
+        """
+        For each (code, day), the start of the code's run in `keys`, and the
+        bounds of its last `n` rows before that day. Unknown codes (-1) get
+        an empty window.
+        """
+        known = codes >= 0
+        codes = np.where(known, codes, 0)
+        start = np.searchsorted(keys, codes << DAY_BITS)
+        stop = np.where(known, np.searchsorted(keys, (codes << DAY_BITS) | days), start)
+        return start, np.maximum(stop - n, start), stop
+
+    def _form(self, teams: np.ndarray, days: np.ndarray) -> np.ndarray:
+        """Each team's FORM_COLUMNS values going into a match on the given day."""
+        start, low, stop = self._runs(self.keys, teams, days, self.n_matches)
+        sums = self.sums[stop] - self.sums[low]
+        counts = self.counts[stop] - self.counts[low]
+
+        # Like rolling(min_periods=1): NaN when the window holds no values.
+        values = np.where(counts > 0, sums, np.nan)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            possession = np.where(counts[:, -1] > 0, sums[:, -1] / counts[:, -1], np.nan)
+
+        # Rows since the last non-win before the match.
+        played = stop > start
+        streak = np.where(played, stop - 1 - self.last_non_win[np.maximum(stop - 1, 0)], 0)
+        return np.column_stack([values[:, : len(SUM_STATS)], streak, possession])
+
+    def _elo(self, teams: np.ndarray, days: np.ndarray, seasons: np.ndarray) -> np.ndarray:
+        """
+        Each team's rating going into a match on the given day: its rating
+        after its last match before then, regressed for every season change
+        since (including into `seasons`, if it is after the indexed ones).
+        """
+        base, r = ELO_PARAMS["base"], ELO_PARAMS["season_regress"]
+        start, _, stop = self._runs(self.keys, teams, days, 0)
+        played = stop > start
+        last = np.maximum(stop - 1, 0)
+
+        changes = np.searchsorted(self.seasons, seasons, side="right") - np.searchsorted(
+            self.seasons, self.row_season[last], side="right"
+        )
+        changes += (seasons > self.row_season[last]) & ~np.isin(seasons, self.seasons)
+        regressed = base + (1 - r) ** np.maximum(changes, 0) * (self.post[last] - base)
+        return np.where(played, regressed, base)
+
+    def _h2h(self, home: np.ndarray, away: np.ndarray, days: np.ndarray) -> dict:
+        """The H2H features of fixtures on the given days, like h2h_from_windows."""
+        n_teams = len(self.team_codes)
+        low, high = np.minimum(home, away), np.maximum(home, away)
+        pair = np.where((home >= 0) & (away >= 0), low * n_teams + high, -1)
+        _, first, stop = self._runs(self.pair_keys, pair, days, self.n_matches)
+        low_wins, high_wins, low_goals, high_goals = (self.pair_sums[stop] - self.pair_sums[first]).T
+
+        # Turn the lower code's side into the home team's.
+        home_is_low = home == low
+        n_h2h = stop - first
+        home_wins = np.where(home_is_low, low_wins, high_wins).astype(int)
+        away_wins = np.where(home_is_low, high_wins, low_wins).astype(int)
+        scored = np.where(home_is_low, low_goals, high_goals)
+        conceded = np.where(home_is_low, high_goals, low_goals)
+        has_h2h = n_h2h > 0
+        denom = np.maximum(n_h2h, 1)
+
+        columns = {
+            "h2h_matches": n_h2h,
+            "h2h_home_wins": home_wins,
+            "h2h_away_wins": away_wins,
+            "h2h_draws": n_h2h - home_wins - away_wins,
+            "h2h_home_goals_scored": scored,
+            "h2h_home_goals_conceded": conceded,
+            "h2h_away_goals_scored": conceded.copy(),
+            "h2h_away_goals_conceded": scored.copy(),
+            "h2h_home_win_pct": np.where(has_h2h, home_wins / denom, 0.0),
+            "h2h_away_win_pct": np.where(has_h2h, away_wins / denom, 0.0),
+        }
+        return {col: columns[col] for col in H2H_COLUMNS}
+
+
+def _prefix(values: np.ndarray) -> np.ndarray:
+    """Cumulative sums along the rows, with a leading row of zeros."""
+    out = np.zeros((len(values) + 1,) + values.shape[1:], dtype=values.dtype)
+    np.cumsum(values, axis=0, out=out[1:])
+    return out
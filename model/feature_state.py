@@ -0,0 +1,375 @@
+"""
+Persistent, incremental version of the feature build.
+
+A FeatureState holds everything build_rolling_features needs to know about
+the past going into the next match: each team's rolling window of match stats
+and win streak, the Elo ratings, and the H2H buffers of every pair of teams.
+It is built once from the historical seasons and saved to disk, so new
+matches only have to be applied on top of it instead of replaying the whole
+history.
+"""
+import copy
+import os
+from pathlib import Path
+import tempfile
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from model.build_features import (
+    ELO_PARAMS,
+    build_rolling_features,
+    finish_features,
+    resolve_feature_flags,
+)
+from model.elo import EloEngine, encode_results
+from model.h2h import PairHistory, h2h_from_windows
+from model.team_form import SUM_STATS, FORM_COLUMNS, team_match_long, consecutive_win_streak_before
+
+# Per-match statistics kept in each team's rolling window.
+STATS = SUM_STATS + ["possession_pct"]
+
+# Version of what a FeatureState holds. Bump it whenever its fields change,
+# so that snapshots saved before are rebuilt rather than loaded.
+STATE_VERSION = 2
+
+
+class FeatureState:
+    """
+    Incremental feature state for the matches seen so far.
+
+    Args:
+        n_matches: Number of matches for rolling window.
+        elo: Enable Elo features (None = use config default).
+        h2h: Enable H2H features (None = use config default).
+        diff: Enable difference features (None = use config default).
+        delete_original_diff: Delete original home/away columns when using diff (None = use config default).
+    """
+
+    def __init__(
+        self,
+        n_matches: int,
+        elo: bool = None,
+        h2h: bool = None,
+        diff: bool = None,
+        delete_original_diff: bool = None,
+    ):
+        self.n_matches = n_matches
+        self.elo, self.h2h, self.diff, self.delete_original_diff = resolve_feature_flags(
+            elo, h2h, diff, delete_original_diff
+        )
+
+        # Integer code of every team seen so far, indexing the arrays below.
+        self.team_codes = {}
+
+        # Rolling window of each team's last n_matches STATS, oldest first
+        # and NaN-padded, plus the number of consecutive wins going in.
+        self.form = np.full((0, n_matches, len(STATS)), np.nan)
+        self.streak = np.zeros(0, dtype=int)
+
+        self.ratings = EloEngine(0, **ELO_PARAMS)
+
+        # H2H buffers hold indices into the records of every match seen.
+        self.pairs = PairHistory(n_matches)
+        self.records = {
+            "record_home": np.empty(0, dtype=int),
+            "record_s_home": np.empty(0, dtype=float),
+            "record_home_goals": np.empty(0, dtype=int),
+            "record_away_goals": np.empty(0, dtype=int),
+        }
+
+        # Total home goals, away goals, and matches of each result (home
+        # win, draw, away win) seen so far, whether H2H is enabled or not.
+        self.goals = np.zeros((3, 3))
+
+        # Column means of the historical feature matrix, used to impute the
+        # features that are missing for the current season.
+        self.feature_means = pd.Series(dtype=float)
+
+        # Identifies the data the state was built from (see load_feature_state).
+        self.source = None
+
+    @classmethod
+    def from_history(
+        cls,
+        df: pd.DataFrame,
+        n_matches: int,
+        features: pd.DataFrame = None,
+        **flags,
+    ) -> "FeatureState":
+        """
+        Build the state from the historical match data, using the same
+        building blocks as build_rolling_features.
+
+        Args:
+            df: Our raw DataFrame (see model/load_data.py:get_data_only).
+            n_matches: Number of matches for rolling window.
+            features: The feature matrix of `df`, if already built (e.g., from
+                the feature cache). Built with build_rolling_features if None.
+            flags: Feature flags, as for build_rolling_features.
+        """
+        state = cls(n_matches, **flags)
+        if features is None:
+            features = build_rolling_features(
+                df, n_matches, state.elo, state.h2h, state.diff, state.delete_original_diff
+            )
+        state.feature_means = features.mean(numeric_only=True)
+
+        df = df.sort_values(["season", "date"]).reset_index(drop=True)
+        home, away = state._encode(df)
+
+        if state.elo:
+            state.ratings.run(home, away, encode_results(df["result"]), df["season"].to_numpy())
+
+        if state.h2h:
+            state.pairs.advance(home, away, _date_values(df["date"]))
+            state._add_records(df, home)
+        state._add_goals(df)
+
+        # Each team's window is its last n_matches rows of the long table,
+        # and its streak is the streak going into its last match, carried on
+        # by that match.
+        long = team_match_long(df, home, away)
+        long = long.iloc[np.lexsort((long["match"].to_numpy(), long["team"].to_numpy()))].reset_index(drop=True)
+        long["streak"] = consecutive_win_streak_before(long["wins"], by=long["team"])
+
+        window = long.groupby("team").tail(n_matches)
+        slot = n_matches - 1 - window.groupby("team").cumcount(ascending=False).to_numpy()
+        state.form[window["team"].to_numpy(), slot] = window[STATS].to_numpy(dtype=float)
+
+        last = long.groupby("team").tail(1)
+        state.streak[last["team"].to_numpy()] = np.where(last["wins"] == 1, last["streak"] + 1, 0)
+
+        return state
+
+    def update(self, new_matches: pd.DataFrame) -> pd.DataFrame:
+        """
+        Advance the state with new matches, and return the feature rows for
+        them, as build_rolling_features would have produced for these matches
+        given the full history.
+
+        Matches with a result ('H', 'D', or 'A') are applied to the state.
+        Upcoming fixtures (no result yet) only get their feature rows, based
+        on the state after all played matches.
+
+        Args:
+            new_matches: Matches in the same raw format as the history, all
+                played after the matches already in the state.
+
+        Returns:
+            The feature rows for the new matches, played ones first.
+        """
+        df = new_matches.sort_values(["season", "date"]).reset_index(drop=True)
+        if self.h2h:
+            df["date"] = pd.to_datetime(df["date"], errors="coerce")
+
+        played = df["result"].isin(["H", "D", "A"]).to_numpy()
+        rows = pd.concat(
+            [self._features(df[played], advance=True), self._features(df[~played], advance=False)],
+            ignore_index=True,
+        )
+        return finish_features(rows, diff=self.diff, delete_original_diff=self.delete_original_diff)
+
+    def scorelines(self) -> np.ndarray:
+        """
+        The average (home, away) goals of a home win, a draw, and an away win,
+        over every match seen so far, as a (3, 2) array.
+        """
+        return self.goals[:, :2] / np.maximum(self.goals[:, 2:], 1)
+
+    def copy(self) -> "FeatureState":
+        """Return an independent copy, e.g., to update without touching a snapshot."""
+        return copy.deepcopy(self)
+
+    def save(self, path: Path) -> None:
+        """
+        Save the state to file. It is written to a temporary file first and
+        then moved into place, so that other processes loading the same
+        path (e.g., the workers, or the API) never see a partial file.
+        """
+        path = Path(path)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                joblib.dump(self, f)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    @staticmethod
+    def load(path: Path) -> "FeatureState":
+        """Load a state previously saved with `save`."""
+        return joblib.load(path)
+
+    def _features(self, df: pd.DataFrame, advance: bool) -> pd.DataFrame:
+        """
+        Compute the Elo, H2H, and form features of a block of matches, in the
+        column order of build_rolling_features, advancing the state if asked.
+        """
+        df = df.reset_index(drop=True)
+        home, away = self._encode(df)
+        out = [df]
+
+        if self.elo:
+            season = df["season"].to_numpy()
+            if advance:
+                home_pre, away_pre, _, _ = self.ratings.run(home, away, encode_results(df["result"]), season)
+            else:
+                home_pre, away_pre = self.ratings.peek(home, away, season)
+            out.append(pd.DataFrame({
+                "elo_home_pre": home_pre,
+                "elo_away_pre": away_pre,
+                "elo_diff_pre": home_pre - away_pre,
+            }))
+
+        if self.h2h:
+            dates = _date_values(df["date"])
+            if advance:
+                windows = self.pairs.advance(home, away, dates)
+                self._add_records(df, home)
+            else:
+                windows = self.pairs.peek(home, away, dates)
+            out.append(pd.DataFrame(h2h_from_windows(windows, home, **self.records)))
+
+        if advance:
+            self._add_goals(df)
+
+        home_form, away_form = self._form(df, home, away, advance)
+        out.append(home_form.add_suffix("_home"))
+        out.append(away_form.add_suffix("_away"))
+
+        return pd.concat(out, axis=1)
+
+    def _form(self, df: pd.DataFrame, home: np.ndarray, away: np.ndarray, advance: bool) -> tuple:
+        """
+        Read both teams' form going into each match, then push the match onto
+        their windows if advancing. Returns the home and away form frames.
+        """
+        m = len(df)
+        home_form = np.empty((m, len(FORM_COLUMNS)))
+        away_form = np.empty((m, len(FORM_COLUMNS)))
+        if advance:
+            long = team_match_long(df, home, away)
+            stats = long[STATS].to_numpy(dtype=float)
+            wins = long["wins"].to_numpy()
+
+        for i in range(m):
+            h, a = home[i], away[i]
+            home_form[i] = self._team_form(h)
+            away_form[i] = self._team_form(a)
+            if advance:
+                self._push(h, stats[i], wins[i])
+                self._push(a, stats[m + i], wins[m + i])
+
+        home_form = pd.DataFrame(home_form, columns=FORM_COLUMNS)
+        away_form = pd.DataFrame(away_form, columns=FORM_COLUMNS)
+        for form in (home_form, away_form):
+            form["form_win_streak"] = form["form_win_streak"].astype(int)
+        return home_form, away_form
+
+    def _team_form(self, team: int) -> np.ndarray:
+        """A team's FORM_COLUMNS values going into its next match."""
+        window = self.form[team]
+        counts = (~np.isnan(window)).sum(axis=0)
+        sums = np.nansum(window, axis=0)
+
+        # Like rolling(min_periods=1): NaN when the window holds no values.
+        values = np.where(counts > 0, sums, np.nan)
+        possession = values[-1] / counts[-1] if counts[-1] else np.nan
+        return np.concatenate([values[:-1], [self.streak[team], possession]])
+
+    def _push(self, team: int, stats: np.ndarray, won: int) -> None:
+        """Push a played match onto a team's window and win streak."""
+        self.form[team, :-1] = self.form[team, 1:]
+        self.form[team, -1] = stats
+        self.streak[team] = self.streak[team] + 1 if won else 0
+
+    def _encode(self, df: pd.DataFrame) -> tuple:
+        """
+        Map team names to integer codes, adding any new team (e.g., a newly
+        promoted one) with an empty window and the base Elo rating.
+        """
+        for name in pd.unique(pd.concat([df["home_team"], df["away_team"]])):
+            if name not in self.team_codes:
+                self.team_codes[name] = len(self.team_codes)
+
+        extra = len(self.team_codes) - len(self.streak)
+        if extra > 0:
+            self.form = np.concatenate([self.form, np.full((extra,) + self.form.shape[1:], np.nan)])
+            self.streak = np.concatenate([self.streak, np.zeros(extra, dtype=int)])
+            self.ratings.grow(len(self.team_codes))
+
+        home = df["home_team"].map(self.team_codes).to_numpy(dtype=int)
+        away = df["away_team"].map(self.team_codes).to_numpy(dtype=int)
+        return home, away
+
+    def _add_records(self, df: pd.DataFrame, home: np.ndarray) -> None:
+        """Append the matches that the H2H buffers can refer to."""
+        new = {
+            "record_home": home,
+            "record_s_home": encode_results(df["result"]),
+            "record_home_goals": df["home_goals"].to_numpy(),
+            "record_away_goals": df["away_goals"].to_numpy(),
+        }
+        for key, values in new.items():
+            self.records[key] = np.concatenate([self.records[key], values])
+
+    def _add_goals(self, df: pd.DataFrame) -> None:
+        """Add the goals of played matches to the totals of their results."""
+        outcome = df["result"].map({"H": 0, "D": 1, "A": 2}).to_numpy(dtype=float)
+        goals = df[["home_goals", "away_goals"]].to_numpy(dtype=float)
+        known = ~np.isnan(outcome) & ~np.isnan(goals).any(axis=1)
+        totals = np.column_stack([goals[known], np.ones(known.sum())])
+        np.add.at(self.goals, outcome[known].astype(int), totals)
+
+
+def _date_values(dates: pd.Series) -> np.ndarray:
+    """Match dates as int64 nanoseconds, the way PairHistory expects them."""
+    return pd.to_datetime(dates, errors="coerce").to_numpy(dtype="datetime64[ns]").view(np.int64)
+
+
+def state_source(end_year: int, num_seasons: int, sportsbook: str, n_matches: int) -> str:
+    """
+    The source a feature state snapshot for this configuration must have:
+    the key of its input data and configuration (see feature_cache.py), and
+    the STATE_VERSION.
+    """
+    from model.feature_cache import feature_key
+
+    return f"{feature_key(end_year, num_seasons, sportsbook, n_matches)}-v{STATE_VERSION}"
+
+
+def load_feature_state(
+    end_year: int,
+    num_seasons: int,
+    sportsbook: str,
+    n_matches: int,
+    path: Path = None,
+) -> FeatureState:
+    """
+    Load the feature state snapshot of the historical seasons, building and
+    saving it first if there is no snapshot for the current input data,
+    configuration, and STATE_VERSION (see state_source) yet.
+    """
+    from model.config import FEATURE_STATE_PATH
+    from model.feature_cache import cached_feature_matrix
+    from model.load_data import get_data_only
+
+    path = Path(path or FEATURE_STATE_PATH)
+    source = state_source(end_year, num_seasons, sportsbook, n_matches)
+
+    if path.exists():
+        state = FeatureState.load(path)
+        if state.source == source:
+            return state
+
+    state = FeatureState.from_history(
+        get_data_only(end_year, num_seasons, sportsbook),
+        n_matches,
+        features=cached_feature_matrix(end_year, num_seasons, sportsbook, n_matches),
+    )
+    state.source = source
+    state.save(path)
+    return state
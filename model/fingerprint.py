@@ -0,0 +1,66 @@
+"""
+Fingerprint the input data files and configuration that a derived artifact
+(e.g., a cached feature matrix) was built from, so the artifact can be reused
+exactly when none of them changed.
+"""
+import hashlib
+import json
+from pathlib import Path
+
+from model.config import DATA_DIR, POSSESSION_PATH, VALUATION_PATH
+
+
+def season_paths(end_year: int, num_seasons: int) -> list[Path]:
+    """
+    The Football-Data.co.uk CSVs for the configured seasons. This will end at
+    `end_year` and begin at the year starting the season `num_seasons` seasons
+    from `end_year` (e.g., from 15/16 to 24/25).
+    """
+    return [
+        DATA_DIR / f"football_data_{y1}_{y1 + 1}.csv"
+        for y1 in range(end_year - num_seasons, end_year)
+    ]
+
+
+def source_paths(end_year: int, num_seasons: int) -> list[Path]:
+    """Every input file that get_data_only reads."""
+    return season_paths(end_year, num_seasons) + [Path(POSSESSION_PATH), Path(VALUATION_PATH)]
+
+
+def file_digest(path: Path) -> str:
+    """SHA-256 of a file's contents, or "missing" if it does not exist."""
+    path = Path(path)
+    if not path.exists():
+        return "missing"
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_digests(end_year: int, num_seasons: int) -> dict:
+    """Map each input file name to the digest of its contents."""
+    return {path.name: file_digest(path) for path in source_paths(end_year, num_seasons)}
+
+
+def fingerprint(inputs: dict) -> str:
+    """A short, stable key for a JSON-serializable description of the inputs."""
+    blob = json.dumps(inputs, sort_keys=True, default=str).encode()
+    return hashlib.sha256(blob).hexdigest()[:16]
+
+
+def changed_inputs(old: dict, new: dict, prefix: str = "") -> list[str]:
+    """
+    List the entries that differ between two input descriptions, e.g., to
+    explain why a cached artifact could not be reused.
+    """
+    changes = []
+    for key in sorted(set(old) | set(new)):
+        name = f"{prefix}{key}"
+        a, b = old.get(key), new.get(key)
+        if isinstance(a, dict) and isinstance(b, dict):
+            changes += changed_inputs(a, b, prefix=f"{name}.")
+        elif a != b:
+            changes.append(f"{name} changed ({a} -> {b})")
+    return changes
@@ -0,0 +1,172 @@
+"""
+Head-to-head (H2H) history between pairs of teams, computed in a single
+chronological pass instead of re-scanning the match table for every match.
+"""
+from collections import deque
+
+import numpy as np
+
+# Output columns, in the order add_h2h_features has always produced them.
+H2H_COLUMNS = [
+    "h2h_matches",
+    "h2h_home_wins",
+    "h2h_away_wins",
+    "h2h_draws",
+    "h2h_home_goals_scored",
+    "h2h_home_goals_conceded",
+    "h2h_away_goals_scored",
+    "h2h_away_goals_conceded",
+    "h2h_home_win_pct",
+    "h2h_away_win_pct",
+]
+
+# Sentinel datetime64 value (as int64) used by NumPy for NaT.
+NAT = np.iinfo(np.int64).min
+
+
+class PairHistory:
+    """
+    Bounded buffers holding the row indices of the last `n` encounters for
+    every unordered pair of teams.
+
+    Rows are fed in chronological order through `advance`, which may be called
+    repeatedly (e.g., once for the history and again for new matches). Row
+    indices are global across calls, so they can index one growing table of
+    match records.
+
+    A match only sees encounters from strictly earlier dates, so rows are held
+    back until the date changes before being added to their pair's buffer.
+    """
+
+    def __init__(self, n: int):
+        self.n = n
+        self.buffers = {}
+        self.pending = []
+        self.current_date = None
+        self.size = 0
+
+    def advance(self, home: np.ndarray, away: np.ndarray, dates: np.ndarray) -> np.ndarray:
+        """
+        Process a chronologically sorted block of matches.
+
+        Args:
+            home: Integer team codes of the home teams.
+            away: Integer team codes of the away teams.
+            dates: Match dates as int64 nanoseconds (NaT as `NAT`).
+
+        Returns:
+            An (m, n) array where row i holds the global row indices of the
+            previous encounters between the teams of match i, oldest first,
+            padded with -1.
+        """
+        m = len(home)
+        windows = np.full((m, self.n), -1, dtype=np.int64)
+
+        for i, (h, a, d) in enumerate(zip(np.asarray(home).tolist(), np.asarray(away).tolist(), np.asarray(dates).tolist())):
+            # Matches without a valid date neither see nor add to the history,
+            # since comparisons against NaT are always False.
+            if d == NAT:
+                continue
+
+            # Once the date moves on, the previous day's matches become history.
+            if d != self.current_date:
+                self._flush()
+                self.current_date = d
+
+            key = (h, a) if h < a else (a, h)
+            buffer = self.buffers.get(key)
+            if buffer:
+                windows[i, : len(buffer)] = buffer
+            self.pending.append((key, self.size + i))
+
+        self.size += m
+        return windows
+
+    def peek(self, home: np.ndarray, away: np.ndarray, dates: np.ndarray) -> np.ndarray:
+        """
+        Like `advance`, but for fixtures that have not been played yet: the
+        windows are looked up without adding the fixtures to the history.
+        """
+        m = len(home)
+        windows = np.full((m, self.n), -1, dtype=np.int64)
+
+        for i, (h, a, d) in enumerate(zip(np.asarray(home).tolist(), np.asarray(away).tolist(), np.asarray(dates).tolist())):
+            if d == NAT:
+                continue
+
+            key = (h, a) if h < a else (a, h)
+            rows = list(self.buffers.get(key, ()))
+            # Held-back rows are history for any fixture on a later date.
+            if d != self.current_date:
+                rows += [row for k, row in self.pending if k == key]
+            rows = rows[-self.n:]
+            windows[i, : len(rows)] = rows
+
+        return windows
+
+    def _flush(self) -> None:
+        """Move the held-back rows into their pairs' buffers."""
+        for key, row in self.pending:
+            buffer = self.buffers.get(key)
+            if buffer is None:
+                buffer = self.buffers[key] = deque(maxlen=self.n)
+            buffer.append(row)
+        self.pending = []
+
+
+def h2h_from_windows(
+    windows: np.ndarray,
+    home: np.ndarray,
+    record_home: np.ndarray,
+    record_s_home: np.ndarray,
+    record_home_goals: np.ndarray,
+    record_away_goals: np.ndarray,
+) -> dict:
+    """
+    Aggregate the H2H features from the encounter windows built by
+    `PairHistory.advance`, from the perspective of each match's home team.
+
+    Args:
+        windows: (m, n) global row indices of previous encounters (-1 = none).
+        home: Integer team codes of the home teams of the m matches.
+        record_*: Home team codes, actual home scores (see
+            model/elo.py:encode_results), and goals for every row that the
+            window indices refer to.
+
+    Returns:
+        A dictionary mapping each column in H2H_COLUMNS to its values.
+    """
+    valid = windows >= 0
+    idx = np.where(valid, windows, 0)
+
+    # Flip each previous encounter into the current home team's perspective.
+    same_side = record_home[idx] == home[:, None]
+    s = np.where(same_side, record_s_home[idx], 1.0 - record_s_home[idx])
+    scored = np.where(same_side, record_home_goals[idx], record_away_goals[idx])
+    conceded = np.where(same_side, record_away_goals[idx], record_home_goals[idx])
+
+    n_h2h = valid.sum(axis=1)
+    home_wins = (valid & (s == 1.0)).sum(axis=1)
+    away_wins = (valid & (s == 0.0)).sum(axis=1)
+    draws = n_h2h - home_wins - away_wins
+
+    zero = np.zeros((), dtype=scored.dtype)
+    home_goals_scored = np.where(valid, scored, zero).sum(axis=1)
+    home_goals_conceded = np.where(valid, conceded, zero).sum(axis=1)
+
+    has_h2h = n_h2h > 0
+    denom = np.maximum(n_h2h, 1)
+
+    return {
+        "h2h_matches": n_h2h,
+        "h2h_home_wins": home_wins,
+        "h2h_away_wins": away_wins,
+        "h2h_draws": draws,
+        "h2h_home_goals_scored": home_goals_scored,
+        "h2h_home_goals_conceded": home_goals_conceded,
+        # The away team's goals are the home team's, seen from the other side.
+        "h2h_away_goals_scored": home_goals_conceded.copy(),
+        "h2h_away_goals_conceded": home_goals_scored.copy(),
+        "h2h_home_win_pct": np.where(has_h2h, home_wins / denom, 0.0),
+        "h2h_away_win_pct": np.where(has_h2h, away_wins / denom, 0.0),
+    }
@@ -2,28 +2,92 @@
 Read and clean the raw CSVs from our data source, and load into a Pandas DataFrame.
 """
 import re
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 
 from model.merge_possession import merge_possession_into_dataframe
 from model.merge_valuations import merge_valuations_into_dataframe
-from model.config import RAW_DATA_PATH
+from model.config import RAW_DATA_PATH, EXPORT_RAW_DATA, LOAD_WORKERS
+from model.fingerprint import season_paths
+from model.raw_snapshot import raw_inputs, load_raw_snapshot, save_raw_snapshot
 
-def get_data_only(end_year, num_seasons, sportsbook):
+def get_data_only(end_year, num_seasons, sportsbook, export_csv=None):
     """
     Helper function to return the raw DataFrame of data used to
     engineer the features, before actually engineering the features.
+    
+    The merged DataFrame is loaded from its binary snapshot unless one of the
+    source files changed since it was built (see raw_snapshot.py).
+    
+    Args:
+        export_csv: Also write the DataFrame to RAW_DATA_PATH, for debugging
+            (None = use config default).
     """
-    # Load data from Football-Data.co.uk aggregated from configured seasons.
-    df_raw = load_all_seasons(end_year=end_year, num_seasons=num_seasons, sportsbook=sportsbook)
-    # Merge possession data scraped from FootballCritic.
-    df_raw = merge_possession_into_dataframe(df_raw)
-    # Merge squad valuation data from TransferMarkt.
-    df_raw = merge_valuations_into_dataframe(df_raw)
-    # Write to file, so we can reuse as needed.
-    df_raw.to_csv(RAW_DATA_PATH, index=False)
+    inputs = raw_inputs(end_year, num_seasons, sportsbook)
+    df_raw = load_raw_snapshot(inputs)
+    
+    if df_raw is None:
+        # Load data from Football-Data.co.uk aggregated from configured seasons.
+        df_raw = load_all_seasons(end_year=end_year, num_seasons=num_seasons, sportsbook=sportsbook)
+        # Merge possession data scraped from FootballCritic.
+        df_raw = merge_possession_into_dataframe(df_raw)
+        # Merge squad valuation data from TransferMarkt.
+        df_raw = merge_valuations_into_dataframe(df_raw)
+        # Save the snapshot, so we can reuse as needed.
+        save_raw_snapshot(df_raw, inputs)
+    
+    if export_csv is None:
+        export_csv = EXPORT_RAW_DATA
+    if export_csv:
+        df_raw.to_csv(RAW_DATA_PATH, index=False)
     
     return df_raw
 
+# Football-Data.co.uk columns we keep for every sportsbook, and their names
+# in our DataFrame. See list of abbreviations for the dataset at the following
+# link: https://football-data.co.uk/notes.txt
+FEATURE_COLUMNS = {
+    'Date':     'date',
+    'HomeTeam': 'home_team',
+    'AwayTeam': 'away_team',
+    'FTHG':     'home_goals',
+    'FTAG':     'away_goals',
+    'HST':      'home_shots_on_target',
+    'AST':      'away_shots_on_target',
+    'HF':       'home_fouls',
+    'AF':       'away_fouls',
+}
+RESULT_COLUMN = {'FTR': 'result'}
+BASE_COLUMNS = {**FEATURE_COLUMNS, **RESULT_COLUMN}
+
+# Match statistics, read as floats since a season file may have blank rows
+# (e.g., postponed matches), and turned back into integers once those rows
+# are dropped.
+COUNT_COLUMNS = ['FTHG', 'FTAG', 'HST', 'AST', 'HF', 'AF']
+
+# Explicit dtypes of the raw columns, so pandas doesn't have to infer them.
+RAW_DTYPES = {
+    'Date': str,
+    'HomeTeam': str,
+    'AwayTeam': str,
+    'FTR': str,
+    **{col: 'float64' for col in COUNT_COLUMNS},
+}
+
+# Date formats used across seasons (e.g., the 16/17 season uses DD/MM/YY).
+DATE_FORMATS = [
+    (re.compile(r'\d{2}/\d{2}/\d{4}'), '%d/%m/%Y'),
+    (re.compile(r'\d{2}/\d{2}/\d{2}'), '%d/%m/%y'),
+]
+
+# The odds columns of every sportsbook, e.g., B365H, B365D, and B365A.
+ODDS_PATTERNS = {
+    'odds_home_win': re.compile(r"[A-Z0-9]{2,4}H"),
+    'odds_draw':     re.compile(r"[A-Z0-9]{2,4}D"),
+    'odds_away_win': re.compile(r"[A-Z0-9]{2,4}A"),
+}
+
 def load_season(csv_path: str, sportsbook: str) -> pd.DataFrame:
     """
     For a single season, load the relevant features into a Pandas DataFrame,
@@ -41,6 +105,9 @@ def load_season(csv_path: str, sportsbook: str) -> pd.DataFrame:
         - Home Team Fouls Committed (HF)
         - Away Team Fouls Committed (AF)
     
+    Only these columns (and the sportsbook's odds) are parsed from the CSV;
+    the other ~100 are skipped by the reader.
+    
     All the features that we want to engineer (see build_features.py) will be engineered
     in that module.
     
@@ -51,87 +118,90 @@ def load_season(csv_path: str, sportsbook: str) -> pd.DataFrame:
     Returns:
         A DataFrame with our data.
     """
-    df = pd.read_csv(csv_path)
-    
-    # See list of abbreviations for the dataset at the following link:
-    # https://football-data.co.uk/notes.txt
-
     if str(sportsbook).lower() == "aggregate":
-        odds_home_cols = [c for c in df.columns if re.fullmatch(r"[A-Z0-9]{2,4}H", c)]
-        odds_draw_cols = [c for c in df.columns if re.fullmatch(r"[A-Z0-9]{2,4}D", c)]
-        odds_away_cols = [c for c in df.columns if re.fullmatch(r"[A-Z0-9]{2,4}A", c)]
+        # Keep the base columns and the odds columns of every sportsbook.
+        df = pd.read_csv(
+            csv_path,
+            usecols=lambda c: c in BASE_COLUMNS or any(p.fullmatch(c) for p in ODDS_PATTERNS.values()),
+            dtype=RAW_DTYPES,
+        )
 
-        if not (odds_home_cols and odds_draw_cols and odds_away_cols):
+        odds_cols = {
+            name: [c for c in df.columns if pattern.fullmatch(c)]
+            for name, pattern in ODDS_PATTERNS.items()
+        }
+        if not all(odds_cols.values()):
             raise ValueError("Could not find sportsbook odds columns to aggregate (H/D/A).")
 
         # row-wise mean (ignore NaNs), coerce any stray strings to NaN
-        df["odds_home_win"] = df[odds_home_cols].apply(pd.to_numeric, errors="coerce").mean(axis=1, skipna=True)
-        df["odds_draw"]     = df[odds_draw_cols].apply(pd.to_numeric, errors="coerce").mean(axis=1, skipna=True)
-        df["odds_away_win"] = df[odds_away_cols].apply(pd.to_numeric, errors="coerce").mean(axis=1, skipna=True)
-
-        # drop all original odds columns
-        df.drop(columns=list(set(odds_home_cols + odds_draw_cols + odds_away_cols)), inplace=True)
+        for name, cols in odds_cols.items():
+            df[name] = df[cols].apply(pd.to_numeric, errors="coerce").mean(axis=1, skipna=True)
 
         # Now rename the *non-odds* columns as usual, and keep the 3 aggregated odds
-        rename_map_base = {
-            # Independent variables
-            "Date":     "date",
-            "HomeTeam": "home_team",
-            "AwayTeam": "away_team",
-            "FTHG":     "home_goals",
-            "FTAG":     "away_goals",
-            "HST":      "home_shots_on_target",
-            "AST":      "away_shots_on_target",
-            "HF":       "home_fouls",
-            "AF":       "away_fouls",
-            
-            # Dependent variable
-            "FTR": "result",
-        }
-
-        df = df[list(rename_map_base.keys()) + ["odds_home_win", "odds_draw", "odds_away_win"]]
-        df = df.rename(columns=rename_map_base)
+        df = df[list(BASE_COLUMNS.keys()) + list(ODDS_PATTERNS.keys())]
+        df = df.rename(columns=BASE_COLUMNS)
 
     else:
-        rename_map = {
-            # Independent variables
-            'Date':           'date',
-            'HomeTeam':       'home_team',
-            'AwayTeam':       'away_team',
-            'FTHG':           'home_goals',
-            'FTAG':           'away_goals',
-            'HST':            'home_shots_on_target',
-            'AST':            'away_shots_on_target',
-            'HF':             'home_fouls',
-            'AF':             'away_fouls',
+        odds_map = {
             f'{sportsbook}H': 'odds_home_win',
             f'{sportsbook}D': 'odds_draw',
             f'{sportsbook}A': 'odds_away_win',
+        }
+        rename_map = {
+            # Independent variables
+            **FEATURE_COLUMNS,
+            **odds_map,
             
             # Dependent variable
-            'FTR':            'result'
+            **RESULT_COLUMN,
         }
         
-        # Only keep the columns whose keys are in the rename map.
-        df = df[list(rename_map.keys())]
-        # Rename the columns from the keys to the values.
-        df = df.rename(columns=rename_map)
-    
-    # Parse date column into datetime. Can't specify DD/MM/YYYY because for some reason
-    # the 16/17 season uses DD/MM/YY.
-    df['date'] = pd.to_datetime(df['date'], format='mixed', dayfirst=True)
+        # Only read the columns whose keys are in the rename map.
+        df = pd.read_csv(
+            csv_path,
+            usecols=list(rename_map.keys()),
+            dtype={**RAW_DTYPES, **{col: 'float64' for col in odds_map}},
+        )
+        # Keep the columns in rename map order, and rename them from the keys
+        # to the values.
+        df = df[list(rename_map.keys())].rename(columns=rename_map)
+    
+    # Parse date column into datetime, with the format this season uses.
+    df['date'] = parse_dates(df['date'])
     
     # Drop rows without a valid result (e.g., postponed, or not home, draw, or away).
     df = df.dropna(subset=['result'])
     df = df[df['result'].isin(['H', 'D', 'A'])]
     
+    # Match statistics are whole numbers once unplayed rows are gone.
+    for col in (BASE_COLUMNS[c] for c in COUNT_COLUMNS):
+        if df[col].notna().all():
+            df[col] = df[col].astype('int64')
+    
     return df
 
 
+def parse_dates(dates: pd.Series) -> pd.Series:
+    """
+    Parse a season's dates with the single format it uses, detected from its
+    first date, falling back to (slower) mixed-format parsing if the season
+    mixes formats.
+    """
+    first = dates.dropna().iloc[0] if dates.notna().any() else ''
+    for pattern, fmt in DATE_FORMATS:
+        if pattern.fullmatch(first):
+            try:
+                return pd.to_datetime(dates, format=fmt)
+            except ValueError:
+                break
+    return pd.to_datetime(dates, format='mixed', dayfirst=True)
+
+
 def load_all_seasons(end_year: int, num_seasons: int, sportsbook: str) -> pd.DataFrame:
     """
     Load the data from the proper number of raw CSVs into a processed CSV
-    that stores the data aggregated from all the relevant seasons.
+    that stores the data aggregated from all the relevant seasons. The
+    seasons are parsed concurrently.
     
     Args:
         end_year: The second year of the most recent season we want to include
@@ -141,9 +211,6 @@ def load_all_seasons(end_year: int, num_seasons: int, sportsbook: str) -> pd.Dat
     Returns:
         A DataFrame with our aggregated data (also saved to data/processed).
     """
-    # Store list of all DataFrames corresponding to each relevant season.
-    all_dfs = []
-    
     # Load all CSVs corresponding to relevant seasons. This will end at `end_year`
     # and begin at the year starting the season `num_seasons` seasons from `end_year`.
     
@@ -151,12 +218,18 @@ def load_all_seasons(end_year: int, num_seasons: int, sportsbook: str) -> pd.Dat
     # seasons, the beginning season would be the 15/16 season.
     
     # e.g., from 15 to 24
-    for y1 in range(end_year - num_seasons, end_year):
-        y2 = y1 + 1
-        raw_csv_path = f'model/data/football_data_{y1}_{y2}.csv'
-        df = load_season(raw_csv_path, sportsbook)
+    years = range(end_year - num_seasons, end_year)
+    paths = season_paths(end_year, num_seasons)
+    
+    # The CSV parser releases the GIL, so threads are enough to read the
+    # seasons in parallel. map() keeps the results in season order.
+    with ThreadPoolExecutor(max_workers=LOAD_WORKERS) as pool:
+        season_dfs = list(pool.map(lambda path: load_season(path, sportsbook), paths))
+    
+    # Store list of all DataFrames corresponding to each relevant season.
+    all_dfs = []
+    for y1, df in zip(years, season_dfs):
         df['season'] = y1
-        
         all_dfs.append(df)
     
     if not all_dfs:
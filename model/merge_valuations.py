@@ -19,22 +19,28 @@ def merge_valuations_into_dataframe(df: pd.DataFrame, val_csv=VALUATION_PATH) ->
     # Prepare valuation data
     val_df = val_data[["cutoff_date", "team", "value_eur_at_date", "squad_size_at_date"]].copy()
     val_df["cutoff_date"] = pd.to_datetime(val_df["cutoff_date"], errors="coerce")
-    val_df["team_normalized"] = val_df["team"].apply(normalize_team_name)
+    val_df["team_normalized"] = normalize_team_names(val_df["team"])
     val_df = val_df.sort_values(["team_normalized", "cutoff_date"])
     
     # Copy input dataframe
     match_df = df.copy()
     # print(f">>> Processing match data: {len(match_df)} rows")
     
-    match_df["_match_date"] = pd.to_datetime(match_df["date"], errors="coerce")
+    match_dates = pd.to_datetime(match_df["date"], errors="coerce")
     
-    # print(">>> Merging home team valuations...")
-    match_df["home_team_normalized"] = match_df["home_team"].apply(normalize_team_name)
-    match_df = merge_team_values(match_df, val_df, "home_team_normalized", "_match_date", "home")
-    
-    # print(">>> Merging away team valuations...")
-    match_df["away_team_normalized"] = match_df["away_team"].apply(normalize_team_name)
-    match_df = merge_team_values(match_df, val_df, "away_team_normalized", "_match_date", "away")
+    # print(">>> Merging home and away team valuations...")
+    home_values, away_values = merge_team_values(
+        normalize_team_names(match_df["home_team"]),
+        normalize_team_names(match_df["away_team"]),
+        match_dates,
+        val_df,
+    )
+    for prefix, values in (("home", home_values), ("away", away_values)):
+        value_col = f"{prefix}_squad_value"
+        if value_col in match_df:
+            # Keep any existing value for matches without a valuation.
+            values = values.where(values.notna(), match_df[value_col])
+        match_df[value_col] = values
 
     if "home_squad_value" in match_df.columns and "away_squad_value" in match_df.columns:
         match_df["home_squad_value"] = pd.to_numeric(match_df["home_squad_value"], errors="coerce")
@@ -66,8 +72,6 @@ def merge_valuations_into_dataframe(df: pd.DataFrame, val_csv=VALUATION_PATH) ->
             errors="ignore",
         )
     
-    match_df = match_df.drop(columns=["home_team_normalized", "away_team_normalized", "_match_date"], errors="ignore")
-    
     # print(">>> Added/updated columns: home_squad_size, away_squad_size, home_squad_value_log_z, away_squad_value_log_z, squad_value_log_advantage_z")
     
     return match_df
@@ -120,17 +124,41 @@ def normalize_team_name(name):
 
     return name_map.get(name, name)
 
-def merge_team_values(match_df, val_df, team_col_normalized, date_col_for_merge, prefix):
-    merged = match_df.copy()
-    value_col = f"{prefix}_squad_value"
-    if value_col not in merged:
-        merged[value_col] = None
+def normalize_team_names(names: pd.Series) -> pd.Series:
+    """Apply normalize_team_name once per unique name rather than once per row."""
+    codes, uniques = pd.factorize(names)
+    normalized = np.array([normalize_team_name(name) for name in uniques] + [np.nan], dtype=object)
+    # Missing names have code -1, which picks the trailing NaN.
+    return pd.Series(normalized[codes], index=names.index, dtype=object)
+
+def merge_team_values(home_teams, away_teams, match_dates, val_df):
+    """
+    Look up the latest squad value (cutoff_date <= match date) of both teams
+    of every match, as one as-of join over the home and away sides stacked.
+    Matches without an earlier valuation for the team get NaN.
+    """
+    n = len(match_dates)
+    left = pd.DataFrame({
+        "team_normalized": pd.concat([home_teams, away_teams], ignore_index=True),
+        "cutoff_date": pd.concat([match_dates, match_dates], ignore_index=True),
+        "row": np.arange(2 * n),
+    })
+    # merge_asof needs both keys non-null and sorted; rows with a missing
+    # team or date can't match anything anyway.
+    left = left.dropna(subset=["team_normalized", "cutoff_date"]).sort_values("cutoff_date", kind="stable")
+    right = val_df.dropna(subset=["team_normalized", "cutoff_date"]).sort_values("cutoff_date", kind="stable")
+
+    merged = pd.merge_asof(
+        left,
+        right[["team_normalized", "cutoff_date", "value_eur_at_date"]],
+        on="cutoff_date",
+        by="team_normalized",
+        direction="backward",
+    )
 
-    for idx, row in merged.iterrows():
-        team_normalized = row[team_col_normalized]
-        match_date = row[date_col_for_merge]
-        team_vals = val_df[(val_df["team_normalized"] == team_normalized) & (val_df["cutoff_date"] <= match_date)]
-        if not team_vals.empty:
-            latest = team_vals.iloc[-1]
-            merged.at[idx, value_col] = latest["value_eur_at_date"]
-    return merged
\ No newline at end of file
+    values = np.full(2 * n, np.nan, dtype=object)
+    values[merged["row"].to_numpy()] = merged["value_eur_at_date"].to_numpy(dtype=object)
+    return (
+        pd.Series(values[:n], index=match_dates.index, dtype=object),
+        pd.Series(values[n:], index=match_dates.index, dtype=object),
+    )
@@ -0,0 +1,50 @@
+"""
+Binary snapshot of the merged raw DataFrame returned by get_data_only.
+
+The snapshot is stored in the compact columnar format (see columnar.py) and
+keyed by a hash of the season CSVs, the possession and valuation data, and
+the season range and sportsbook, so it is only rebuilt when one of them
+changes.
+"""
+import logging
+
+import pandas as pd
+
+from model.columnar import save_frame, load_frame, read_manifest
+from model.config import RAW_SNAPSHOT_DIR
+from model.fingerprint import source_digests, fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+def raw_inputs(end_year: int, num_seasons: int, sportsbook: str) -> dict:
+    """Describe everything the raw DataFrame for this configuration depends on."""
+    return {
+        "files": source_digests(end_year, num_seasons),
+        "params": {
+            "end_year": end_year,
+            "num_seasons": num_seasons,
+            "sportsbook": sportsbook,
+        },
+    }
+
+
+def load_raw_snapshot(inputs: dict) -> pd.DataFrame:
+    """Load the snapshot built from `inputs`, or None if there isn't one."""
+    key = fingerprint(inputs)
+    entry = RAW_SNAPSHOT_DIR / key
+    if read_manifest(entry) is None:
+        logger.info("Raw data snapshot miss: %s", key)
+        return None
+    logger.info("Raw data snapshot hit: %s", key)
+    return load_frame(entry)
+
+
+def save_raw_snapshot(df: pd.DataFrame, inputs: dict) -> None:
+    """
+    Save the raw DataFrame built from `inputs`. The snapshot only appears
+    once it is complete, and a snapshot that another process saved first
+    is kept (see columnar.py:save_frame), so processes loading it at the
+    same time never map a file that is being rewritten.
+    """
+    save_frame(df, RAW_SNAPSHOT_DIR / fingerprint(inputs), meta={"inputs": inputs}, compact=True)
@@ -2,6 +2,8 @@
 Using the same code from the premier-league-match-predictions repository,
 build the feature matrix and save the voting model to file.
 """
+import logging
+
 from joblib import dump
 from sklearn.metrics import accuracy_score
 
@@ -10,6 +12,9 @@ from model.train_model import train_model
 from model.config import MODEL_PATH, END_YEAR, NUM_SEASONS, N_MATCHES, SPORTSBOOK
 
 if __name__ == "__main__":
+    # Show the feature cache's hit/miss messages.
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
     # Get the training and testing data.
     print('Engineering feature matrix...')
     X_train, y_train, X_test, y_test = get_feature_matrix(END_YEAR, NUM_SEASONS, N_MATCHES, SPORTSBOOK)
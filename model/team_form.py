@@ -0,0 +1,118 @@
+"""
+Rolling team form computed on a "team-match long table", where every match
+appears twice: once from the home team's perspective and once from the away
+team's perspective.
+"""
+import numpy as np
+import pandas as pd
+
+# Per-match statistics that are summed over the rolling window.
+SUM_STATS = ["wins", "points", "goals_scored", "goals_conceded", "shots_on_target", "fouls_committed"]
+
+# Form columns attached for each side, in the order build_rolling_features
+# has always produced them.
+FORM_COLUMNS = [
+    "form_wins",
+    "form_points",
+    "form_goals_scored",
+    "form_goals_conceded",
+    "form_shots_on_target",
+    "form_fouls_committed",
+    "form_win_streak",
+    "form_possession_pct",
+]
+
+
+def team_match_long(df: pd.DataFrame, home: np.ndarray, away: np.ndarray) -> pd.DataFrame:
+    """
+    Stack the home and away perspectives of every match into one table.
+
+    Row i holds match i from the home team's perspective, and row i + len(df)
+    holds it from the away team's perspective, so results can be scattered
+    back onto the matches by position.
+
+    Args:
+        df: The match DataFrame, sorted chronologically.
+        home: Integer team codes of the home teams (see encode_teams).
+        away: Integer team codes of the away teams.
+
+    Returns:
+        A DataFrame with the team code, the match position, and the team's
+        statistics for each match.
+    """
+    n = len(df)
+    result = df["result"].to_numpy()
+
+    def stack(home_col: str, away_col: str) -> np.ndarray:
+        return np.concatenate([df[home_col].to_numpy(), df[away_col].to_numpy()])
+
+    # Wins (0 or 1): the home team won as home, or the away team won as away.
+    wins = np.concatenate([result == "H", result == "A"]).astype(int)
+    draws = np.concatenate([result == "D", result == "D"]).astype(int)
+
+    return pd.DataFrame({
+        "team": np.concatenate([home, away]),
+        "match": np.concatenate([np.arange(n), np.arange(n)]),
+        "wins": wins,
+        # Points add 3 for a win 1 for a draw and 0 for a loss
+        "points": 3 * wins + draws,
+        "goals_scored": stack("home_goals", "away_goals"),
+        "goals_conceded": stack("away_goals", "home_goals"),
+        "shots_on_target": stack("home_shots_on_target", "away_shots_on_target"),
+        "fouls_committed": stack("home_fouls", "away_fouls"),
+        "possession_pct": stack("home_possession_pct", "away_possession_pct"),
+    })
+
+
+def compute_team_form(long: pd.DataFrame, n_matches: int) -> pd.DataFrame:
+    """
+    Compute every team's form going into each match of the long table.
+
+    Each team's matches are its rows in chronological order, so one
+    groupby(team).rolling call covers all teams at once.
+
+    Args:
+        long: The long table built by `team_match_long`.
+        n_matches: Number of matches for rolling window.
+
+    Returns:
+        A DataFrame of FORM_COLUMNS aligned with the rows of `long`.
+    """
+    # Group each team's matches together, keeping them in chronological order.
+    order = np.lexsort((long["match"].to_numpy(), long["team"].to_numpy()))
+    stats = long.iloc[order].reset_index(drop=True)
+    teams = stats["team"]
+
+    # shift() prevents data leakage by shifting the current row down and only
+    # including prior rows, then the rolling window covers n_matches entries.
+    shifted = stats[SUM_STATS + ["possession_pct"]].groupby(teams).shift()
+    rolling = shifted.groupby(teams).rolling(n_matches, min_periods=1)
+    sums = rolling[SUM_STATS].sum().droplevel(0).sort_index()
+    # For possession_pct, use mean instead of sum (more meaningful for percentages)
+    possession = rolling["possession_pct"].mean().droplevel(0).sort_index()
+
+    form = pd.DataFrame({f"form_{col}": sums[col].to_numpy() for col in SUM_STATS})
+    form["form_win_streak"] = consecutive_win_streak_before(stats["wins"], by=teams).to_numpy()
+    form["form_possession_pct"] = possession.to_numpy()
+
+    # Scatter the sorted rows back onto the long table by position.
+    inverse = np.empty_like(order)
+    inverse[order] = np.arange(len(order))
+    return form[FORM_COLUMNS].take(inverse).reset_index(drop=True)
+
+
+# Compute win streak
+def consecutive_win_streak_before(wins: pd.Series, by=None) -> pd.Series:
+    """
+    Returns the number of consecutive wins before each game.
+    Example: wins = [1,1,0,1] -> streak = [0,1,0,0]
+
+    If `by` is given, the streak restarts for each group (e.g., each team in
+    the long table), whose rows must be contiguous.
+    """
+    shifted = wins.shift(1) if by is None else wins.groupby(by).shift(1)
+    prev = shifted.fillna(0).astype(int)   # only look at prior results (leak-free)
+    # Vectorized run-length cumsum over blocks separated by zeros. Every group
+    # starts with a zero, so runs never cross from one group into the next.
+    groups = (prev == 0).cumsum()
+    return prev.groupby(groups).cumsum()